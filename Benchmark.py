@@ -0,0 +1,335 @@
+"""
+Performance benchmarks for the flashcard storage and scheduling code.
+
+    python Benchmark.py load [--decks 500] [--cards 50]
+    python Benchmark.py format [--cards 5000]
+    python Benchmark.py memory [--cards 100000]
+    python Benchmark.py schedule [--cards 10000 100000 1000000]
+    python Benchmark.py startup [--budget 1000] [--runs 3]
+"""
+import argparse, gc, io, json, os, subprocess, sys, tempfile, time, tracemalloc
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from Ido_241524047 import DataManager
+from Cards import Deck, Flashcard
+from Timestamps import now_timestamp, SECONDS_PER_DAY
+from Scheduler import Scheduler
+from BinaryDeckFormat import BinaryDeckFormat
+
+CARD_HTML = ("<html><body><p>Question {i}: what is the capital of country number {i}?</p>"
+             "<p>Some extra explanatory text to make the card a realistic size.</p></body></html>")
+
+
+@contextmanager
+def scratch_dir():
+    """Run inside a temporary working directory (DataManager uses relative paths)"""
+    old_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as root:
+        os.chdir(root)
+        try:
+            yield root
+        finally:
+            os.chdir(old_cwd)
+
+
+def best_of(fn, repeat=3):
+    """Best wall time of several runs, in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def make_deck(name, cards):
+    deck = Deck(name)
+    for i in range(cards):
+        deck.add_flashcard(CARD_HTML.format(i=i), f"Answer {i}", "")
+    return deck
+
+
+def make_store(username, decks, cards):
+    """Write a synthetic deck store for one user"""
+    data_manager = DataManager(username)
+    for n in range(decks):
+        data_manager.save_deck(make_deck(f"Deck {n:04d}", cards))
+    data_manager.flush()
+    return data_manager
+
+
+def benchmark_load(decks=500, cards=50, workers=(2, 4, 8)):
+    """Serial vs parallel DataManager.load_decks() on a cold store (no manifest)"""
+    print(f"load_decks: {decks} decks x {cards} cards")
+    with scratch_dir():
+        manifest_path = make_store("bench_user", decks, cards).get_manifest_path()
+
+        def cold_load(workers, executor):
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+            data_manager = DataManager("bench_user")
+            data_manager.load_executor = executor
+            loaded = data_manager.load_decks(workers=workers)
+            data_manager.flush()
+            assert len(loaded) == decks
+
+        serial = best_of(lambda: cold_load(0, None))
+        print(f"  {'serial':<10} {'-':>7} {serial * 1000:9.1f} ms")
+        for executor in ("thread", "process"):
+            for count in workers:
+                elapsed = best_of(lambda: cold_load(count, executor))
+                print(f"  {executor:<10} {count:>7} {elapsed * 1000:9.1f} ms  ({serial / elapsed:.2f}x)")
+
+        # Warm login: every deck comes from the manifest and stays lazy
+        DataManager("bench_user").load_decks()
+        warm = best_of(lambda: DataManager("bench_user").load_decks())
+        print(f"  {'manifest':<10} {'-':>7} {warm * 1000:9.1f} ms  ({serial / warm:.2f}x)")
+
+
+def benchmark_format(cards=5000):
+    """Size and encode/decode time of the JSON and binary deck formats"""
+    deck = make_deck("Format deck", cards)
+    for i, card in enumerate(deck.flashcards):
+        card.right_count, card.wrong_count, card.retention_score = i % 7, i % 3, (i % 100) / 100
+    deck_data = deck.to_dict()
+    print(f"deck formats: {cards} cards")
+
+    codecs = [
+        ("json", lambda: json.dumps(deck_data, indent=2, ensure_ascii=False).encode("utf-8"),
+         lambda data: json.loads(data.decode("utf-8"))),
+    ]
+    for compression in ("none", "zlib", "lzma"):
+        codecs.append((f"binary/{compression}",
+                       lambda compression=compression: BinaryDeckFormat.encode(deck_data, compression),
+                       BinaryDeckFormat.decode))
+
+    json_size = None
+    print(f"  {'format':<14} {'bytes':>10} {'ratio':>6} {'encode':>10} {'decode':>10}")
+    for name, encode, decode in codecs:
+        data = encode()
+        assert decode(data) == deck_data
+        json_size = json_size or len(data)
+        encode_time = best_of(encode)
+        decode_time = best_of(lambda: decode(data))
+        print(f"  {name:<14} {len(data):>10} {len(data) / json_size:>6.2f} "
+              f"{encode_time * 1000:>7.1f} ms {decode_time * 1000:>7.1f} ms")
+
+    # Streaming just the scheduling fields, without building the whole deck dict
+    data = BinaryDeckFormat.encode(deck_data, "zlib")
+    stream = best_of(lambda: sum(1 for card in BinaryDeckFormat.iter_cards(io.BytesIO(data))
+                                 if card["right_count"]))
+    print(f"  {'stream/zlib':<14} {'':>10} {'':>6} {'':>10} {stream * 1000:>7.1f} ms")
+
+
+class DictFlashcard:
+    """Flashcard as it was before __slots__: a plain __dict__ with ISO timestamp strings"""
+    def __init__(self, data):
+        self.front = data["front"]
+        self.back = data["back"]
+        self.notes = data["notes"]
+        self.id = data["id"]
+        self.right_count = data["right_count"]
+        self.wrong_count = data["wrong_count"]
+        self.difficulty = data["difficulty"]
+        self.retention_score = data["retention_score"]
+        self.last_reviewed = data["last_reviewed"]
+        self.next_review = data["next_review"]
+
+
+def benchmark_memory(cards=100000):
+    """Bytes per loaded card: plain __dict__ cards vs slotted Flashcard"""
+    answers = ["True", "False", "Yes", "No", "42", "Paris"]
+    deck = Deck("Memory deck")
+    for i in range(cards):
+        deck.add_flashcard(f"Question {i}", answers[i % len(answers)], "")
+    text = json.dumps(deck.to_dict())
+    del deck
+    print(f"memory: {cards} cards")
+
+    def measure(make_card):
+        """Memory held by the cards after a load, as DataManager does it (parse, build, drop the dicts)"""
+        gc.collect()
+        tracemalloc.start()
+        data = json.loads(text)
+        loaded = [make_card(card_data) for card_data in data["flashcards"]]
+        del data
+        gc.collect()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del loaded
+        return current
+
+    before = measure(DictFlashcard)
+    after = measure(Flashcard.from_dict)
+    print(f"  {'__dict__':<10} {before / cards:8.1f} bytes/card")
+    print(f"  {'__slots__':<10} {after / cards:8.1f} bytes/card  ({1 - after / before:.0%} less)")
+
+
+def make_schedule_deck(cards, now):
+    """Deck of reviewed cards with varied counters and review times"""
+    flashcards = []
+    for i in range(cards):
+        card = Flashcard(f"Question {i}", "Answer", id=str(i), right_count=i % 9, wrong_count=i % 4,
+                         difficulty=1 + i % 5, retention_score=(i % 100) / 100)
+        card.last_reviewed_ts = now - (i % 60) * SECONDS_PER_DAY
+        card.next_review_ts = now + (i % 30 - 10) * SECONDS_PER_DAY
+        flashcards.append(card)
+    return Deck("Schedule deck", flashcards=flashcards)
+
+
+def benchmark_schedule(sizes=(10000, 100000, 1000000)):
+    """Card-by-card Scheduler calls vs the batch operations on the deck's columns"""
+    scheduler = Scheduler()
+    scheduler.learning_rate = 1.2
+    now = now_timestamp()
+
+    def timed(fn):
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+    print(f"  {'cards':>9} {'operation':<12} {'per card':>10} {'batch':>10} {'speedup':>8}")
+    for cards in sizes:
+        scalar_deck = make_schedule_deck(cards, now)
+        batch_deck = make_schedule_deck(cards, now)
+        if batch_deck.get_columns() is None:
+            print("NumPy is not installed; batch operations would run card by card")
+            return
+        outcomes = [i % 3 != 0 for i in range(cards)]
+
+        operations = [
+            ("schedule", lambda: [scheduler.schedule_card(card, is_right, now)
+                                  for card, is_right in zip(scalar_deck.flashcards, outcomes)],
+             lambda: scheduler.schedule_batch(batch_deck, None, outcomes, now)),
+            ("reschedule", lambda: [scheduler.reschedule_card(card) for card in scalar_deck.flashcards],
+             lambda: scheduler.reschedule_deck(batch_deck)),
+            ("postpone", lambda: [setattr(card, "next_review_ts", card.next_review_ts + 3 * SECONDS_PER_DAY)
+                                  for card in scalar_deck.flashcards],
+             lambda: scheduler.postpone(batch_deck, 3)),
+        ]
+        for name, scalar, batch in operations:
+            scalar_time = timed(scalar)
+            batch_time = timed(batch)
+            # Both paths must leave every card exactly the same
+            assert all(a.next_review_ts == b.next_review_ts and a.retention_score == b.retention_score
+                       for a, b in zip(scalar_deck.flashcards, batch_deck.flashcards))
+            print(f"  {cards:>9} {name:<12} {scalar_time * 1000:>7.1f} ms {batch_time * 1000:>7.1f} ms "
+                  f"{scalar_time / batch_time:>7.0f}x")
+
+
+# Run in a fresh interpreter: import the login window as main.py does,
+# then show it and wait for its first paint event
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from PyQt6.QtCore import QObject, QEvent
+from PyQt6.QtWidgets import QApplication
+from login import LoginWindow
+imported = time.perf_counter()
+
+class FirstPaint(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint and app.property("painted") is None:
+            app.setProperty("painted", time.perf_counter())
+            app.quit()
+        return False
+
+app = QApplication(sys.argv)
+window = LoginWindow()
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+app.exec()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "paint_ms": (app.property("painted") - started) * 1000,
+    "modules": sorted(name for name in sys.modules if "." not in name),
+}))
+"""
+
+# Modules that must not be imported before the login window is up
+STARTUP_EXCLUDED = ("matplotlib", "numpy")
+
+# Time to the login window's first paint, in ms
+STARTUP_BUDGET_MS = 1000
+
+
+def measure_startup(runs=3):
+    """
+    Cold start of the login window in fresh interpreters: best import and
+    first paint times in ms, and the excluded modules imported on the way
+    """
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")  # No display needed
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=app_dir, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    import_ms = min(result["import_ms"] for result in results)
+    paint_ms = min(result["paint_ms"] for result in results)
+    heavy = [name for name in STARTUP_EXCLUDED if any(name in result["modules"] for result in results)]
+    return import_ms, paint_ms, heavy
+
+
+def benchmark_startup(budget=STARTUP_BUDGET_MS, runs=3):
+    """
+    Cold start of the login window: import time and time to first paint,
+    best of several fresh interpreters. Fails (exit status 1) over the
+    budget in ms, or if matplotlib/NumPy got imported on the way.
+    """
+    import_ms, paint_ms, heavy = measure_startup(runs)
+    print(f"  import {import_ms:>7.1f} ms")
+    print(f"  first paint {paint_ms:>7.1f} ms (budget {budget} ms)")
+    failures = []
+    if paint_ms > budget:
+        failures.append(f"first paint took {paint_ms:.0f} ms, over the {budget} ms budget")
+    if heavy:
+        failures.append(f"imported at startup: {', '.join(heavy)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flashcard app benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    load_parser = subparsers.add_parser("load", help="serial vs parallel deck loading")
+    load_parser.add_argument("--decks", type=int, default=500)
+    load_parser.add_argument("--cards", type=int, default=50)
+    load_parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+
+    format_parser = subparsers.add_parser("format", help="JSON vs binary deck size and speed")
+    format_parser.add_argument("--cards", type=int, default=5000)
+
+    memory_parser = subparsers.add_parser("memory", help="bytes per card in memory")
+    memory_parser.add_argument("--cards", type=int, default=100000)
+
+    schedule_parser = subparsers.add_parser("schedule", help="card-by-card vs batch rescheduling")
+    schedule_parser.add_argument("--cards", type=int, nargs="+", default=[10000, 100000, 1000000])
+
+    startup_parser = subparsers.add_parser("startup", help="login window import and first paint time")
+    startup_parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_MS, help="first paint budget in ms")
+    startup_parser.add_argument("--runs", type=int, default=3)
+
+    args = parser.parse_args()
+    if args.benchmark == "load":
+        benchmark_load(args.decks, args.cards, args.workers)
+    elif args.benchmark == "format":
+        benchmark_format(args.cards)
+    elif args.benchmark == "memory":
+        benchmark_memory(args.cards)
+    elif args.benchmark == "schedule":
+        benchmark_schedule(args.cards)
+    elif args.benchmark == "startup":
+        if not benchmark_startup(args.budget, args.runs):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
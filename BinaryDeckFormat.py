@@ -0,0 +1,290 @@
+"""
+Binary deck file layout (all integers little-endian):
+
+    header    magic "FCDK", version, compression, flags, card count,
+              string count, name length, study_time
+    name      deck name, UTF-8 (never compressed, so read_header() is cheap)
+    [study]   study_time as JSON text when it isn't an integer (flags bit 0)
+    payload   string table then card records, compressed as one stream
+              string table: per string, u32 length + UTF-8 bytes (deduplicated)
+              card record:  fixed width, see CARD_RECORD
+"""
+import io, lzma, struct, zlib, json
+from datetime import datetime, timedelta
+from Timestamps import EPOCH
+
+MAGIC = b"FCDK"
+VERSION = 1
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_LZMA = 2
+COMPRESSIONS = {None: COMPRESSION_NONE, "none": COMPRESSION_NONE,
+                "zlib": COMPRESSION_ZLIB, "lzma": COMPRESSION_LZMA}
+
+HEADER = struct.Struct("<4sHBBIIIq")
+STRING_LENGTH = struct.Struct("<I")
+# id, front, back, notes (string indexes), right_count, wrong_count, difficulty,
+# retention_score, last_reviewed, next_review (microseconds since the epoch), card flags
+CARD_RECORD = struct.Struct("<IIIIqqqdqqB")
+
+DECK_STUDY_TIME_JSON = 0x01
+
+CARD_RETENTION_INT = 0x01  # retention_score was an int, not a float
+CARD_LAST_REVIEWED_STRING = 0x02  # last_reviewed is a string index (not a plain naive ISO timestamp)
+CARD_NEXT_REVIEW_STRING = 0x04  # next_review is a string index
+
+READ_CHUNK = 64 * 1024
+RECORD_BATCH = 256  # card records unpacked per read while streaming
+
+
+# What a damaged file can make the decoders raise; readers turn these into BinaryFormatError
+CORRUPT_FILE_ERRORS = (zlib.error, lzma.LZMAError, struct.error, UnicodeDecodeError,
+                       IndexError, OverflowError, json.JSONDecodeError)
+
+
+class BinaryFormatError(ValueError):
+    pass
+
+
+def timestamp_to_micros(value):
+    """Microseconds since the epoch for a naive ISO timestamp that round-trips exactly, else None"""
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is not None or moment.isoformat() != value:
+        return None
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def micros_to_timestamp(micros):
+    return (EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+class StreamReader:
+    """Reads a (possibly compressed) payload a piece at a time"""
+    def __init__(self, f, compression):
+        self.f = f
+        self.buffer = b""
+        self.position = 0  # read offset into buffer
+        if compression == COMPRESSION_ZLIB:
+            self.decompressor = zlib.decompressobj()
+        elif compression == COMPRESSION_LZMA:
+            self.decompressor = lzma.LZMADecompressor()
+        elif compression == COMPRESSION_NONE:
+            self.decompressor = None
+        else:
+            raise BinaryFormatError(f"Unknown compression {compression}")
+
+    def read(self, size):
+        end = self.position + size
+        if end > len(self.buffer):
+            pieces = [self.buffer[self.position:]]
+            available = len(pieces[0])
+            while available < size:
+                chunk = self.f.read(READ_CHUNK)
+                if not chunk:
+                    raise BinaryFormatError("Truncated deck file")
+                if self.decompressor:
+                    chunk = self.decompressor.decompress(chunk)
+                pieces.append(chunk)
+                available += len(chunk)
+            self.buffer, self.position, end = b"".join(pieces), 0, size
+        data = self.buffer[self.position:end]
+        self.position = end
+        return data
+
+    def finish(self):
+        """Check that a compressed payload is complete (a cut-off file can still hold every record)"""
+        while self.decompressor and not self.decompressor.eof:
+            chunk = self.f.read(READ_CHUNK)
+            if not chunk:
+                raise BinaryFormatError("Truncated deck file")
+            self.decompressor.decompress(chunk)
+
+
+class BinaryDeckFormat:
+    """Versioned, optionally compressed binary encoding of Deck.to_dict() data"""
+
+    @staticmethod
+    def is_binary(prefix):
+        """True if the first bytes of a file belong to a binary deck"""
+        return prefix[:len(MAGIC)] == MAGIC
+
+    @staticmethod
+    def encode(deck_data, compression="zlib"):
+        """Encode a Deck.to_dict() dict"""
+        f = io.BytesIO()
+        BinaryDeckFormat.write(deck_data, f, compression)
+        return f.getvalue()
+
+    @staticmethod
+    def decode(data):
+        """Decode bytes from encode() back into a Deck.to_dict() dict"""
+        return BinaryDeckFormat.read(io.BytesIO(data))
+
+    @staticmethod
+    def write(deck_data, f, compression="zlib"):
+        """Write a Deck.to_dict() dict to a binary file object"""
+        if compression not in COMPRESSIONS:
+            raise BinaryFormatError(f"Unknown compression {compression!r}")
+        compression = COMPRESSIONS[compression]
+
+        strings = []
+        string_index = {}
+
+        def intern(value):
+            if not isinstance(value, str):
+                raise BinaryFormatError(f"Expected a string, got {value!r}")
+            index = string_index.get(value)
+            if index is None:
+                index = string_index[value] = len(strings)
+                strings.append(value)
+            return index
+
+        def timestamp_field(value, string_flag):
+            micros = timestamp_to_micros(value)
+            if micros is None:
+                return intern(value), string_flag
+            return micros, 0
+
+        records = []
+        for card in deck_data.get("flashcards", []):
+            flags = 0
+            retention = card["retention_score"]
+            if isinstance(retention, int):
+                flags |= CARD_RETENTION_INT
+            last_reviewed, flag = timestamp_field(card["last_reviewed"], CARD_LAST_REVIEWED_STRING)
+            flags |= flag
+            next_review, flag = timestamp_field(card["next_review"], CARD_NEXT_REVIEW_STRING)
+            flags |= flag
+            for field in ("right_count", "wrong_count", "difficulty"):
+                if not isinstance(card[field], int):
+                    raise BinaryFormatError(f"{field} must be an integer, got {card[field]!r}")
+            records.append(CARD_RECORD.pack(
+                intern(card["id"]), intern(card["front"]), intern(card["back"]), intern(card["notes"]),
+                card["right_count"], card["wrong_count"], card["difficulty"], float(retention),
+                last_reviewed, next_review, flags,
+            ))
+
+        deck_flags = 0
+        study_time = deck_data.get("study_time", 0)
+        study_time_json = b""
+        if not isinstance(study_time, int) or isinstance(study_time, bool):
+            deck_flags |= DECK_STUDY_TIME_JSON
+            study_time_json = json.dumps(study_time).encode("utf-8")
+            study_time = 0
+
+        name = deck_data.get("name", "").encode("utf-8")
+        f.write(HEADER.pack(MAGIC, VERSION, compression, deck_flags,
+                            len(records), len(strings), len(name), study_time))
+        f.write(name)
+        if deck_flags & DECK_STUDY_TIME_JSON:
+            f.write(STRING_LENGTH.pack(len(study_time_json)) + study_time_json)
+
+        payload = io.BytesIO()
+        for value in strings:
+            encoded = value.encode("utf-8")
+            payload.write(STRING_LENGTH.pack(len(encoded)))
+            payload.write(encoded)
+        payload.write(b"".join(records))
+        payload = payload.getvalue()
+
+        if compression == COMPRESSION_ZLIB:
+            payload = zlib.compress(payload, 6)
+        elif compression == COMPRESSION_LZMA:
+            payload = lzma.compress(payload)
+        f.write(payload)
+
+    @staticmethod
+    def read_header(f):
+        """
+        Read only the header: returns a dict with name, study_time, card_count,
+        compression and version. Leaves f positioned at the payload.
+        """
+        raw = f.read(HEADER.size)
+        if len(raw) < HEADER.size:
+            raise BinaryFormatError("Truncated deck header")
+        magic, version, compression, flags, card_count, string_count, name_length, study_time = HEADER.unpack(raw)
+        if magic != MAGIC:
+            raise BinaryFormatError("Not a binary deck file")
+        if version > VERSION:
+            raise BinaryFormatError(f"Deck format version {version} is newer than supported ({VERSION})")
+        try:
+            name = f.read(name_length).decode("utf-8")
+            if flags & DECK_STUDY_TIME_JSON:
+                (length,) = STRING_LENGTH.unpack(f.read(STRING_LENGTH.size))
+                study_time = json.loads(f.read(length).decode("utf-8"))
+        except CORRUPT_FILE_ERRORS as e:
+            raise BinaryFormatError(f"Corrupt deck header: {e}") from e
+        return {
+            "name": name,
+            "study_time": study_time,
+            "card_count": card_count,
+            "string_count": string_count,
+            "compression": compression,
+            "version": version,
+        }
+
+    @staticmethod
+    def iter_cards(f, header=None):
+        """
+        Stream the cards of a binary deck as Flashcard.to_dict() dicts.
+        Only the string table and the current record are held in memory.
+        """
+        header = header or BinaryDeckFormat.read_header(f)
+        try:
+            yield from BinaryDeckFormat.decode_cards(f, header)
+        except CORRUPT_FILE_ERRORS as e:
+            raise BinaryFormatError(f"Corrupt deck data: {e}") from e
+
+    @staticmethod
+    def decode_cards(f, header):
+        """iter_cards() without turning decoder errors into BinaryFormatError"""
+        reader = StreamReader(f, header["compression"])
+
+        strings = []
+        for _ in range(header["string_count"]):
+            (length,) = STRING_LENGTH.unpack(reader.read(STRING_LENGTH.size))
+            strings.append(reader.read(length).decode("utf-8"))
+
+        timestamps = {}  # Cards reviewed together share timestamps; decode each once
+
+        def timestamp(value, is_string):
+            if is_string:
+                return strings[value]
+            text = timestamps.get(value)
+            if text is None:
+                text = timestamps[value] = micros_to_timestamp(value)
+            return text
+
+        remaining = header["card_count"]
+        while remaining:
+            batch = min(remaining, RECORD_BATCH)
+            remaining -= batch
+            for (card_id, front, back, notes, right_count, wrong_count, difficulty, retention,
+                 last_reviewed, next_review, flags) in CARD_RECORD.iter_unpack(reader.read(CARD_RECORD.size * batch)):
+                yield {
+                    "id": strings[card_id],
+                    "front": strings[front],
+                    "back": strings[back],
+                    "notes": strings[notes],
+                    "right_count": right_count,
+                    "wrong_count": wrong_count,
+                    "difficulty": difficulty,
+                    "retention_score": int(retention) if flags & CARD_RETENTION_INT else retention,
+                    "last_reviewed": timestamp(last_reviewed, flags & CARD_LAST_REVIEWED_STRING),
+                    "next_review": timestamp(next_review, flags & CARD_NEXT_REVIEW_STRING),
+                }
+        reader.finish()
+
+    @staticmethod
+    def read(f):
+        """Read a whole binary deck into a Deck.to_dict() dict"""
+        header = BinaryDeckFormat.read_header(f)
+        return {
+            "name": header["name"],
+            "study_time": header["study_time"],
+            "flashcards": list(BinaryDeckFormat.iter_cards(f, header)),
+        }
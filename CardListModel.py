@@ -0,0 +1,166 @@
+import bisect
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+from SearchIndex import html_to_text
+
+FETCH_BATCH = 200  # Rows handed to the view per fetchMore()
+PREVIEW_LENGTH = 30
+
+
+def html_preview(text, length=PREVIEW_LENGTH):
+    """First characters of a card's HTML as plain text (whitespace collapsed)"""
+    plain = html_to_text(text)
+    return plain[:length] + ("..." if len(plain) > length else "")
+
+
+def card_accuracy(card):
+    attempts = card.right_count + card.wrong_count
+    return card.right_count / attempts if attempts else 0.0
+
+
+# Sort orders for sort_by(): name -> key function (None keeps the deck order)
+SORT_KEYS = {
+    "Deck order": None,
+    "Difficulty": lambda card: card.difficulty,
+    "Accuracy": card_accuracy,
+    "Due date": lambda card: card.next_review_ts,
+}
+
+
+class CardListModel(QAbstractListModel):
+    """
+    The cards of a deck for a list view. Rows are handed to the view in
+    batches as it scrolls (fetchMore), previews are worked out only for
+    rows that get displayed and then cached, and adding, editing or
+    deleting a card updates just its row.
+    """
+    def __init__(self, deck, parent=None):
+        super().__init__(parent)
+        self.deck = deck
+        self.loaded = 0  # Rows the view knows about so far
+        self.previews = {}  # card id -> (front HTML, preview)
+        self.sort_key = None  # Key function of the current sort order (None: deck order)
+        self.order = None  # Cards in sort order, when sorted
+        self.keys = None  # Their sort keys, for bisect
+        self.rows = None  # card id -> row in the sort order, rebuilt when needed
+
+    def cards(self):
+        return self.deck.flashcards if self.order is None else self.order
+
+    # Qt model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self.loaded < len(self.cards())
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        count = min(FETCH_BATCH, len(self.cards()) - self.loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self.loaded:
+            return None
+        card = self.cards()[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"Q: {self.preview(card)} (Difficulty: {card.difficulty})"
+        if role == Qt.ItemDataRole.UserRole:
+            return card.id
+        return None
+
+    # Cards and rows
+
+    def preview(self, card):
+        cached = self.previews.get(card.id)
+        if cached is None or cached[0] != card.front:
+            cached = self.previews[card.id] = (card.front, html_preview(card.front))
+        return cached[1]
+
+    def card_at(self, row):
+        cards = self.cards()
+        return cards[row] if 0 <= row < len(cards) else None
+
+    def row_of(self, card_id):
+        """Row of a card (None if it isn't in the deck)"""
+        if self.order is None:
+            return self.deck.index_of(card_id)
+        if self.rows is None:
+            self.rows = {card.id: row for row, card in enumerate(self.order)}
+        return self.rows.get(card_id)
+
+    def sort_by(self, name):
+        """Show the cards in one of the SORT_KEYS orders"""
+        self.beginResetModel()
+        self.sort_key = SORT_KEYS[name]
+        if self.sort_key is None:
+            self.order = self.keys = None
+        else:
+            self.order = sorted(self.deck.flashcards, key=self.sort_key)
+            self.keys = [self.sort_key(card) for card in self.order]
+        self.rows = None
+        self.loaded = min(self.loaded, len(self.cards()))
+        self.endResetModel()
+
+    # Changes to the deck (call these instead of refilling the list)
+
+    def insert_row(self, card):
+        """Put a card at its place in the sort order, telling the view if it already shows that row"""
+        if self.order is None:
+            row = len(self.deck.flashcards) - 1  # Deck.add_flashcard appends
+        else:
+            key = self.sort_key(card)
+            row = bisect.bisect_right(self.keys, key)
+            self.order.insert(row, card)
+            self.keys.insert(row, key)
+            self.rows = None
+        if row <= self.loaded:  # Otherwise fetchMore() brings it in with its batch
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.loaded += 1
+            self.endInsertRows()
+        return row
+
+    def remove_row(self, row, remove):
+        """Run remove() (which takes the card out of the deck) wrapped in row removal signals"""
+        shown = row < self.loaded
+        if shown:
+            self.beginRemoveRows(QModelIndex(), row, row)
+        remove()
+        if self.order is not None:
+            del self.order[row]
+            del self.keys[row]
+            self.rows = None
+        if shown:
+            self.loaded -= 1
+            self.endRemoveRows()
+
+    def card_added(self, card):
+        """Call after deck.add_flashcard(); returns the card's row"""
+        return self.insert_row(card)
+
+    def card_edited(self, card):
+        """Call after changing a card's text or scheduling fields"""
+        row = self.row_of(card.id)
+        if row is None:
+            return None
+        if self.order is not None and self.keys[row] != self.sort_key(card):
+            # The card's place in the sort order changed
+            self.remove_row(row, lambda: None)
+            return self.insert_row(card)
+        if row < self.loaded:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+        return row
+
+    def remove_card(self, card_id):
+        """Delete a card from the deck"""
+        row = self.row_of(card_id)
+        if row is None:
+            return
+        self.previews.pop(card_id, None)
+        self.remove_row(row, lambda: self.deck.remove_flashcard(card_id))
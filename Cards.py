@@ -0,0 +1,261 @@
+import sys, uuid
+from Timestamps import now_timestamp, timestamp_to_iso, parse_timestamp
+from DueQueue import DueQueue
+
+# Card text up to this length is interned, so repeated answers and notes
+# (and the many empty ones) share a single string object
+INTERN_MAX_LENGTH = 64
+
+
+def intern_text(value):
+    if isinstance(value, str) and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+# Flashcard (Middle Panel)
+class Flashcard:
+    # No per-card __dict__; big decks hold a lot of these
+    __slots__ = ("front", "back", "notes", "id", "right_count", "wrong_count", "difficulty",
+                 "retention_score", "_last_reviewed_ts", "_next_review_ts",
+                 "_last_reviewed_text", "_next_review_text")
+
+    def __init__(self, front="", back="", notes="", id=None, right_count=0, wrong_count=0, difficulty=1, retention_score=0.0, last_reviewed=None, next_review=None):
+        """
+        Initialize a new flashcard.
+        Review times are kept as seconds since EPOCH (last_reviewed_ts,
+        next_review_ts); last_reviewed/next_review give them as ISO strings.
+        """
+        self.front = intern_text(front)
+        self.back = intern_text(back)
+        self.notes = intern_text(notes)
+        self.id = id if id is not None else str(uuid.uuid4())
+        self.right_count = right_count
+        self.wrong_count = wrong_count
+        self.difficulty = difficulty
+        self.retention_score = retention_score
+        if last_reviewed:
+            self.last_reviewed = last_reviewed
+        else:
+            self.last_reviewed_ts = now_timestamp()
+        if next_review:
+            self.next_review = next_review
+        else:
+            self.next_review_ts = now_timestamp()
+
+    @property
+    def last_reviewed_ts(self):
+        return self._last_reviewed_ts
+
+    @last_reviewed_ts.setter
+    def last_reviewed_ts(self, timestamp):
+        self._last_reviewed_ts = timestamp
+        self._last_reviewed_text = None
+
+    @property
+    def next_review_ts(self):
+        return self._next_review_ts
+
+    @next_review_ts.setter
+    def next_review_ts(self, timestamp):
+        self._next_review_ts = timestamp
+        self._next_review_text = None
+
+    @property
+    def last_reviewed(self):
+        return self._last_reviewed_text or timestamp_to_iso(self._last_reviewed_ts)
+
+    @last_reviewed.setter
+    def last_reviewed(self, value):
+        self._last_reviewed_ts, self._last_reviewed_text = parse_timestamp(value)
+
+    @property
+    def next_review(self):
+        return self._next_review_text or timestamp_to_iso(self._next_review_ts)
+
+    @next_review.setter
+    def next_review(self, value):
+        self._next_review_ts, self._next_review_text = parse_timestamp(value)
+
+    def to_dict(self):
+        """
+        Store flashcard data as a dictionary.
+        """
+        return {
+            "id": self.id,
+            "front": self.front,
+            "back": self.back,
+            "notes": self.notes,
+            "right_count": self.right_count,
+            "wrong_count": self.wrong_count,
+            "difficulty": self.difficulty,
+            "retention_score": self.retention_score,
+            "last_reviewed": self.last_reviewed,
+            "next_review": self.next_review, 
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Load/parse flashcard data from a dictionary.
+        """
+        return cls(
+            front=data.get("front", ""),
+            back=data.get("back", ""),
+            notes=data.get("notes", ""),
+            id=data.get("id"),
+            right_count=data.get("right_count", 0),
+            wrong_count=data.get("wrong_count", 0),
+            difficulty=data.get("difficulty", 1),
+            retention_score=data.get("retention_score", 0.0),
+            last_reviewed=data.get("last_reviewed"),
+            next_review=data.get("next_review"),
+        )
+
+
+# Deck (Left Panel)
+class Deck:
+    def __init__(self, name, study_time=0, flashcards=None, loader=None):
+        """
+        Initialize flashcard deck.
+        A deck built from the manifest gets a loader instead of flashcards;
+        its cards are read the first time they are needed.
+        """
+        self.name = name
+        self.study_time = study_time
+        self._flashcards = flashcards if flashcards else []
+        self.loader = loader
+        self.columns = None  # DeckColumns, once get_columns() has been used
+        self.due_queue = None  # DueQueue, once get_due_queue() has been used
+        self.card_index = None  # card id -> position, built by index_of()
+        self.right_total = None  # Sum of the cards' right/wrong counts, kept
+        self.wrong_total = None  # up to date once answer_totals() computed them
+    
+    @property
+    def flashcards(self):
+        if self.loader:
+            loader, self.loader = self.loader, None
+            self._flashcards = loader()
+        return self._flashcards
+    
+    @flashcards.setter
+    def flashcards(self, flashcards):
+        self.loader = None
+        self.due_queue = None
+        self.card_index = None
+        self.right_total = self.wrong_total = None
+        if self.columns is not None:
+            self.columns.set_cards(flashcards)
+            self._flashcards = self.columns.cards
+        else:
+            self._flashcards = flashcards
+    
+    def is_loaded(self):
+        return self.loader is None
+    
+    def ensure_loaded(self):
+        """Read the deck's cards now if they are still on disk"""
+        return self.flashcards
+    
+    def get_columns(self):
+        """
+        NumPy column store of the cards' scheduling fields, for vectorized
+        deck-wide queries (None if NumPy isn't installed). Built on first
+        use; from then on the deck's cards are views onto it.
+        """
+        if self.columns is None:
+            from DeckColumns import DeckColumns, columns_available
+            if not columns_available():
+                return None
+            self.columns = DeckColumns(self.flashcards)
+            self._flashcards = self.columns.cards
+        return self.columns
+    
+    def get_due_queue(self):
+        """Priority queue of the cards by next review (built from the cards on first use)"""
+        if self.due_queue is None:
+            self.due_queue = DueQueue.from_cards(self.flashcards)
+        return self.due_queue
+    
+    def index_of(self, card_id):
+        """Position of a card in the deck (None if it isn't in it)"""
+        if self.card_index is None:
+            self.card_index = {card.id: index for index, card in enumerate(self.flashcards)}
+        return self.card_index.get(card_id)
+    
+    def answer_totals(self):
+        """(right answers, wrong answers) over the whole deck"""
+        if self.right_total is None:
+            if self.columns is not None:
+                right, attempts = self.columns.answer_totals()
+                self.right_total, self.wrong_total = right, attempts - right
+            else:
+                self.right_total = sum(card.right_count for card in self.flashcards)
+                self.wrong_total = sum(card.wrong_count for card in self.flashcards)
+        return self.right_total, self.wrong_total
+    
+    def accuracy(self):
+        """Share of right answers over the whole deck (0 when nothing was answered)"""
+        right, wrong = self.answer_totals()
+        return right / (right + wrong) if right + wrong > 0 else 0
+    
+    def record_answer(self, card, is_right):
+        """Count a right or wrong answer on one of the deck's cards"""
+        if is_right:
+            card.right_count += 1
+            if self.right_total is not None:
+                self.right_total += 1
+        else:
+            card.wrong_count += 1
+            if self.wrong_total is not None:
+                self.wrong_total += 1
+    
+    def reset_card_stats(self, card):
+        """Set a card's answer counts, difficulty and retention back to a new card's"""
+        if self.right_total is not None:
+            self.right_total -= card.right_count
+            self.wrong_total -= card.wrong_count
+        card.right_count = 0
+        card.wrong_count = 0
+        card.retention_score = 0.0
+        card.difficulty = 1
+    
+    def add_flashcard(self, front, back, notes=""):
+        card = Flashcard(front, back, notes)
+        if self.columns is not None:
+            card = self.columns.append(card)
+        else:
+            self.flashcards.append(card)
+        if self.card_index is not None:
+            self.card_index[card.id] = len(self.flashcards) - 1
+        if self.due_queue is not None:
+            self.due_queue.update(card)
+        return card
+    
+    def remove_flashcard(self, card_id):
+        due_queue, totals = self.due_queue, (self.right_total, self.wrong_total)
+        removed = [card for card in self.flashcards if card.id == card_id]
+        self.flashcards = [card for card in self.flashcards if card.id != card_id]
+        if due_queue is not None:
+            due_queue.remove(card_id)
+            self.due_queue = due_queue
+        if totals[0] is not None:
+            self.right_total = totals[0] - sum(card.right_count for card in removed)
+            self.wrong_total = totals[1] - sum(card.wrong_count for card in removed)
+    
+    def get_flashcard(self, index):
+        if 0 <= index < len(self.flashcards):
+            return self.flashcards[index]
+        return None
+    
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "study_time": self.study_time,
+            "flashcards": [card.to_dict() for card in self.flashcards]
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        flashcards = [Flashcard.from_dict(card_data) for card_data in data.get("flashcards", [])]
+        return cls(name=data.get("name", ""), study_time=data.get("study_time", ""), flashcards=flashcards)
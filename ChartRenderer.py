@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from PyQt6.QtGui import QImage, QPixmap
+
+
+class ChartRenderer:
+    """
+    Renders charts offscreen with matplotlib's Figure API (no pyplot, so
+    no figure is ever left registered and open) and keeps the resulting
+    pixmaps keyed on the data they show. Each chart kind has one figure
+    and Agg canvas that is cleared and reused for every render.
+    """
+    def __init__(self, max_pixmaps=32):
+        self.canvases = {}  # chart name -> FigureCanvasAgg
+        self.pixmaps = OrderedDict()  # (chart name, data key) -> QPixmap, least recently used first
+        self.max_pixmaps = max_pixmaps
+
+    def get_figure(self, name, figsize):
+        """The chart's figure, cleared (created on first use)"""
+        canvas = self.canvases.get(name)
+        if canvas is None:
+            # matplotlib loads with the first chart, not at app startup
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            canvas = self.canvases[name] = FigureCanvasAgg(Figure(figsize=figsize))
+        else:
+            canvas.figure.clear()
+            canvas.figure.set_size_inches(figsize)
+        return canvas.figure
+
+    def render(self, name, key, draw, figsize=(10, 6)):
+        """
+        Pixmap of a chart. key must change whenever the chart's data does
+        (a tuple of the plotted values works); draw(figure) fills the
+        cleared figure and only runs when (name, key) isn't cached.
+        """
+        cache_key = (name, key)
+        pixmap = self.pixmaps.get(cache_key)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(cache_key)
+            return pixmap
+
+        figure = self.get_figure(name, figsize)
+        draw(figure)
+        figure.tight_layout()
+        figure.canvas.draw()
+        buffer = figure.canvas.buffer_rgba()
+        height, width = buffer.shape[:2]
+        # QPixmap copies the pixels, so the canvas can be reused right away
+        image = QImage(bytes(buffer), width, height, width * 4, QImage.Format.Format_RGBA8888)
+        pixmap = QPixmap.fromImage(image)
+
+        self.pixmaps[cache_key] = pixmap
+        while len(self.pixmaps) > self.max_pixmaps:
+            self.pixmaps.popitem(last=False)
+        return pixmap
+
+    def clear(self):
+        self.pixmaps.clear()
+
+
+chart_renderer = ChartRenderer()  # Shared by every StatsPage, so reopening a chart is instant
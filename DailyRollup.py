@@ -0,0 +1,60 @@
+from datetime import date
+from Timestamps import timestamp_to_datetime
+
+
+def day_of(timestamp):
+    """ISO date (YYYY-MM-DD) of a timestamp in seconds since EPOCH"""
+    return timestamp_to_datetime(timestamp).date().isoformat()
+
+
+class DailyRollup:
+    """
+    Review totals of one deck per day, and per card per day, kept up to
+    date one review at a time so charts never rescan the review log.
+    Each day holds [reviews, correct, study time in ms, sum of retention after].
+    """
+    def __init__(self, days=None, cards=None, last=None):
+        self.days = days or {}  # "YYYY-MM-DD" -> totals
+        self.cards = cards or {}  # card id -> {"YYYY-MM-DD": totals}
+        self.last = last  # Timestamp of the latest review counted (None: unknown)
+
+    def add(self, event):
+        """Count one ReviewEvent"""
+        day = day_of(event.timestamp)
+        for totals in (self.days.setdefault(day, [0, 0, 0, 0.0]),
+                       self.cards.setdefault(event.card_id, {}).setdefault(day, [0, 0, 0, 0.0])):
+            totals[0] += 1
+            totals[1] += 1 if event.is_right else 0
+            totals[2] += event.response_ms
+            totals[3] += event.retention_after
+        if self.last is None or event.timestamp > self.last:
+            self.last = event.timestamp
+
+    def series(self, card_id=None, start=None, end=None):
+        """
+        Per-day rows (day, reviews, correct, study_ms, mean retention) of the
+        deck or of one card, oldest first, optionally limited to start <= day <= end (dates)
+        """
+        days = self.cards.get(card_id, {}) if card_id is not None else self.days
+        start = start.isoformat() if start else ""
+        end = end.isoformat() if end else "9999"
+        return [(date.fromisoformat(day), reviews, correct, study_ms, retention / reviews if reviews else 0.0)
+                for day, (reviews, correct, study_ms, retention) in sorted(days.items())
+                if start <= day <= end]
+
+    def totals(self, day=None):
+        """[reviews, correct, study_ms, retention sum] of one day (default: today)"""
+        return list(self.days.get((day or date.today()).isoformat(), [0, 0, 0, 0.0]))
+
+    def to_dict(self):
+        """Snapshot (safe to write on another thread)"""
+        return {
+            "days": {day: list(totals) for day, totals in self.days.items()},
+            "cards": {card_id: {day: list(totals) for day, totals in days.items()}
+                      for card_id, days in self.cards.items()},
+            "last": self.last,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("days", {}), data.get("cards", {}), data.get("last"))
@@ -0,0 +1,215 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it decks stay plain lists of Flashcards
+    np = None
+
+from Cards import Flashcard
+from Timestamps import now_timestamp
+
+# Scheduling fields kept in columns, with their array types
+COLUMN_TYPES = {
+    "right_count": "int64",
+    "wrong_count": "int64",
+    "difficulty": "int64",
+    "retention_score": "float64",
+    "last_reviewed_ts": "float64",
+    "next_review_ts": "float64",
+}
+
+
+def columns_available():
+    return np is not None
+
+
+def text_property(slot):
+    """
+    A Flashcard ISO-text override (see parse_timestamp) on a ColumnFlashcard;
+    the store remembers which rows have one so batch writes can clear them
+    """
+    def get(self):
+        return getattr(self, slot)
+
+    def set(self, value):
+        setattr(self, slot, value)
+        if value is not None:
+            self.columns.text_rows.add(self.row)
+
+    return property(get, set)
+
+
+def column_property(name, convert):
+    """Attribute of a ColumnFlashcard that reads/writes its row of a column"""
+    def get(self):
+        return convert(self.columns.arrays[name][self.row])
+
+    def set(self, value):
+        self.columns.arrays[name][self.row] = value
+
+    return property(get, set)
+
+
+class ColumnFlashcard(Flashcard):
+    """
+    A Flashcard whose scheduling fields live in a row of a DeckColumns.
+    Behaves like any other Flashcard (to_dict, the scheduler, the UI...).
+    """
+    __slots__ = ("columns", "row", "last_reviewed_text", "next_review_text")
+
+    right_count = column_property("right_count", int)
+    wrong_count = column_property("wrong_count", int)
+    difficulty = column_property("difficulty", int)
+    retention_score = column_property("retention_score", float)
+    # Flashcard keeps its review times in these two
+    _last_reviewed_ts = column_property("last_reviewed_ts", float)
+    _next_review_ts = column_property("next_review_ts", float)
+    _last_reviewed_text = text_property("last_reviewed_text")
+    _next_review_text = text_property("next_review_text")
+
+    @classmethod
+    def view(cls, columns, row, card):
+        """A view on columns[row] carrying card's text fields"""
+        view = cls.__new__(cls)
+        view.columns, view.row = columns, row
+        view.front, view.back, view.notes, view.id = card.front, card.back, card.notes, card.id
+        view._last_reviewed_text = card._last_reviewed_text
+        view._next_review_text = card._next_review_text
+        return view
+
+
+class DeckColumns:
+    """
+    Struct-of-arrays store for the scheduling fields of a deck's cards,
+    one row per card in deck order, so deck-wide queries run vectorized.
+    self.cards holds the ColumnFlashcard views (it is the deck's card list).
+    """
+    def __init__(self, cards=()):
+        cards = list(cards)
+        count = len(cards)
+        self.size = count
+        self.text_rows = set()  # rows whose card keeps an ISO text override
+        self.arrays = {
+            name: np.fromiter((getattr(card, name) for card in cards), dtype, count=count)
+            for name, dtype in COLUMN_TYPES.items()
+        }
+        self.cards = [ColumnFlashcard.view(self, row, card) for row, card in enumerate(cards)]
+        self.row_of = {card.id: row for row, card in enumerate(self.cards)}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """
+        A store over ready-made columns (one per COLUMN_TYPES name) without
+        card views, for headless bulk work such as the Simulator
+        """
+        columns = cls()
+        columns.arrays = {name: np.asarray(arrays[name], dtype) for name, dtype in COLUMN_TYPES.items()}
+        columns.size = len(columns.arrays["right_count"])
+        return columns
+
+    def __len__(self):
+        return self.size
+
+    def column(self, name):
+        """The live part of a column (a view, no copy)"""
+        return self.arrays[name][:self.size]
+
+    def get_card(self, card_id):
+        row = self.row_of.get(card_id)
+        return None if row is None else self.cards[row]
+
+    def append(self, card):
+        """Add a card as a new last row; returns its view"""
+        row = self.size
+        if row == len(self.arrays["right_count"]):
+            # Grow by doubling so appends stay amortized O(1)
+            capacity = max(16, row * 2)
+            for name, array in self.arrays.items():
+                grown = np.zeros(capacity, array.dtype)
+                grown[:row] = array[:row]
+                self.arrays[name] = grown
+        for name in COLUMN_TYPES:
+            self.arrays[name][row] = getattr(card, name)
+        view = ColumnFlashcard.view(self, row, card)
+        self.size += 1
+        self.cards.append(view)
+        self.row_of[view.id] = row
+        return view
+
+    def set_cards(self, cards):
+        """
+        Replace the rows with a new card list (after removals or reordering).
+        Views of this store keep their identity and just move rows; cards
+        that are dropped get a private one-row store so references held
+        elsewhere (e.g. by the UI) stay valid.
+        """
+        cards = list(cards)
+        kept = [(row, card.row) for row, card in enumerate(cards)
+                if isinstance(card, ColumnFlashcard) and card.columns is self]
+        kept_ids = {id(cards[row]) for row, _ in kept}
+        for card in self.cards:
+            if id(card) not in kept_ids:
+                card.columns, card.row = DeckColumns([card]), 0
+
+        count = len(cards)
+        new_rows = np.fromiter((row for row, _ in kept), np.int64, count=len(kept))
+        old_rows = np.fromiter((old for _, old in kept), np.int64, count=len(kept))
+        arrays = {}
+        for name, dtype in COLUMN_TYPES.items():
+            array = np.zeros(max(16, count), dtype)
+            array[new_rows] = self.arrays[name][old_rows]
+            arrays[name] = array
+
+        views = []
+        for row, card in enumerate(cards):
+            if isinstance(card, ColumnFlashcard) and card.columns is self:
+                view = card
+            else:
+                for name in COLUMN_TYPES:
+                    arrays[name][row] = getattr(card, name)
+                view = ColumnFlashcard.view(self, row, card)
+            views.append(view)
+
+        self.arrays = arrays
+        self.size = count
+        self.text_rows = set()
+        for row, view in enumerate(views):
+            view.row = row
+            if view.last_reviewed_text is not None or view.next_review_text is not None:
+                self.text_rows.add(row)
+        self.cards[:] = views
+        self.row_of = {card.id: row for row, card in enumerate(self.cards)}
+
+    def clear_texts(self, rows, last_reviewed=True, next_review=True):
+        """Drop ISO text overrides of rows whose times were just written as columns"""
+        for row in self.text_rows.intersection(rows.tolist()) if self.text_rows else ():
+            card = self.cards[row]
+            if last_reviewed:
+                card.last_reviewed_text = None
+            if next_review:
+                card.next_review_text = None
+            if card.last_reviewed_text is None and card.next_review_text is None:
+                self.text_rows.discard(row)
+
+    # Queries
+
+    def due_mask(self, now=None):
+        """Boolean row mask of cards whose next review is at or before now"""
+        now = now_timestamp() if now is None else now
+        return self.column("next_review_ts") <= now
+
+    def due_cards(self, now=None):
+        """Cards that are due, in deck order"""
+        return [self.cards[row] for row in np.flatnonzero(self.due_mask(now))]
+
+    def answer_totals(self):
+        """(right answers, total answers) over the whole deck"""
+        right = int(self.column("right_count").sum())
+        return right, right + int(self.column("wrong_count").sum())
+
+    def accuracy(self):
+        """Share of right answers over the whole deck (0 when nothing was answered)"""
+        right, attempts = self.answer_totals()
+        return right / attempts if attempts > 0 else 0
+
+    def retention_histogram(self, bins=10):
+        """(counts, bin edges) of retention scores over [0, 1]"""
+        return np.histogram(self.column("retention_score"), bins=bins, range=(0.0, 1.0))
@@ -1,17 +1,20 @@
 import json
 from PyQt6.QtWidgets import QFileDialog, QMessageBox, QInputDialog
 from Ido_241524047 import Deck
+from BinaryDeckFormat import BinaryDeckFormat
+
+BINARY_DECK_FILTER = "Compressed Deck Files (*.deck)"
 
 class DeckIOHandler:
     @staticmethod
-    def export_deck(deck, parent):
-        """Mengekspor deck ke file JSON"""
+    def export_deck(deck, parent, media_store=None):
+        """Mengekspor deck ke file JSON atau file biner terkompresi"""
         options = QFileDialog.Option.ReadOnly
-        path, _ = QFileDialog.getSaveFileName(
+        path, selected_filter = QFileDialog.getSaveFileName(
             parent, 
             "Export Deck", 
             f"{deck.name}.deck", 
-            "Deck Files (*.deck);;All Files (*)", 
+            f"Deck Files (*.deck);;{BINARY_DECK_FILTER};;All Files (*)", 
             options=options
         )
         
@@ -20,15 +23,23 @@ class DeckIOHandler:
                 if not path.endswith('.deck'):
                     path += '.deck'
                     
-                with open(path, 'w') as f:
-                    json.dump(deck.to_dict(), f, indent=2)
+                deck_data = deck.to_dict()
+                if media_store:
+                    # Gambar dari media store disisipkan kembali agar file bisa dipakai di tempat lain
+                    deck_data = media_store.inline_deck_data(deck_data)
+                if selected_filter == BINARY_DECK_FILTER:
+                    with open(path, 'wb') as f:
+                        BinaryDeckFormat.write(deck_data, f, compression="lzma")
+                else:
+                    with open(path, 'w') as f:
+                        json.dump(deck_data, f, indent=2)
                 QMessageBox.information(parent, "Success", "Deck exported successfully!")
             except Exception as e:
                 QMessageBox.critical(parent, "Error", f"Failed to export: {str(e)}")
 
     @staticmethod
     def import_deck(data_manager, decks, parent):
-        """Mengimpor deck dari file JSON"""
+        """Mengimpor deck dari file JSON atau file biner"""
         path, _ = QFileDialog.getOpenFileName(
             parent,
             "Import Deck",
@@ -38,8 +49,14 @@ class DeckIOHandler:
         
         if path:
             try:
-                with open(path, 'r') as f:
-                    deck_data = json.load(f)
+                # Format dikenali dari isi file, bukan dari ekstensinya
+                with open(path, 'rb') as f:
+                    if BinaryDeckFormat.is_binary(f.read(4)):
+                        f.seek(0)
+                        deck_data = BinaryDeckFormat.read(f)
+                    else:
+                        f.seek(0)
+                        deck_data = json.loads(f.read().decode('utf-8'))
                 
                 new_deck = Deck.from_dict(deck_data)
                 existing_names = [d.name for d in decks]
@@ -0,0 +1,127 @@
+import bisect
+from Timestamps import SECONDS_PER_DAY
+
+np = None  # NumPy, imported by the first forecast rather than at app startup (False if missing)
+
+
+def load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:  # Forecasts are counted in a plain loop instead
+            np = False
+    return np
+
+
+class DueIndex:
+    """
+    Every card of a user's decks ordered by next review time, as
+    (next_review_ts, deck file name, card id) entries, so "what is due
+    across all decks" is one bisect instead of reading every deck file.
+    """
+    def __init__(self, decks=None):
+        # deck file name -> {"name": deck name, "cards": {card id: next_review_ts}}
+        self.decks = decks or {}
+        self.forecasts = {}  # deck file name -> ((start, days), counts), dropped when the deck changes
+        self.snapshots = {}  # deck file name -> to_dict() entry, until the deck changes
+        self.entries = sorted(
+            (timestamp, filename, card_id)
+            for filename, deck in self.decks.items()
+            for card_id, timestamp in deck["cards"].items()
+        )
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, filename):
+        return filename in self.decks
+
+    def set_deck(self, filename, deck_name, cards):
+        """Replace a deck's entries; cards are (card id, next_review_ts) pairs"""
+        self.remove_deck(filename)
+        cards = dict(cards)
+        self.decks[filename] = {"name": deck_name, "cards": cards}
+        if len(cards) > 64:
+            # Cheaper to append and re-sort than to insert one by one
+            self.entries.extend((timestamp, filename, card_id) for card_id, timestamp in cards.items())
+            self.entries.sort()
+        else:
+            for card_id, timestamp in cards.items():
+                bisect.insort(self.entries, (timestamp, filename, card_id))
+
+    def remove_deck(self, filename):
+        self.forecasts.pop(filename, None)
+        self.snapshots.pop(filename, None)
+        if self.decks.pop(filename, None) is not None:
+            self.entries = [entry for entry in self.entries if entry[1] != filename]
+
+    def update(self, filename, card_id, timestamp):
+        """Move one card to a new next review time (False if its deck isn't indexed)"""
+        deck = self.decks.get(filename)
+        if deck is None:
+            return False
+        self.forecasts.pop(filename, None)
+        self.snapshots.pop(filename, None)
+        old_timestamp = deck["cards"].get(card_id)
+        if old_timestamp is not None:
+            old_entry = (old_timestamp, filename, card_id)
+            position = bisect.bisect_left(self.entries, old_entry)
+            if position < len(self.entries) and self.entries[position] == old_entry:
+                del self.entries[position]
+        deck["cards"][card_id] = timestamp
+        bisect.insort(self.entries, (timestamp, filename, card_id))
+        return True
+
+    def due(self, until):
+        """(deck name, card id) of the cards due before a timestamp, earliest first"""
+        end = bisect.bisect_left(self.entries, (until,))
+        return [(self.decks[filename]["name"], card_id) for _, filename, card_id in self.entries[:end]]
+
+    def peek(self, until, count, skip=()):
+        """
+        The first `count` of due(until), leaving out the (deck name, card id)
+        pairs in `skip`; only reads as far into the index as it has to
+        """
+        cards = []
+        for timestamp, filename, card_id in self.entries:
+            if timestamp >= until or len(cards) == count:
+                break
+            card = (self.decks[filename]["name"], card_id)
+            if card not in skip:
+                cards.append(card)
+        return cards
+
+    def forecast(self, filename, start, days):
+        """
+        Number of a deck's cards coming due on each of `days` days from
+        `start` (a timestamp at midnight); overdue cards count on the first
+        day. Cached until the deck changes.
+        """
+        cached = self.forecasts.get(filename)
+        if cached and cached[0] == (start, days):
+            return cached[1]
+        cards = self.decks[filename]["cards"]
+        if load_numpy():
+            offsets = (np.fromiter(cards.values(), np.float64, len(cards)) - start) // SECONDS_PER_DAY
+            offsets = np.maximum(offsets[offsets < days], 0).astype(np.int64)
+            counts = np.bincount(offsets, minlength=days).tolist()
+        else:
+            counts = [0] * days
+            for timestamp in cards.values():
+                offset = int((timestamp - start) // SECONDS_PER_DAY)
+                if offset < days:
+                    counts[max(offset, 0)] += 1
+        self.forecasts[filename] = ((start, days), counts)
+        return counts
+
+    def to_dict(self):
+        """
+        Snapshot of the indexed decks (safe to write on another thread).
+        Entries of decks that haven't changed since the last snapshot are reused.
+        """
+        for filename, deck in self.decks.items():
+            if filename not in self.snapshots:
+                self.snapshots[filename] = {"name": deck["name"], "cards": dict(deck["cards"])}
+        return dict(self.snapshots)
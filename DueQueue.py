@@ -0,0 +1,179 @@
+import heapq
+from collections import deque
+
+# Cards remembered for "Previous"
+HISTORY_SIZE = 1000
+
+
+class DueQueue:
+    """
+    Min-heap of a deck's cards keyed on next review time, so "Next" can
+    take the most overdue card in O(log n).
+    Rescheduling a card pushes a new entry and leaves the old one where it
+    is; stale entries are skipped when they reach the top (lazy
+    invalidation) and dropped when the heap gets too big (compact()).
+    """
+    def __init__(self):
+        self.heap = []  # [(next_review_ts, card_id)], may hold stale entries
+        self.keys = {}  # card id -> next_review_ts, for every card in the deck
+        self.queued = set()  # ids with a live heap entry
+        self.skipped = {}  # ids shown but not reviewed, oldest first (used as an ordered set)
+        self.current = None  # id of the card being shown (taken off the heap)
+        self.history = deque(maxlen=HISTORY_SIZE)
+
+    @classmethod
+    def from_cards(cls, cards):
+        queue = cls()
+        queue.heap = [(card.next_review_ts, card.id) for card in cards]
+        heapq.heapify(queue.heap)
+        queue.keys = {card_id: timestamp for timestamp, card_id in queue.heap}
+        queue.queued = set(queue.keys)
+        return queue
+
+    def __len__(self):
+        return len(self.keys)
+
+    def push(self, card_id, timestamp):
+        """Queue a card (again) under a new next review time"""
+        self.keys[card_id] = timestamp
+        self.queued.add(card_id)
+        self.skipped.pop(card_id, None)
+        heapq.heappush(self.heap, (timestamp, card_id))
+        if len(self.heap) > 2 * len(self.queued) + 64:
+            self.compact()
+
+    def update(self, card):
+        """Call after a card was rescheduled"""
+        self.push(card.id, card.next_review_ts)
+
+    def update_many(self, items):
+        """
+        Call after many cards were rescheduled at once, with (card id,
+        next_review_ts) pairs. Rebuilds the heap in O(n) when that's cheaper
+        than pushing one by one.
+        """
+        items = list(items)
+        if len(items) <= len(self.keys) // 8:
+            for card_id, timestamp in items:
+                self.push(card_id, timestamp)
+            return
+        for card_id, timestamp in items:
+            self.keys[card_id] = timestamp
+            self.queued.add(card_id)
+            self.skipped.pop(card_id, None)
+        self.heap = [(self.keys[card_id], card_id) for card_id in self.queued]
+        heapq.heapify(self.heap)
+
+    def remove(self, card_id):
+        self.keys.pop(card_id, None)
+        self.queued.discard(card_id)
+        self.skipped.pop(card_id, None)
+        if self.current == card_id:
+            self.current = None
+
+    def compact(self):
+        """Drop stale entries (O(n))"""
+        self.heap = [(timestamp, card_id) for timestamp, card_id in self.heap
+                     if card_id in self.queued and self.keys.get(card_id) == timestamp]
+        heapq.heapify(self.heap)
+        # An id could be pushed twice with the same time; keep one entry
+        if len(self.heap) != len(self.queued):
+            self.heap = list(set(self.heap))
+            heapq.heapify(self.heap)
+
+    def pop(self):
+        """Take the card with the earliest next review off the heap (None if empty)"""
+        while self.heap:
+            timestamp, card_id = heapq.heappop(self.heap)
+            if card_id in self.queued and self.keys.get(card_id) == timestamp:
+                self.queued.discard(card_id)
+                return card_id
+        return None
+
+    def peek(self):
+        """Id and next review time of the card pop() would return, without taking it"""
+        while self.heap:
+            timestamp, card_id = self.heap[0]
+            if card_id in self.queued and self.keys.get(card_id) == timestamp:
+                return card_id, timestamp
+            heapq.heappop(self.heap)
+        return None
+
+    def upcoming(self, count):
+        """
+        Ids of the next `count` cards pop() would return, in order, without
+        taking them: walks the heap from the top, O(count log count)
+        """
+        ids = []
+        frontier = [(self.heap[0], 0)] if self.heap else []
+        while frontier and len(ids) < count:
+            (timestamp, card_id), position = heapq.heappop(frontier)
+            if card_id in self.queued and self.keys.get(card_id) == timestamp and card_id not in ids:
+                ids.append(card_id)
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(self.heap):
+                    heapq.heappush(frontier, (self.heap[child], child))
+        return ids
+
+    def next(self):
+        """
+        Move on to the most overdue card and return its id.
+        A card left without a review goes to the back of the line; once
+        every card has been shown they are queued again.
+        """
+        if self.current is not None and self.current in self.keys and self.current not in self.queued:
+            self.skipped[self.current] = True
+        card_id = self.pop()
+        if card_id is None and self.skipped:
+            for skipped_id in list(self.skipped):
+                self.push(skipped_id, self.keys[skipped_id])
+            card_id = self.pop()
+        if self.current is not None:
+            self.history.append(self.current)
+        self.current = card_id
+        return card_id
+
+    def prev(self):
+        """Go back to the previously shown card and return its id (None if there is none)"""
+        while self.history:
+            card_id = self.history.pop()
+            if card_id in self.keys:
+                break
+        else:
+            return None
+        if self.current is not None and self.current in self.keys and self.current not in self.queued:
+            self.push(self.current, self.keys[self.current])
+        self.skipped.pop(card_id, None)
+        self.current = card_id
+        return card_id
+
+    def copy(self):
+        """Snapshot for saving on another thread"""
+        queue = DueQueue()
+        queue.heap = list(self.heap)
+        queue.keys = dict(self.keys)
+        queue.queued = set(self.queued)
+        queue.skipped = dict(self.skipped)
+        queue.current = self.current
+        return queue
+
+    def to_dict(self):
+        return {
+            "heap": self.heap,  # Heap order is kept, so loading needs no heapify
+            "keys": self.keys,
+            "queued": list(self.queued),
+            "skipped": list(self.skipped),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        queue = cls()
+        queue.heap = [(timestamp, card_id) for timestamp, card_id in data.get("heap", [])]
+        queue.keys = data.get("keys", {})
+        queue.queued = set(data.get("queued", []))
+        queue.skipped = dict.fromkeys(data.get("skipped", []), True)
+        # The card that was on screen when the queue was saved goes back in line
+        for card_id in queue.keys:
+            if card_id not in queue.queued and card_id not in queue.skipped:
+                queue.skipped[card_id] = True
+        return queue
@@ -1,7 +1,39 @@
+import math
+from collections import OrderedDict
 # Mengimpor modul PyQt6 yang digunakan untuk membuat tampilan UI
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QStackedWidget, QGraphicsOpacityEffect
-from PyQt6.QtCore import Qt, QEasingCurve, pyqtSignal, QPropertyAnimation
-from PyQt6.QtGui import QPixmap, QTextDocument
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QStackedWidget, QGraphicsOpacityEffect, QSizePolicy
+from PyQt6.QtCore import Qt, QEasingCurve, pyqtSignal, QPropertyAnimation, QTimer
+from PyQt6.QtGui import QPixmap, QTextDocument, QTextOption, QPainter
+
+RENDER_CACHE_SIZE = 32  # Jumlah sisi kartu (depan/belakang) yang disimpan sebagai pixmap
+PREFETCH_CARDS = 3  # Jumlah kartu berikutnya yang dirender saat aplikasi sedang diam
+
+class RenderedCardCache:
+    """
+    Cache LRU berisi sisi kartu yang sudah dirender menjadi pixmap, dengan
+    kunci (id kartu, sisi). Entri hanya dipakai jika HTML kartu, lebar
+    tampilan dan media store masih sama (jadi kartu yang diedit dirender ulang).
+    """
+    def __init__(self, size=RENDER_CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()  # (id kartu, depan?) -> (html, lebar, media store, pixmap)
+
+    def get(self, card, front, width, media_store):
+        entry = self.entries.get((card.id, front))
+        html = card.front if front else card.back
+        if entry is None or entry[0] != html or entry[1] != width or entry[2] is not media_store:
+            return None
+        self.entries.move_to_end((card.id, front))
+        return entry[3]
+
+    def put(self, card, front, width, media_store, pixmap):
+        self.entries[(card.id, front)] = (card.front if front else card.back, width, media_store, pixmap)
+        self.entries.move_to_end((card.id, front))
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
 
 # Kelas FlashcardDisplay untuk menampilkan kartu flashcard di tengah aplikasi
 class FlashcardDisplay(QWidget):
@@ -15,6 +47,13 @@ class FlashcardDisplay(QWidget):
         self.current_deck = None    # Menyimpan dek aktif
         self.showing_front = True   # Menandai apakah sisi depan kartu ditampilkan
         self.notes_visible = False  # Menyimpan status tampilan catatan
+        self.media_store = None  # Media store pengguna untuk menampilkan gambar kartu
+        self.render_cache = RenderedCardCache()  # Sisi kartu yang sudah dirender
+        self.upcoming_cards = None  # Fungsi (jumlah) -> kartu berikutnya sesuai urutan review; None = urutan deck
+        self.prefetch_queue = []  # (kartu, depan?) yang akan dirender saat aplikasi diam
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setInterval(0)  # Berjalan saat event loop tidak sibuk
+        self.prefetch_timer.timeout.connect(self.prefetch_next)
         self.init_ui()  # Memanggil metode untuk inisialisasi tampilan UI
 
     def init_ui(self):
@@ -64,6 +103,8 @@ class FlashcardDisplay(QWidget):
         self.init_animation()
 
         self.card_content.setWordWrap(True)
+        # Lebar pixmap kartu mengikuti label, bukan sebaliknya (agar jendela tetap bisa diperkecil)
+        self.card_content.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Preferred)
         card_layout.addWidget(self.card_content, 1)
 
         card_layout.addWidget(self.star_label, 0, Qt.AlignmentFlag.AlignLeft)
@@ -114,10 +155,10 @@ class FlashcardDisplay(QWidget):
         # Ensure the card_content is at the original position after animation
         self.pos_animation.finished.connect(lambda: self.card_content.move(original_pos))
 
-    def set_deck(self, deck):
+    def set_deck(self, deck, start_index=0):
         """Mengatur dek yang sedang digunakan dan memperbarui tampilan"""
         self.current_deck = deck    # Menyimpan dek aktif
-        self.current_index = 0  # Reset indeks kartu ke 0
+        self.current_index = start_index  # Mulai dari kartu yang paling perlu diulang
         self.showing_front = True   # Mulai dengan menampilkan sisi depan kartu
         self.notes_visible = False
         self.title_label.setText(f"Deck: {deck.name}")
@@ -134,16 +175,77 @@ class FlashcardDisplay(QWidget):
             
         card = self.current_deck.get_flashcard(self.current_index)
         if card:
-            if self.showing_front:
-                self.card_content.setTextFormat(Qt.TextFormat.RichText)
-                self.card_content.setText(card.front)
-            else:
-                self.card_content.setTextFormat(Qt.TextFormat.RichText)
-                self.card_content.setText(card.back)
+            # Pixmap dari cache: HTML (dan gambar base64) tidak perlu diurai ulang setiap flip/next
+            self.card_content.setPixmap(self.get_rendered_side(card, self.showing_front))
+            if not self.showing_front:
                 self.card_content.move(0, self.card_content.y())
+            self.schedule_prefetch(card)
             return card
         return None
     
+    def get_render_width(self):
+        """Lebar area teks kartu (tanpa padding), lebar render pixmap"""
+        return max(1, self.card_content.contentsRect().width())
+    
+    def get_rendered_side(self, card, front):
+        """Pixmap satu sisi kartu, dari cache atau dirender sekarang"""
+        width = self.get_render_width()
+        pixmap = self.render_cache.get(card, front, width, self.media_store)
+        if pixmap is None:
+            pixmap = self.render_side(card.front if front else card.back, width)
+            self.render_cache.put(card, front, width, self.media_store, pixmap)
+        return pixmap
+    
+    def render_side(self, html, width):
+        """Merender HTML kartu ke pixmap, dengan font dan perataan seperti card_content"""
+        document = QTextDocument()
+        font = self.card_content.font()
+        font.setPixelSize(32)
+        document.setDefaultFont(font)
+        document.setDefaultTextOption(QTextOption(Qt.AlignmentFlag.AlignHCenter))
+        document.setHtml(self.resolve_html(html))
+        document.setTextWidth(width)
+        
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(math.ceil(width * ratio), math.ceil(document.size().height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        document.drawContents(painter)
+        painter.end()
+        return pixmap
+    
+    def schedule_prefetch(self, card):
+        """Antrekan sisi belakang kartu ini dan kartu-kartu berikutnya untuk dirender saat diam"""
+        if self.upcoming_cards is not None:
+            upcoming = self.upcoming_cards(PREFETCH_CARDS)
+        else:
+            count = len(self.current_deck.flashcards)
+            upcoming = [self.current_deck.flashcards[(self.current_index + step) % count]
+                        for step in range(1, min(PREFETCH_CARDS, count - 1) + 1)]
+        self.prefetch_queue = [(card, not self.showing_front)]
+        for next_card in upcoming:
+            self.prefetch_queue += [(next_card, True), (next_card, False)]
+        self.prefetch_timer.start()
+    
+    def prefetch_next(self):
+        """Merender satu sisi kartu dari antrean per giliran, supaya UI tetap responsif"""
+        if not self.prefetch_queue:
+            self.prefetch_timer.stop()
+            return
+        card, front = self.prefetch_queue.pop(0)
+        self.get_rendered_side(card, front)
+    
+    def resizeEvent(self, event):
+        """Render ulang kartu yang tampil jika lebar area kartu berubah"""
+        super().resizeEvent(event)
+        if self.current_deck and self.card_stack.currentIndex() == 1:
+            self.update_card_display()
+    
+    def resolve_html(self, html):
+        """Memuat gambar dari media store (hanya untuk kartu yang sedang ditampilkan)"""
+        return self.media_store.resolve_html(html) if self.media_store else html
+    
     def flip_card(self):
         """Membalik flashcard antara sisi depan dan belakang"""
         if not self.current_deck:
@@ -1,10 +1,24 @@
-import os, json, uuid, hashlib
-from datetime import datetime
+import os, re, json, hashlib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from collections import Counter
+from datetime import datetime, date
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
                              QTextEdit, QPushButton, QListWidget, QListWidgetItem, 
-                             QMessageBox, QFormLayout, QLineEdit, QGroupBox)
-from PyQt6.QtCore import Qt
+                             QMessageBox, QFormLayout, QLineEdit, QGroupBox, QListView, QComboBox)
+from PyQt6.QtCore import Qt, QTimer
 from Lukman_241524050 import ImageHandler, ImageResizeDialog
+from SaveQueue import SaveQueue
+from MediaStore import MediaStore
+from BinaryDeckFormat import BinaryDeckFormat, BinaryFormatError
+from DueQueue import DueQueue
+from DueIndex import DueIndex
+from ReviewLog import ReviewLog, ReviewEvent
+from DailyRollup import DailyRollup
+from StartupTrace import trace
+from CardListModel import CardListModel, SORT_KEYS
+from SearchIndex import SearchIndex, notes_checksum
+from Timestamps import SECONDS_PER_DAY, timestamp_to_iso, parse_timestamp, end_of_day_timestamp
+from Cards import Flashcard, Deck
 
 # User Management System
 class UserManager:
@@ -12,7 +26,8 @@ class UserManager:
         self.users_file = "data/users.json"
         self.data_dir = "data"
         os.makedirs(self.data_dir, exist_ok=True)
-        self.users = self.load_users()
+        with trace.phase("UserManager.load_users"):
+            self.users = self.load_users()
     
     def load_users(self):
         """Load users from JSON file"""
@@ -87,94 +102,148 @@ class UserManager:
         return None
 
 
-# Flashcard (Middle Panel)
-class Flashcard:
-    def __init__(self, front="", back="", notes="", id=None, right_count=0, wrong_count=0, difficulty=1, retention_score=0.0, last_reviewed=None, next_review=None):
-        """
-        Initialize a new flashcard.
-        """
-        self.front = front
-        self.back = back
-        self.notes = notes
-        self.id = id if id is not None else str(uuid.uuid4())
-        self.right_count = right_count
-        self.wrong_count = wrong_count
-        self.difficulty = difficulty
-        self.retention_score = retention_score
-        self.last_reviewed = last_reviewed if last_reviewed else datetime.now().isoformat()
-        self.next_review = next_review if next_review else datetime.now().isoformat()
+def get_search_fields(cards):
+    """(card id, front, back, notes) of each card, as SearchIndex.set_deck() takes them"""
+    return ((card.id, card.front, card.back, card.notes) for card in cards)
 
 
-    def to_dict(self):
-        """
-        Store flashcard data as a dictionary.
-        """
-        return {
-            "id": self.id,
-            "front": self.front,
-            "back": self.back,
-            "notes": self.notes,
-            "right_count": self.right_count,
-            "wrong_count": self.wrong_count,
-            "difficulty": self.difficulty,
-            "retention_score": self.retention_score,
-            "last_reviewed": self.last_reviewed,
-            "next_review": self.next_review, 
-        }
-    
-    @classmethod
-    def from_dict(cls, data):
-        """
-        Load/parse flashcard data from a dictionary.
-        """
-        return cls(
-            front=data.get("front", ""),
-            back=data.get("back", ""),
-            notes=data.get("notes", ""),
-            id=data.get("id"),
-            right_count=data.get("right_count", 0),
-            wrong_count=data.get("wrong_count", 0),
-            difficulty=data.get("difficulty", 1),
-            retention_score=data.get("retention_score", 0.0),
-            last_reviewed=data.get("last_reviewed", datetime.now().isoformat()),
-            next_review=data.get("next_review", datetime.now().isoformat()),
-        )
+# Card fields recorded in the review journal (everything a review or notes edit can change)
+JOURNAL_FIELDS = ("right_count", "wrong_count", "difficulty", "retention_score",
+                  "last_reviewed", "next_review", "notes")
 
+# Fold a deck's journal into a new snapshot once it grows past this many bytes
+JOURNAL_COMPACT_BYTES = 256 * 1024
+
+# Bump when the manifest entry layout changes; older manifests are rebuilt
+MANIFEST_VERSION = 2
+# Same for the cross-deck due index (due_index.json)
+DUE_INDEX_VERSION = 1
+# ...and the full-text search index (search_index.json)
+SEARCH_INDEX_VERSION = 2
+
+# Most results returned by DataManager.search_cards()
+SEARCH_LIMIT = 100
+
+# Days ahead covered by DataManager.get_forecast()
+FORECAST_DAYS = 365
+
+# Deck files parsed at once by load_decks(); 0 reads them one after another
+LOAD_WORKERS = 0
+# "thread" overlaps file reads; "process" also parses in parallel but has to
+# pickle every parsed deck back, which only pays off for large decks
+LOAD_EXECUTOR = "thread"
+
+# On-disk deck format for new saves: "json" (readable .txt) or "binary"
+# (compressed .fcd, see BinaryDeckFormat). Both are always readable.
+DECK_FORMAT = "json"
+DECK_EXTENSIONS = {"json": ".txt", "binary": ".fcd"}
+
+# Every user gets their own directory under here
+USERDATA_DIR = "./data/userdata"
+# Usernames used as directory names as they are. Lower case only, so two
+# users never share a directory on case-insensitive file systems; no dots,
+# so a name can't clash with files like flashcards.db; no "-", so a name
+# can't be the hashed directory name ("user-...") of another user
+SAFE_DIR_NAME = re.compile(r"[a-z0-9_]+")
+# Names that were used as they are before "-" was taken out of SAFE_DIR_NAME
+LEGACY_SAFE_DIR_NAME = re.compile(r"[a-z0-9_][a-z0-9_-]*")
+HASHED_DIR_NAME = re.compile(r"user-[0-9a-f]{16}")
+
+
+def get_user_dir_name(username):
+    """Directory name for a user's data (a hash for names that aren't safe on disk)"""
+    if SAFE_DIR_NAME.fullmatch(username):
+        return username
+    return "user-" + hashlib.sha256(username.encode("utf-8")).hexdigest()[:16]
+
+
+def get_journal_path(deck_path):
+    """Get the review journal path that sits next to a deck file"""
+    return os.path.splitext(deck_path)[0] + ".journal"
 
-# Deck (Left Panel)
-class Deck:
-    def __init__(self, name, study_time=0, flashcards=None):
-        """
-        Initialize flashcard deck.
-        """
-        self.name = name
-        self.study_time = study_time
-        self.flashcards = flashcards if flashcards else []
-    
-    def add_flashcard(self, front, back, notes=""):
-        card = Flashcard(front, back, notes)
-        self.flashcards.append(card)
-        return card
-    
-    def remove_flashcard(self, card_id):
-        self.flashcards = [card for card in self.flashcards if card.id != card_id]
-    
-    def get_flashcard(self, index):
-        if 0 <= index < len(self.flashcards):
-            return self.flashcards[index]
-        return None
-    
-    def to_dict(self):
-        return {
-            "name": self.name,
-            "study_time": self.study_time,
-            "flashcards": [card.to_dict() for card in self.flashcards]
-        }
-    
-    @classmethod
-    def from_dict(cls, data):
-        flashcards = [Flashcard.from_dict(card_data) for card_data in data.get("flashcards", [])]
-        return cls(name=data.get("name", ""), study_time=data.get("study_time", ""), flashcards=flashcards)
+
+def get_media_key(deck_path):
+    """Media store key of a deck file (the file name without extension, so it survives format changes)"""
+    return os.path.splitext(os.path.basename(deck_path))[0]
+
+
+def summarize_deck(deck_data):
+    """Card count, answer totals and reviews per day of a deck, as kept in the manifest"""
+    flashcards = deck_data.get("flashcards", [])
+    return {
+        "card_count": len(flashcards),
+        "right_total": sum(card.get("right_count", 0) for card in flashcards),
+        "wrong_total": sum(card.get("wrong_count", 0) for card in flashcards),
+        # next_review date (YYYY-MM-DD) -> number of cards; lets due counts be
+        # answered for any day without reading the deck again
+        "due_days": dict(Counter(card.get("next_review", "")[:10] for card in flashcards)),
+    }
+
+
+def count_due(due_days, day=None):
+    """Number of cards due on or before a day (default: today) from a due_days table"""
+    day = (day or date.today()).isoformat()
+    return sum(count for review_day, count in due_days.items() if review_day <= day)
+
+
+def apply_journal(deck_data, journal_path):
+    """Replay journal entries over a deck snapshot (dict form)"""
+    if not os.path.exists(journal_path):
+        return
+    cards = {card.get("id"): card for card in deck_data.get("flashcards", [])}
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn last line from an interrupted append
+                continue
+            card = cards.get(entry.pop("id", None))
+            if card is not None:
+                card.update(entry)
+
+
+def read_journal_entries(journal_path, offset=0):
+    """Each journal entry (dict) from a byte offset on"""
+    if not os.path.exists(journal_path):
+        return
+    with open(journal_path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # Torn entry from an interrupted append
+
+
+def read_journal_reviews(journal_path, offset=0):
+    """(card id, next_review_ts) of each journal entry from a byte offset on"""
+    for entry in read_journal_entries(journal_path, offset):
+        if "id" in entry and "next_review" in entry:
+            yield entry["id"], parse_timestamp(entry["next_review"])[0]
+
+
+def read_deck_file(deck_path):
+    """Read a deck snapshot and replay its journal on top of it"""
+    if deck_path.endswith(DECK_EXTENSIONS["binary"]):
+        with open(deck_path, 'rb') as f:
+            deck_data = BinaryDeckFormat.read(f)
+    else:
+        with open(deck_path, 'r', encoding='utf-8') as f:
+            deck_data = json.load(f)
+    apply_journal(deck_data, get_journal_path(deck_path))
+    return deck_data
+
+
+def try_read_deck_file(deck_path):
+    """
+    read_deck_file() for worker pools: returns (deck_data, None) on success
+    or (None, error message) instead of raising.
+    """
+    try:
+        return read_deck_file(deck_path), None
+    except (json.JSONDecodeError, UnicodeDecodeError, BinaryFormatError, KeyError) as e:
+        return None, str(e)
 
 
 # Data Manager (stores json in txt)
@@ -185,77 +254,900 @@ class DataManager:
         If username is None, uses default behavior for backward compatibility.
         """
         self.username = username
-        self.data_dir = "./data/userdata" if username else "data"
         
         if username:
-            # Ensure user data directory exists
+            # One directory per user, so a login never looks at other users' files
+            self.root_dir = USERDATA_DIR
+            self.data_dir = os.path.join(self.root_dir, get_user_dir_name(username))
             if not os.path.exists(self.data_dir):
-                os.makedirs(self.data_dir)
+                if not self.migrate_legacy_dir():
+                    self.migrate_flat_layout()
+                os.makedirs(self.data_dir, exist_ok=True)
         else:
             # Backward compatibility
+            self.root_dir = self.data_dir = "data"
             os.makedirs(self.data_dir, exist_ok=True)
+        
+        # All deck file writes run on a background thread, in order
+        self.save_queue = SaveQueue(f"SaveQueue-{username or 'default'}")
+        self.saved_paths = set()  # deck files written (or queued) by this manager
+        self.manifest = None  # deck file name -> summary entry, read on first load_decks()
+        self.due_index = None  # DueIndex over all decks, read on first get_due_cards()
+        self.search_index = None  # SearchIndex over all decks, read on first search_cards()
+        self.load_workers = LOAD_WORKERS
+        self.load_executor = LOAD_EXECUTOR
+        self.deck_format = DECK_FORMAT
+        self.media_store = MediaStore(self.get_media_dir())
+        self.review_log = ReviewLog(os.path.join(self.data_dir, "reviews"))
+        self.rollups = {}  # deck file path -> DailyRollup, read on first use
+        self.dirty_rollups = set()  # deck file paths whose rollup has reviews not yet saved
     
     def get_user_file_path(self, deck_name):
         """Get the file path for a deck, considering multi-user setup"""
-        if self.username:
-            return os.path.join(self.data_dir, f"{self.username}_{deck_name}.txt")
+        return os.path.join(self.data_dir, f"{deck_name}{DECK_EXTENSIONS[self.deck_format]}")
+    
+    def get_format_paths(self, deck_path):
+        """The deck file's path in every on-disk format"""
+        base = os.path.splitext(deck_path)[0]
+        return [base + extension for extension in DECK_EXTENSIONS.values()]
+    
+    def get_journal_path(self, deck_path):
+        """Get the review journal path that sits next to a deck file"""
+        return get_journal_path(deck_path)
+    
+    def get_queue_path(self, deck_path):
+        """Get the saved due queue path that sits next to a deck file"""
+        return os.path.splitext(deck_path)[0] + ".queue"
+    
+    def get_rollup_path(self, deck_path):
+        """Get the daily rollup path that sits next to a deck file"""
+        return os.path.splitext(deck_path)[0] + ".rollup"
+    
+    def get_media_dir(self):
+        """Get the directory of the user's media store"""
+        return os.path.join(self.data_dir, "media")
+    
+    def write_snapshot(self, deck_path, deck_data):
+        """Atomically replace a deck file (temp file + rename)"""
+        temp_path = deck_path + ".tmp"
+        if deck_path.endswith(DECK_EXTENSIONS["binary"]):
+            with open(temp_path, 'wb') as f:
+                BinaryDeckFormat.write(deck_data, f, compression="zlib")
         else:
-            return os.path.join(self.data_dir, f"{deck_name}.txt")
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(deck_data, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, deck_path)
+    
+    def remove_journal(self, deck_path):
+        """Remove a deck's journal (the snapshot now holds its changes)"""
+        journal_path = self.get_journal_path(deck_path)
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
     
     def save_deck(self, deck):
-        """Save a deck to file"""
-        deck_path = self.get_user_file_path(deck.name)
-        with open(deck_path, 'w', encoding='utf-8') as f:
-            json.dump(deck.to_dict(), f, indent=2, ensure_ascii=False)
+        """Queue a deck save (written by the background save queue)"""
+        self.save_deck_to(self.get_user_file_path(deck.name), deck)
     
-    def load_decks(self):
-        """Load all decks for the current user"""
-        decks = []
-        if not os.path.exists(self.data_dir):
-            return decks
-        
-        # Get appropriate file prefix
-        prefix = f"{self.username}_" if self.username else ""
+    def save_deck_to(self, deck_path, deck):
+        """Queue a deck save to a specific deck file"""
+        # Inline images move to the media store; the cards keep short references
+        blobs = {}
+        card_refs = self.media_store.externalize_deck(deck, blobs)
+        deck_data = deck.to_dict()  # Snapshot now, on the caller's thread
+        self.saved_paths.add(deck_path)
+        # A full snapshot supersedes any queued writes for the same deck
+        self.save_queue.submit(deck_path, lambda: self.write_deck(deck_path, deck_data))
+        deck_key = get_media_key(deck_path)
+        self.save_queue.submit(("media", deck_key),
+                               lambda: self.media_store.update_refs(deck_key, card_refs, blobs, replace_deck=True),
+                               coalesce=False)
+        self.queue_due_queue_save(deck_path, deck)
+        self.queue_rollup_saves(deck_path)
+        if self.due_index is not None:
+            filename = os.path.basename(deck_path)
+            for path in self.get_format_paths(deck_path):
+                if path != deck_path:
+                    self.due_index.remove_deck(os.path.basename(path))
+            self.due_index.set_deck(filename, deck.name, ((card.id, card.next_review_ts) for card in deck.flashcards))
+            self.queue_due_index_save()
+        if self.search_index is not None:
+            filename = os.path.basename(deck_path)
+            for path in self.get_format_paths(deck_path):
+                if path != deck_path:
+                    self.search_index.remove_deck(os.path.basename(path))
+            self.search_index.set_deck(filename, deck.name, get_search_fields(deck.flashcards))
+            self.queue_search_index_save()
+    
+    def write_deck(self, deck_path, deck_data):
+        """Write a deck snapshot (runs on the save queue)"""
+        self.write_snapshot(deck_path, deck_data)
+        self.remove_journal(deck_path)
+        self.update_manifest_entry(deck_path, deck_data)
+        self.remove_other_formats(deck_path)
+    
+    def remove_other_formats(self, deck_path):
+        """Remove copies of a deck in other formats (left behind when deck_format changes)"""
+        for path in self.get_format_paths(deck_path):
+            if path != deck_path and os.path.exists(path):
+                os.remove(path)
+                if self.get_manifest().pop(os.path.basename(path), None):
+                    self.queue_manifest_save()
+    
+    def save_card(self, deck, card):
+        """Save a single reviewed card by appending it to the deck's journal"""
+        deck_path = self.get_user_file_path(deck.name)
+        if deck_path not in self.saved_paths and not os.path.exists(deck_path):
+            self.save_deck(deck)
+            return
         
-        for filename in os.listdir(self.data_dir):
-            if filename.endswith(".txt"):
-                # For multi-user, only load files that belong to this user
-                if self.username and not filename.startswith(prefix):
+        deck_key = get_media_key(deck_path)
+        blobs = {}
+        names = self.media_store.externalize_card(card, blobs)
+        if names or self.media_store.has_card_refs(deck_key, card.id):
+            self.save_queue.submit(("media", deck_key),
+                                   lambda: self.media_store.update_refs(deck_key, {card.id: names}, blobs),
+                                   coalesce=False)
+        
+        entry = {"id": card.id}
+        entry.update((field, getattr(card, field)) for field in JOURNAL_FIELDS)
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + "\n"
+        # What the review changed in the deck's manifest statistics (None if that isn't known)
+        stats = None
+        previous_review = self.requeue_card(deck, card)
+        if previous_review is not None:
+            stats = deck.answer_totals() + (timestamp_to_iso(previous_review)[:10], card.next_review[:10])
+        self.save_queue.submit(deck_path, lambda: self.append_journal(deck_path, line, stats), coalesce=False)
+        if self.due_index is not None:
+            # Not saved here: the journal entry brings the saved index up to date when it is read
+            self.due_index.update(os.path.basename(deck_path), card.id, card.next_review_ts)
+        # Notes can change with a single-card save
+        if self.search_index is not None and self.search_index.update_card(
+                os.path.basename(deck_path), card.id, card.front, card.back, card.notes):
+            self.queue_search_index_save()
+    
+    def requeue_card(self, deck, card):
+        """
+        Move a saved card to its next review time in the deck's due queue (if
+        the deck has one). Returns the time it was queued under before, or
+        None if that isn't known.
+        """
+        if deck.due_queue is None:
+            return None
+        previous_review = deck.due_queue.keys.get(card.id)
+        if previous_review != card.next_review_ts:
+            deck.due_queue.update(card)
+        return previous_review
+    
+    def append_journal(self, deck_path, line, stats=None):
+        """
+        Append one entry to a deck's journal (runs on the save queue).
+        stats is (right total, wrong total, old due day, new due day) after
+        the review; it keeps the manifest statistics current without a re-read.
+        """
+        with open(self.get_journal_path(deck_path), 'ab+') as f:
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # Torn entry from an interrupted append; end it so this one stays readable
+                    line = "\n" + line
+            f.write(line.encode('utf-8'))
+            journal_size = f.tell()
+        if journal_size > JOURNAL_COMPACT_BYTES:
+            self.compact_journal(deck_path)
+        else:
+            entry = self.get_manifest().get(os.path.basename(deck_path))
+            if entry:
+                if stats is not None and entry.get("stats_journal_size") == entry.get("journal_size"):
+                    self.update_manifest_stats(entry, stats, journal_size)
+                entry["journal_size"] = journal_size
+                self.queue_manifest_save()
+    
+    def update_manifest_stats(self, entry, stats, journal_size):
+        """Apply one review to a manifest entry whose statistics were current before it"""
+        right_total, wrong_total, old_day, new_day = stats
+        due_days = entry["due_days"]
+        if due_days.get(old_day, 0) <= 0:
+            return  # Doesn't match the entry; get_user_stats() will re-read the deck
+        due_days[old_day] -= 1
+        if not due_days[old_day]:
+            del due_days[old_day]
+        due_days[new_day] = due_days.get(new_day, 0) + 1
+        entry["right_total"], entry["wrong_total"] = right_total, wrong_total
+        entry["stats_journal_size"] = journal_size
+    
+    def read_deck_file(self, deck_path):
+        """Read a deck snapshot and replay its journal on top of it"""
+        return read_deck_file(deck_path)
+    
+    def deck_stamp(self, deck_path):
+        """Size and mtime of a deck file and the size of its journal, to tell if data saved from it still fits"""
+        size, mtime = self.file_stamp(deck_path)
+        return [size, mtime, self.file_stamp(self.get_journal_path(deck_path))[0]]
+    
+    def get_journal_offset(self, deck_path, stamp):
+        """
+        For data saved with a deck_stamp(): the journal offset where the
+        entries appended since then start (replaying them brings the data up
+        to date), or None if the deck snapshot itself changed since
+        """
+        current = self.deck_stamp(deck_path)
+        if isinstance(stamp, list) and len(stamp) == 3 and stamp[:2] == current[:2] and stamp[2] <= current[2]:
+            return stamp[2]
+        return None
+    
+    def queue_due_queue_save(self, deck_path, deck):
+        """
+        Queue a save of a deck's due queue (if it has one) after its pending
+        deck writes. Only full deck saves write it: reviews after that are
+        replayed from the deck's journal when the queue is read back.
+        """
+        if deck.due_queue is None:
+            return
+        due_queue = deck.due_queue.copy()
+        queue_path = self.get_queue_path(deck_path)
+        self.save_queue.submit(queue_path, lambda: self.write_due_queue(deck_path, queue_path, due_queue))
+    
+    def write_due_queue(self, deck_path, queue_path, due_queue):
+        """Write a due queue (runs on the save queue, after the deck writes it belongs to)"""
+        data = {"stamp": self.deck_stamp(deck_path)}
+        data.update(due_queue.to_dict())
+        temp_path = queue_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(temp_path, queue_path)
+    
+    def get_due_queue(self, deck):
+        """
+        The deck's due queue: the saved one (plus the reviews journaled since)
+        if the deck snapshot hasn't changed on disk since it was written,
+        otherwise built from the cards.
+        """
+        if deck.due_queue is None:
+            deck_path = self.get_user_file_path(deck.name)
+            queue_path = self.get_queue_path(deck_path)
+            self.flush()
+            if os.path.exists(queue_path):
+                try:
+                    with open(queue_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    offset = self.get_journal_offset(deck_path, data.get("stamp"))
+                    if offset is not None and len(data.get("keys", {})) == len(deck.flashcards):
+                        due_queue = DueQueue.from_dict(data)
+                        for card_id, timestamp in read_journal_reviews(self.get_journal_path(deck_path), offset):
+                            if card_id in due_queue.keys and due_queue.keys[card_id] != timestamp:
+                                due_queue.push(card_id, timestamp)
+                        deck.due_queue = due_queue
+                except (json.JSONDecodeError, OSError, ValueError) as e:
+                    print(f"Error loading due queue for {deck.name}: {e}")
+        return deck.get_due_queue()
+    
+    def log_review(self, deck, card, is_right, response_ms=0, retention_before=0.0):
+        """Queue a review event for the review log (call after the card was rescheduled)"""
+        event = ReviewEvent(card.last_reviewed_ts, deck.name, card.id, is_right, card.difficulty,
+                            int(response_ms), retention_before, card.retention_score)
+        rollup = self.get_rollup(deck)  # Before queueing the event, so a first-time backfill doesn't count it twice
+        self.save_queue.submit(("reviews", None), lambda: self.review_log.append(event), coalesce=False)
+        rollup.add(event)
+        # Saved with the deck or on flush(); a rollup read back without this
+        # review picks it up from the review log
+        self.dirty_rollups.add(self.get_user_file_path(deck.name))
+    
+    def get_rollup(self, deck):
+        """
+        The deck's daily review totals, read from disk the first time (built
+        from the review log if the deck has no rollup file yet). Reviews
+        logged after the saved rollup was written are added from the log.
+        """
+        deck_path = self.get_user_file_path(deck.name)
+        rollup = self.rollups.get(deck_path)
+        if rollup is None:
+            self.flush()
+            rollup_path = self.get_rollup_path(deck_path)
+            try:
+                with open(rollup_path, 'r', encoding='utf-8') as f:
+                    rollup = DailyRollup.from_dict(json.load(f))
+                if rollup.last is not None:
+                    last = rollup.last
+                    for event in self.review_log.scan(last):
+                        if event.deck == deck.name and event.timestamp > last:
+                            rollup.add(event)
+                    if rollup.last != last:
+                        self.queue_rollup_save(deck_path, rollup)
+            except FileNotFoundError:
+                rollup = DailyRollup()
+                for event in self.review_log.scan():
+                    if event.deck == deck.name:
+                        rollup.add(event)
+                if rollup.days:
+                    self.queue_rollup_save(deck_path, rollup)
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"Error loading rollup for {deck.name}: {e}")
+                rollup = DailyRollup()
+            self.rollups[deck_path] = rollup
+        return rollup
+    
+    def queue_rollup_save(self, deck_path, rollup):
+        """Queue a rollup write (repeated requests collapse into one)"""
+        rollup_path = self.get_rollup_path(deck_path)
+        data = rollup.to_dict()  # Snapshot now, on the caller's thread
+        self.save_queue.submit(rollup_path, lambda: self.write_rollup(rollup_path, data))
+    
+    def queue_rollup_saves(self, deck_path=None):
+        """Queue a write of the rollups with unsaved reviews (of one deck, or of all)"""
+        for path in [deck_path] if deck_path else list(self.dirty_rollups):
+            if path in self.dirty_rollups:
+                self.dirty_rollups.discard(path)
+                self.queue_rollup_save(path, self.rollups[path])
+    
+    def write_rollup(self, rollup_path, data):
+        """Write a deck's rollup (runs on the save queue)"""
+        temp_path = rollup_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(temp_path, rollup_path)
+    
+    def get_review_history(self, card_id=None, deck_name=None, start=None, end=None):
+        """
+        Logged reviews, oldest first: of one card if card_id is given, else
+        of every card (optionally of one deck), between start and end
+        (seconds since EPOCH). Only the months in that range are read.
+        """
+        self.flush()
+        if card_id is not None:
+            return self.review_log.card_history(card_id, deck_name, start, end)
+        events = self.review_log.scan(start, end)
+        return events if deck_name is None else [event for event in events if event.deck == deck_name]
+    
+    def get_due_index_path(self):
+        """Get the path of the user's cross-deck due index"""
+        return os.path.join(self.data_dir, "due_index.json")
+    
+    def get_due_index(self):
+        """
+        Return the due index of all the user's decks, reading it from disk
+        the first time. Reviews journaled since the index was written are
+        replayed onto it; only decks whose snapshot changed are read again.
+        """
+        if self.due_index is None:
+            self.flush()
+            stored = {}
+            index_path = self.get_due_index_path()
+            if os.path.exists(index_path):
+                try:
+                    with open(index_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if data.get("version") == DUE_INDEX_VERSION:
+                        stored = data.get("decks", {})
+                except (json.JSONDecodeError, OSError) as e:
+                    print(f"Error loading due index: {e}")
+            
+            decks, changed = {}, False
+            for filename in self.list_deck_files() if os.path.exists(self.data_dir) else []:
+                deck_path = os.path.join(self.data_dir, filename)
+                entry = stored.get(filename)
+                offset = self.get_journal_offset(deck_path, entry.get("stamp")) if entry else None
+                if offset is not None:
+                    cards = entry["cards"]
+                    for card_id, timestamp in read_journal_reviews(self.get_journal_path(deck_path), offset):
+                        if card_id in cards:
+                            cards[card_id] = timestamp
+                    decks[filename] = {"name": entry["name"], "cards": cards}
                     continue
-                
+                deck_data, error = try_read_deck_file(deck_path)
+                if error is not None:
+                    print(f"Error loading deck from {filename}: {error}")
+                    continue
+                cards = {card["id"]: parse_timestamp(card.get("next_review"))[0]
+                         for card in deck_data.get("flashcards", [])}
+                decks[filename] = {"name": deck_data.get("name", ""), "cards": cards}
+                changed = True
+            self.due_index = DueIndex(decks)
+            if changed or len(decks) != len(stored):
+                self.queue_due_index_save()
+        return self.due_index
+    
+    def queue_due_index_save(self):
+        """Queue a due index write (after the deck writes queued so far, so its stamps match them)"""
+        index_path = self.get_due_index_path()
+        decks = self.due_index.to_dict()  # Snapshot now, on the caller's thread
+        self.save_queue.submit(index_path, lambda: self.write_due_index(index_path, decks))
+    
+    def write_due_index(self, index_path, decks):
+        """Write the due index, stamping each deck with its files as they are now (runs on the save queue)"""
+        data = {
+            "version": DUE_INDEX_VERSION,
+            "decks": {filename: dict(entry, stamp=self.deck_stamp(os.path.join(self.data_dir, filename)))
+                      for filename, entry in decks.items()},
+        }
+        temp_path = index_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, index_path)
+    
+    def get_search_index_path(self):
+        """Get the path of the user's full-text search index"""
+        return os.path.join(self.data_dir, "search_index.json")
+    
+    def get_search_index(self):
+        """
+        Return the search index of all the user's decks, reading it from
+        disk the first time. As with the due index, only decks whose files
+        changed since it was written are read and indexed again; reviews
+        journaled since then count as changes only if they edited notes.
+        """
+        if self.search_index is None:
+            self.flush()
+            stored = {}
+            index_path = self.get_search_index_path()
+            if os.path.exists(index_path):
+                try:
+                    with open(index_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if data.get("version") == SEARCH_INDEX_VERSION:
+                        stored = data.get("decks", {})
+                except (json.JSONDecodeError, OSError) as e:
+                    print(f"Error loading search index: {e}")
+            
+            index, changed = SearchIndex(), False
+            for filename in self.list_deck_files() if os.path.exists(self.data_dir) else []:
                 deck_path = os.path.join(self.data_dir, filename)
+                entry = stored.get(filename)
+                if entry and self.search_entry_is_current(deck_path, entry):
+                    index.load_deck(filename, entry)
+                    continue
+                deck_data, error = try_read_deck_file(deck_path)
+                if error is not None:
+                    print(f"Error loading deck from {filename}: {error}")
+                    continue
+                if entry:
+                    index.load_deck(filename, entry)  # Only the cards that changed get indexed again
+                cards = ((card["id"], card.get("front", ""), card.get("back", ""), card.get("notes", ""))
+                         for card in deck_data.get("flashcards", []))
+                index.set_deck(filename, deck_data.get("name", ""), cards)
+                changed = True
+            self.search_index = index
+            if changed or len(index.decks) != len(stored):
+                self.queue_search_index_save()
+        return self.search_index
+    
+    def search_entry_is_current(self, deck_path, entry):
+        """Whether a saved search index entry still matches its deck, judged by the journal tail"""
+        offset = self.get_journal_offset(deck_path, entry.get("stamp"))
+        if offset is None:
+            return False
+        cards = entry.get("cards", {})
+        for journaled in read_journal_entries(self.get_journal_path(deck_path), offset):
+            card = cards.get(journaled.get("id"))
+            if card is None or card[3] != notes_checksum(journaled.get("notes", "")):
+                return False
+        return True
+    
+    def queue_search_index_save(self):
+        """Queue a search index write (after the deck writes queued so far, so its stamps match them)"""
+        index_path = self.get_search_index_path()
+        decks = self.search_index.to_dict()  # Snapshot now; unchanged decks cost nothing
+        self.save_queue.submit(index_path, lambda: self.write_search_index(index_path, decks))
+    
+    def write_search_index(self, index_path, decks):
+        """Write the search index, stamping each deck with its files as they are now (runs on the save queue)"""
+        data = {
+            "version": SEARCH_INDEX_VERSION,
+            "decks": {filename: dict(entry, stamp=self.deck_stamp(os.path.join(self.data_dir, filename)))
+                      for filename, entry in decks.items()},
+        }
+        temp_path = index_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, index_path)
+    
+    def search_cards(self, query, limit=SEARCH_LIMIT):
+        """
+        (deck name, card id, front preview) of the cards whose front, back
+        or notes contain every word of the query (the last word may be
+        the start of a word), across all of the user's decks
+        """
+        return self.get_search_index().search(query, limit)
+    
+    def get_due_cards(self, until=None):
+        """
+        (deck name, card id) of every card due before `until` (seconds since
+        EPOCH; default: the end of today, as in total_due) across all of the
+        user's decks, most overdue first.
+        """
+        until = end_of_day_timestamp() if until is None else until
+        return self.get_due_index().due(until)
+    
+    def peek_due_cards(self, count, skip=(), until=None):
+        """The first `count` of get_due_cards(until), leaving out the cards in skip"""
+        until = end_of_day_timestamp() if until is None else until
+        return self.get_due_index().peek(until, count, skip)
+    
+    def get_forecast(self, days=FORECAST_DAYS, day=None):
+        """
+        Cards coming due on each of the next `days` days, starting with `day`
+        (default: today; overdue cards count as due then), per deck and in
+        total: {"start": date, "decks": {deck name: [count per day]}, "total": [...]}.
+        Comes from the due index; each deck's counts are cached there until it changes.
+        """
+        day = day or date.today()
+        start = end_of_day_timestamp(day) - SECONDS_PER_DAY
+        index = self.get_due_index()
+        decks = {index.decks[filename]["name"]: index.forecast(filename, start, days) for filename in index.decks}
+        return self.combine_forecasts(day, days, decks)
+    
+    def combine_forecasts(self, day, days, decks):
+        """Forecast result from per-deck counts ({deck name: [count per day]})"""
+        return {
+            "start": day,
+            "decks": decks,
+            "total": [sum(counts) for counts in zip(*decks.values())] if decks else [0] * days,
+        }
+    
+    def compact_journal(self, deck_path):
+        """Fold a deck's journal into a new snapshot (runs on the save queue)"""
+        try:
+            self.write_deck(deck_path, self.read_deck_file(deck_path))
+        except (OSError, json.JSONDecodeError, UnicodeDecodeError, BinaryFormatError) as e:
+            print(f"Error compacting journal for {deck_path}: {e}")
+    
+    def flush(self, timeout=None):
+        """Wait until every queued save has been written"""
+        self.queue_rollup_saves()
+        return self.save_queue.flush(timeout)
+    
+    def get_save_metrics(self):
+        """Save queue depth and write latency"""
+        return self.save_queue.get_metrics()
+    
+    def get_manifest_path(self):
+        """Get the path of the user's deck manifest (the index of the user's directory)"""
+        return os.path.join(self.data_dir, "manifest.json")
+    
+    def get_manifest(self):
+        """Return the deck manifest, reading it from disk the first time"""
+        if self.manifest is None:
+            self.manifest = {}
+            manifest_path = self.get_manifest_path()
+            if os.path.exists(manifest_path):
                 try:
-                    with open(deck_path, 'r', encoding='utf-8') as f:
-                        deck_data = json.load(f)
-                        deck = Deck.from_dict(deck_data)
-                        decks.append(deck)
-                except (json.JSONDecodeError, KeyError) as e:
-                    print(f"Error loading deck from {filename}: {e}")
-        return decks
+                    with open(manifest_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    if data.get("version") == MANIFEST_VERSION:
+                        self.manifest = data.get("decks", {})
+                except (json.JSONDecodeError, OSError) as e:
+                    print(f"Error loading deck manifest: {e}")
+        return self.manifest
     
-    def delete_deck(self, deck_name):
-        """Delete a deck file"""
-        deck_path = self.get_user_file_path(deck_name)
-        if os.path.exists(deck_path):
-            os.remove(deck_path)
+    def queue_manifest_save(self):
+        """Queue a manifest write (repeated requests collapse into one)"""
+        manifest_path = self.get_manifest_path()
+        self.save_queue.submit(manifest_path, lambda: self.write_manifest(manifest_path))
+    
+    def write_manifest(self, manifest_path):
+        """Write the manifest (runs on the save queue)"""
+        data = {"version": MANIFEST_VERSION, "decks": dict(self.get_manifest())}
+        temp_path = manifest_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, manifest_path)
+    
+    def file_stamp(self, path):
+        """(size, mtime) of a file, or (0, 0) if it doesn't exist"""
+        try:
+            stat = os.stat(path)
+            return stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return 0, 0
+    
+    def update_manifest_entry(self, deck_path, deck_data):
+        """Summarize a freshly written or parsed deck in the manifest"""
+        size, mtime = self.file_stamp(deck_path)
+        journal_size = self.file_stamp(self.get_journal_path(deck_path))[0]
+        entry = {
+            "name": deck_data.get("name", ""),
+            "study_time": deck_data.get("study_time", 0),
+            "size": size,
+            "mtime": mtime,
+            "journal_size": journal_size,
+            # Journal size the card statistics were computed at; reviews appended
+            # since then make them stale until get_user_stats() re-reads the deck
+            "stats_journal_size": journal_size,
+        }
+        entry.update(summarize_deck(deck_data))
+        self.get_manifest()[os.path.basename(deck_path)] = entry
+        self.queue_manifest_save()
+    
+    def is_manifest_entry_current(self, deck_path, entry):
+        """Check a manifest entry against the deck file and journal on disk"""
+        size, mtime = self.file_stamp(deck_path)
+        journal_size = self.file_stamp(self.get_journal_path(deck_path))[0]
+        return (entry.get("size") == size and entry.get("mtime") == mtime
+                and entry.get("journal_size", 0) == journal_size)
+    
+    def load_deck_cards(self, deck_path):
+        """Read the cards of one deck (called when a lazy deck is first opened)"""
+        self.flush()
+        try:
+            deck_data = self.read_deck_file(deck_path)
+            return [Flashcard.from_dict(card_data) for card_data in deck_data.get("flashcards", [])]
+        except (OSError, json.JSONDecodeError, UnicodeDecodeError, BinaryFormatError, KeyError) as e:
+            print(f"Error loading deck from {os.path.basename(deck_path)}: {e}")
+            return []
+    
+    def read_deck_files(self, deck_paths, workers=None):
+        """
+        Read several deck files, in order. With workers > 1 the files are
+        parsed on a thread/process pool; results still come back in the
+        order of deck_paths, as (deck_data, error) pairs.
+        """
+        workers = self.load_workers if workers is None else workers
+        if workers <= 1 or len(deck_paths) < 2:
+            return [try_read_deck_file(path) for path in deck_paths]
+        
+        executor_class = ProcessPoolExecutor if self.load_executor == "process" else ThreadPoolExecutor
+        with executor_class(max_workers=workers) as executor:
+            # chunksize batches process-pool round trips (thread pools ignore it)
+            chunksize = max(1, len(deck_paths) // (workers * 4))
+            return list(executor.map(try_read_deck_file, deck_paths, chunksize=chunksize))
+    
+    def migrate_media(self, filenames):
+        """One-time move of inline data-URI images from stored decks into the media store"""
+        for filename in filenames:
+            deck_path = os.path.join(self.data_dir, filename)
+            deck_data, error = try_read_deck_file(deck_path)
+            if error is None:
+                self.save_deck_to(deck_path, Deck.from_dict(deck_data))
+        # Creates refs.json even when no deck had images, marking the migration done
+        self.save_queue.submit(("media", None), self.media_store.save_refs)
+        self.flush()
+    
+    def load_decks(self, workers=None):
+        """
+        Load all decks for the current user.
+        Decks with an up-to-date manifest entry are returned without their
+        cards, which are read when the deck is first opened. The rest are
+        parsed now, on `workers` parallel workers (default: self.load_workers).
+        """
+        self.flush()
+        if not os.path.exists(self.data_dir):
+            return []
+        
+        manifest = self.get_manifest()
+        filenames = self.list_deck_files()
+        
+        if not self.media_store.exists():
+            self.migrate_media(filenames)
+        self.media_store.get_refs()
+        
+        decks = {}
+        to_parse = []
+        for filename in filenames:
+            deck_path = os.path.join(self.data_dir, filename)
+            entry = manifest.get(filename)
+            if entry and self.is_manifest_entry_current(deck_path, entry):
+                decks[filename] = Deck(entry["name"], entry["study_time"],
+                                       loader=lambda path=deck_path: self.load_deck_cards(path))
+            else:
+                to_parse.append(filename)
+        
+        paths = [os.path.join(self.data_dir, filename) for filename in to_parse]
+        for filename, deck_path, (deck_data, error) in zip(to_parse, paths, self.read_deck_files(paths, workers)):
+            if error is not None:
+                print(f"Error loading deck from {filename}: {error}")
+                continue
+            try:
+                decks[filename] = Deck.from_dict(deck_data)
+                self.update_manifest_entry(deck_path, deck_data)
+            except KeyError as e:
+                print(f"Error loading deck from {filename}: {e}")
+        
+        self.forget_missing_decks(filenames)
+        return [decks[filename] for filename in filenames if filename in decks]
+    
+    def list_deck_files(self):
+        """File names of the user's decks, sorted so the order doesn't depend on the file system"""
+        extensions = tuple(DECK_EXTENSIONS.values())
+        current_extension = DECK_EXTENSIONS[self.deck_format]
+        by_base = {}
+        for filename in sorted(os.listdir(self.data_dir)):
+            if filename.endswith(extensions):
+                # A deck caught mid format change exists twice; prefer the current format
+                base = os.path.splitext(filename)[0]
+                if base not in by_base or filename.endswith(current_extension):
+                    by_base[base] = filename
+        return [by_base[base] for base in sorted(by_base)]
+    
+    def forget_missing_decks(self, filenames):
+        """Drop manifest entries of decks whose files are gone"""
+        manifest = self.get_manifest()
+        removed = set(manifest) - set(filenames)
+        for filename in removed:
+            del manifest[filename]
+        if removed:
+            self.queue_manifest_save()
+    
+    def migrate_legacy_dir(self):
+        """
+        Move the directory of a username with "-" in it, which used to be
+        the username itself, to the user's hashed directory. A username that
+        looks like a hashed directory name is never moved: that directory
+        belongs to the user whose name hashes to it.
+        """
+        legacy_dir = os.path.join(self.root_dir, self.username)
+        if (LEGACY_SAFE_DIR_NAME.fullmatch(self.username) and not SAFE_DIR_NAME.fullmatch(self.username)
+                and not HASHED_DIR_NAME.fullmatch(self.username) and os.path.isdir(legacy_dir)):
+            os.replace(legacy_dir, self.data_dir)
             return True
         return False
     
+    def migrate_flat_layout(self):
+        """
+        Move this user's files out of the old shared folder, where every deck
+        was stored as <root_dir>/<username>_<deck name>.txt. A file only
+        counts as this user's if the deck name stored inside it matches the
+        file name exactly, so "alice" doesn't take the decks of "alice_b".
+        Files are gathered in a staging directory that is renamed into place
+        at the end; an interrupted migration resumes on the next login.
+        """
+        if not os.path.isdir(self.root_dir):
+            return
+        prefix = f"{self.username}_"
+        staging_dir = self.data_dir + ".migrating"
+        os.makedirs(staging_dir, exist_ok=True)
+        
+        renamed = {}  # old file name -> new file name
+        for filename in sorted(os.listdir(self.root_dir)):
+            stem, extension = os.path.splitext(filename)
+            if not filename.startswith(prefix) or extension not in DECK_EXTENSIONS.values():
+                continue
+            deck_path = os.path.join(self.root_dir, filename)
+            deck_data, error = try_read_deck_file(deck_path)
+            if error is not None or stem != prefix + deck_data.get("name", ""):
+                continue
+            new_path = os.path.join(staging_dir, deck_data["name"] + extension)
+            if os.path.exists(get_journal_path(deck_path)):
+                os.replace(get_journal_path(deck_path), get_journal_path(new_path))
+            os.replace(deck_path, new_path)
+            renamed[filename] = os.path.basename(new_path)
+        
+        # The old manifest and media store carry over with their keys renamed
+        old_manifest_path = os.path.join(self.root_dir, f"{self.username}.manifest.json")
+        if os.path.exists(old_manifest_path):
+            try:
+                with open(old_manifest_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                data["decks"] = {renamed[key]: entry for key, entry in data.get("decks", {}).items()
+                                 if key in renamed}
+                with open(os.path.join(staging_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+            except (json.JSONDecodeError, OSError) as e:
+                print(f"Error migrating deck manifest: {e}")
+            os.remove(old_manifest_path)
+        
+        old_media_dir = os.path.join(self.root_dir, f"{self.username}.media")
+        if os.path.isdir(old_media_dir):
+            os.replace(old_media_dir, os.path.join(staging_dir, "media"))
+        media_store = MediaStore(os.path.join(staging_dir, "media"))
+        if media_store.exists():
+            # Keys were "<username>_<deck>" (or the full file name in older stores)
+            renamed_keys = {get_media_key(old): get_media_key(new) for old, new in renamed.items()}
+            renamed_keys.update((old, get_media_key(new)) for old, new in renamed.items())
+            refs = media_store.get_refs()
+            media_store.refs = {renamed_keys.get(key, key): cards for key, cards in refs.items()}
+            media_store.save_refs()
+        
+        os.replace(staging_dir, self.data_dir)
+    
+    def delete_deck(self, deck_name):
+        """Delete a deck file (in whichever format it is stored)"""
+        deck_path = self.get_user_file_path(deck_name)
+        self.flush()
+        self.saved_paths.discard(deck_path)
+        self.remove_journal(deck_path)
+        for path in (self.get_queue_path(deck_path), self.get_rollup_path(deck_path)):
+            if os.path.exists(path):
+                os.remove(path)
+        self.rollups.pop(deck_path, None)
+        self.media_store.drop_deck(get_media_key(deck_path))
+        deleted = False
+        if self.due_index is not None:
+            for path in self.get_format_paths(deck_path):
+                self.due_index.remove_deck(os.path.basename(path))
+            self.queue_due_index_save()
+        if self.search_index is not None:
+            for path in self.get_format_paths(deck_path):
+                self.search_index.remove_deck(os.path.basename(path))
+            self.queue_search_index_save()
+        for path in self.get_format_paths(deck_path):
+            if self.get_manifest().pop(os.path.basename(path), None):
+                self.queue_manifest_save()
+            if os.path.exists(path):
+                os.remove(path)
+                deleted = True
+        return deleted
+    
+    def rename_deck(self, deck, new_name):
+        """
+        Save a deck under a new name and delete its old file. Its images and
+        daily rollup move along, and its logged reviews are renamed to match.
+        """
+        deck.ensure_loaded()  # Read the cards before their old file is deleted
+        rollup = self.get_rollup(deck)
+        old_name = deck.name
+        self.flush()  # Queued media updates land under the old key before it moves
+        # Moved rather than dropped: deleting the old deck would delete the images its cards still use
+        self.media_store.rename_deck(get_media_key(self.get_user_file_path(old_name)),
+                                     get_media_key(self.get_user_file_path(new_name)))
+        self.delete_deck(old_name)
+        deck.name = new_name
+        self.save_queue.submit(("reviews", None), lambda: self.review_log.rename_deck(old_name, new_name),
+                               coalesce=False)
+        self.rollups[self.get_user_file_path(new_name)] = rollup
+        self.dirty_rollups.add(self.get_user_file_path(new_name))
+        self.save_deck(deck)
+    
     def get_user_stats(self):
-        """Get statistics for the current user"""
-        decks = self.load_decks()
-        total_decks = len(decks)
-        total_cards = sum(len(deck.flashcards) for deck in decks)
-        total_study_time = sum(deck.study_time for deck in decks)
-        
+        """
+        Get statistics for the current user.
+        Comes from the manifest: only decks whose file changed outside this
+        manager, or that were reviewed since their entry was written, are read.
+        """
+        self.flush()
+        manifest = self.get_manifest()
+        filenames = self.list_deck_files()
+        
+        deck_stats = {}
+        for filename in filenames:
+            deck_path = os.path.join(self.data_dir, filename)
+            entry = manifest.get(filename)
+            if not (entry and self.is_manifest_entry_current(deck_path, entry)
+                    and entry.get("stats_journal_size") == entry.get("journal_size")):
+                deck_data, error = try_read_deck_file(deck_path)
+                if error is not None:
+                    print(f"Error loading deck from {filename}: {error}")
+                    continue
+                self.update_manifest_entry(deck_path, deck_data)
+                entry = manifest[filename]
+            deck_stats[entry["name"]] = {
+                "card_count": entry["card_count"],
+                "due_count": count_due(entry["due_days"]),
+                "right_total": entry["right_total"],
+                "wrong_total": entry["wrong_total"],
+                "study_time": entry["study_time"],
+            }
+        self.forget_missing_decks(filenames)
+        return self.combine_deck_stats(deck_stats)
+    
+    def combine_deck_stats(self, deck_stats):
+        """User totals from per-deck statistics ({deck name: stats})"""
+        total_right = sum(stats["right_total"] for stats in deck_stats.values())
+        total_wrong = sum(stats["wrong_total"] for stats in deck_stats.values())
         return {
             "username": self.username,
-            "total_decks": total_decks,
-            "total_cards": total_cards,
-            "total_study_time": total_study_time
+            "total_decks": len(deck_stats),
+            "total_cards": sum(stats["card_count"] for stats in deck_stats.values()),
+            "total_study_time": sum(stats["study_time"] or 0 for stats in deck_stats.values()),
+            "total_due": sum(stats["due_count"] for stats in deck_stats.values()),
+            "total_right": total_right,
+            "total_wrong": total_wrong,
+            "accuracy": total_right / (total_right + total_wrong) if total_right + total_wrong else 0.0,
+            "decks": deck_stats,
         }
 
 
+# Storage backend for user data: "json" (one .txt file per deck) or "sqlite"
+STORAGE_BACKEND = "json"
+
+def create_data_manager(username=None, backend=None):
+    """Create a DataManager for the configured storage backend"""
+    backend = backend or STORAGE_BACKEND
+    with trace.phase("create_data_manager"):
+        if backend == "sqlite":
+            from SQLiteDataManager import SQLiteDataManager
+            return SQLiteDataManager(username)
+        return DataManager(username)
+
+
 # New Flashcard Window
 class AddCardDialog(QDialog):
     def __init__(self, parent=None):
@@ -382,9 +1274,10 @@ class AddCardDialog(QDialog):
 
 # Edit Card Window
 class EditCardDialog(QDialog):
-    def __init__(self, card, parent=None):
+    def __init__(self, card, parent=None, media_store=None):
         super().__init__(parent)
         self.card = card
+        self.media_store = media_store  # Resolves media references so images show while editing
         self.selected_difficulty = card.difficulty
         self.difficulty_buttons = []
         self.init_ui()
@@ -401,7 +1294,7 @@ class EditCardDialog(QDialog):
         self.front_text = QTextEdit()
         self.front_text.setMaximumHeight(100)
         self.front_text.setAcceptRichText(True)
-        self.front_text.setHtml(self.card.front)
+        self.front_text.setHtml(self.resolve_html(self.card.front))
         self.insert_front_image_btn = QPushButton("Insert Image")
         self.insert_front_image_btn.clicked.connect(lambda: self.insert_image(self.front_text))
         front_layout.addWidget(self.front_text)
@@ -415,7 +1308,7 @@ class EditCardDialog(QDialog):
         self.back_text = QTextEdit()
         self.back_text.setMaximumHeight(100)
         self.back_text.setAcceptRichText(True)
-        self.back_text.setHtml(self.card.back)
+        self.back_text.setHtml(self.resolve_html(self.card.back))
         self.insert_back_image_btn = QPushButton("Insert Image")
         self.insert_back_image_btn.clicked.connect(lambda: self.insert_image(self.back_text))
         back_layout.addWidget(self.back_text)
@@ -428,7 +1321,7 @@ class EditCardDialog(QDialog):
         notes_layout = QVBoxLayout()
         self.notes_text = QTextEdit()
         self.notes_text.setAcceptRichText(True)
-        self.notes_text.setHtml(self.card.notes)
+        self.notes_text.setHtml(self.resolve_html(self.card.notes))
         self.insert_notes_image_btn = QPushButton("Insert Image")
         self.insert_notes_image_btn.clicked.connect(lambda: self.insert_image(self.notes_text))
         notes_layout.addWidget(self.notes_text)
@@ -476,6 +1369,9 @@ class EditCardDialog(QDialog):
         
         self.setLayout(layout)
     
+    def resolve_html(self, html):
+        return self.media_store.resolve_html(html) if self.media_store else html
+    
     def insert_image(self, text_edit):
         """Insert image into the specified text edit"""
         image = ImageHandler.load_image_from_file(self)
@@ -511,11 +1407,12 @@ class EditCardDialog(QDialog):
 
 # Card Manager Window
 class ManageCardsDialog(QDialog):
-    def __init__(self, deck, parent=None):
+    def __init__(self, deck, parent=None, media_store=None):
         super().__init__(parent)
         self.deck = deck
+        self.media_store = media_store
+        self.card_model = CardListModel(deck, self)
         self.init_ui()
-        self.populate_cards()
         
     def init_ui(self):
         self.setWindowTitle(f"Manage Flashcards - {self.deck.name}")
@@ -528,9 +1425,21 @@ class ManageCardsDialog(QDialog):
         header_label.setStyleSheet("font-size: 16px; font-weight: bold;")
         layout.addWidget(header_label)
         
-        # Card list
-        self.card_list = QListWidget()
+        # Sort order
+        sort_layout = QHBoxLayout()
+        sort_layout.addWidget(QLabel("Sort by:"))
+        self.sort_combo = QComboBox()
+        self.sort_combo.addItems(list(SORT_KEYS))
+        self.sort_combo.currentTextChanged.connect(self.card_model.sort_by)
+        sort_layout.addWidget(self.sort_combo)
+        sort_layout.addStretch()
+        layout.addLayout(sort_layout)
+        
+        # Card list (rows are fetched as the list scrolls)
+        self.card_list = QListView()
+        self.card_list.setModel(self.card_model)
         self.card_list.setAlternatingRowColors(True)
+        self.card_list.setUniformItemSizes(True)
         layout.addWidget(self.card_list)
         
         # Buttons
@@ -558,19 +1467,14 @@ class ManageCardsDialog(QDialog):
         
         self.setLayout(layout)
     
-    # Refresh card list when it's updated
-    def populate_cards(self):
-        self.card_list.clear()
-        for card in self.deck.flashcards:
-            # Extract plain text from HTML
-            from PyQt6.QtGui import QTextDocument
-            doc = QTextDocument()
-            doc.setHtml(card.front)
-            plain_text = doc.toPlainText()
-            
-            item = QListWidgetItem(f"Q: {plain_text[:30]}{'...' if len(plain_text) > 30 else ''} (Difficulty: {card.difficulty})")
-            item.setData(Qt.ItemDataRole.UserRole, card.id)
-            self.card_list.addItem(item)
+    def get_selected_card(self):
+        """The card selected in the list (None if there is no selection)"""
+        index = self.card_list.currentIndex()
+        return self.card_model.card_at(index.row()) if index.isValid() else None
+    
+    def select_row(self, row):
+        if row is not None and row < self.card_model.rowCount():
+            self.card_list.setCurrentIndex(self.card_model.index(row))
     
     def add_card(self):
         dialog = AddCardDialog(self)
@@ -586,44 +1490,42 @@ class ManageCardsDialog(QDialog):
             new_card.difficulty = card_data["difficulty"]
             
             # Update the list
-            self.populate_cards()
+            self.select_row(self.card_model.card_added(new_card))
             
             # Return True to tell that the deck was modified
             self.setResult(QDialog.DialogCode.Accepted)
     
     def edit_card(self):
-        if not self.card_list.currentItem():
+        card = self.get_selected_card()
+        if not card:
             QMessageBox.warning(self, "Warning", "Please select a card to edit.")
             return
             
-        card_id = self.card_list.currentItem().data(Qt.ItemDataRole.UserRole)
-        card = next((card for card in self.deck.flashcards if card.id == card_id), None)
-        
-        if card:
-            dialog = EditCardDialog(card, self)
-            if dialog.exec():
-                card_data = dialog.get_card_data()
-                if not card_data["front"] or not card_data["back"]:
-                    QMessageBox.warning(self, "Warning", "The front and back of the card cannot be empty.")
-                    return
-                    
-                card.front = card_data["front"]
-                card.back = card_data["back"]
-                card.notes = card_data["notes"]
-                card.difficulty = card_data["difficulty"]
-                
-                # Update the list display
-                self.populate_cards()
+        dialog = EditCardDialog(card, self, self.media_store)
+        if dialog.exec():
+            card_data = dialog.get_card_data()
+            if not card_data["front"] or not card_data["back"]:
+                QMessageBox.warning(self, "Warning", "The front and back of the card cannot be empty.")
+                return
                 
-                # Return True to tell that the deck was modified
-                self.setResult(QDialog.DialogCode.Accepted)
-    
+            card.front = card_data["front"]
+            card.back = card_data["back"]
+            card.notes = card_data["notes"]
+            card.difficulty = card_data["difficulty"]
+            
+            # Update the list display
+            self.select_row(self.card_model.card_edited(card))
+            
+            # Return True to tell that the deck was modified
+            self.setResult(QDialog.DialogCode.Accepted)
+
     def delete_card(self):
-        if not self.card_list.currentItem():
+        card = self.get_selected_card()
+        if not card:
             QMessageBox.warning(self, "Warning", "Please select a card to delete.")
             return
             
-        card_id = self.card_list.currentItem().data(Qt.ItemDataRole.UserRole)
+        card_id = card.id
         
         confirm = QMessageBox.question(
             self, 
@@ -633,8 +1535,7 @@ class ManageCardsDialog(QDialog):
         )
         
         if confirm == QMessageBox.StandardButton.Yes:
-            self.deck.remove_flashcard(card_id)
-            self.populate_cards()
+            self.card_model.remove_card(card_id)
             
             # Return True to tell that the deck was modified
             self.setResult(QDialog.DialogCode.Accepted)
@@ -696,7 +1597,8 @@ class RenameDeckDialog(QDialog):
     def __init__(self, deck, parent=None):
         super().__init__(parent)
         self.deck = deck
-        self.data_manager = DataManager()
+        # Use the owner's (user-specific) data manager so the old deck is removed from the right store
+        self.data_manager = getattr(parent, "data_manager", None) or DataManager()
         self.init_ui()
         
     def init_ui(self):
@@ -729,10 +1631,72 @@ class RenameDeckDialog(QDialog):
         new_name = self.get_deck_data()["name"]
         
         if new_name and new_name != self.deck.name:
-            self.data_manager.delete_deck(self.deck.name)
-            self.deck.name = new_name
+            self.data_manager.rename_deck(self.deck, new_name)
         super().accept()
 
+# Card Search Dialog
+class SearchDialog(QDialog):
+    def __init__(self, data_manager, parent=None):
+        super().__init__(parent)
+        self.data_manager = data_manager
+        # Search once typing pauses, not on every key
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.run_search)
+        self.init_ui()
+        
+    def init_ui(self):
+        self.setWindowTitle("Search Cards")
+        self.setMinimumSize(500, 400)
+        layout = QVBoxLayout()
+        
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("Search the front, back and notes of all cards...")
+        self.query_edit.textChanged.connect(self.search_timer.start)
+        layout.addWidget(self.query_edit)
+        
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        
+        self.result_list = QListWidget()
+        self.result_list.itemDoubleClicked.connect(self.accept)
+        layout.addWidget(self.result_list)
+        
+        # Buttons
+        btn_layout = QHBoxLayout()
+        self.cancel_btn = QPushButton("Close")
+        self.cancel_btn.clicked.connect(self.reject)
+        self.open_btn = QPushButton("Open Card")
+        self.open_btn.clicked.connect(self.accept)
+        btn_layout.addWidget(self.cancel_btn)
+        btn_layout.addWidget(self.open_btn)
+        layout.addLayout(btn_layout)
+        
+        self.setLayout(layout)
+    
+    def run_search(self):
+        """Show the cards matching the query (read from the search index, not the deck files)"""
+        self.result_list.clear()
+        query = self.query_edit.text().strip()
+        if not query:
+            self.status_label.setText("")
+            return
+        results = self.data_manager.search_cards(query)
+        for deck_name, card_id, preview in results:
+            item = QListWidgetItem(f"[{deck_name}] {preview}")
+            item.setData(Qt.ItemDataRole.UserRole, (deck_name, card_id))
+            self.result_list.addItem(item)
+        more = "+" if len(results) == SEARCH_LIMIT else ""
+        self.status_label.setText(f"{len(results)}{more} card(s) found")
+        if results:
+            self.result_list.setCurrentRow(0)
+    
+    def get_selected_result(self):
+        """(deck name, card id) of the selected result (None if nothing is selected)"""
+        item = self.result_list.currentItem()
+        return item.data(Qt.ItemDataRole.UserRole) if item else None
+
 # User Profile Dialog
 class UserProfileDialog(QDialog):
     def __init__(self, username, user_manager, parent=None):
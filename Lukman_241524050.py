@@ -11,6 +11,7 @@ class NotesPanel(QWidget):
         super().__init__(parent) 
         self.current_card = None
         self.is_visible = False
+        self.media_store = None  # Set by the app; resolves media references in notes
         self.init_ui()
         
     # Modele for Initialize User Interface
@@ -51,7 +52,7 @@ class NotesPanel(QWidget):
     def set_card(self, card):
         self.current_card = card #Obj card
         if card:
-            self.notes_text.setHtml(card.notes) 
+            self.notes_text.setHtml(self.media_store.resolve_html(card.notes) if self.media_store else card.notes)
             self.setEnabled(True)
         else:
             self.notes_text.setHtml("")
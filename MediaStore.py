@@ -0,0 +1,190 @@
+import os, re, json, mmap, base64, hashlib
+from collections import Counter
+
+# <img src="data:image/png;base64,..."> as produced by ImageHandler.image_to_base64
+DATA_URI_PATTERN = re.compile(r'src=(["\'])data:image/([\w.+-]+);base64,([^"\']*)\1')
+# <img src="media:<sha256>.<ext>"> stored in cards once the image lives in the media store
+MEDIA_REF_PATTERN = re.compile(r'src=(["\'])media:([0-9a-f]{64}\.\w+)\1')
+
+CARD_HTML_FIELDS = ("front", "back", "notes")
+
+
+class MediaStore:
+    """
+    Per-user, content-addressed image store.
+    Images are saved once as <media_dir>/<sha256>.<ext> and cards hold short
+    "media:<name>" references instead of inline base64 data URIs. refs.json
+    records which media each card uses so unreferenced files can be removed.
+    """
+    def __init__(self, media_dir):
+        self.media_dir = media_dir
+        self.refs_path = os.path.join(media_dir, "refs.json")
+        self.refs = None  # deck key -> {card id -> [media names]}
+        self.counts = Counter()  # media name -> number of card references
+
+    def exists(self):
+        """True once the store has been set up (i.e. existing decks were migrated)"""
+        return os.path.exists(self.refs_path)
+
+    def get_refs(self):
+        """Return the reference table, reading it from disk the first time"""
+        if self.refs is None:
+            self.refs = {}
+            if os.path.exists(self.refs_path):
+                try:
+                    with open(self.refs_path, 'r', encoding='utf-8') as f:
+                        self.refs = json.load(f)
+                except (json.JSONDecodeError, OSError) as e:
+                    print(f"Error loading media references: {e}")
+            self.counts = Counter(name for cards in self.refs.values()
+                                  for names in cards.values() for name in names)
+        return self.refs
+
+    def get_media_path(self, name):
+        return os.path.join(self.media_dir, name)
+
+    def extract_html(self, html, blobs):
+        """
+        Replace inline data-URI images in html with media references.
+        Decoded images are added to blobs (name -> bytes) for store_blobs().
+        """
+        if not html or "data:image/" not in html:
+            return html
+
+        def replace(match):
+            quote, subtype, payload = match.groups()
+            try:
+                data = base64.b64decode(payload)
+            except ValueError:
+                return match.group(0)
+            extension = "jpg" if subtype == "jpeg" else re.sub(r'\W', '', subtype) or "bin"
+            name = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+            blobs[name] = data
+            return f'src={quote}media:{name}{quote}'
+
+        return DATA_URI_PATTERN.sub(replace, html)
+
+    def externalize_card(self, card, blobs):
+        """Move a card's inline images into blobs; returns the media names it references"""
+        names = set()
+        for field in CARD_HTML_FIELDS:
+            html = self.extract_html(getattr(card, field), blobs)
+            setattr(card, field, html)
+            if html and "media:" in html:
+                names.update(match.group(2) for match in MEDIA_REF_PATTERN.finditer(html))
+        return sorted(names)
+
+    def externalize_deck(self, deck, blobs):
+        """externalize_card() for every card; returns {card id: media names} for cards with images"""
+        card_refs = {}
+        for card in deck.flashcards:
+            names = self.externalize_card(card, blobs)
+            if names:
+                card_refs[card.id] = names
+        return card_refs
+
+    def has_card_refs(self, deck_key, card_id):
+        return card_id in self.get_refs().get(deck_key, {})
+
+    def store_blobs(self, blobs):
+        """Write new media files (identical images share one file)"""
+        os.makedirs(self.media_dir, exist_ok=True)
+        for name, data in blobs.items():
+            path = self.get_media_path(name)
+            if not os.path.exists(path):
+                temp_path = path + ".tmp"
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+
+    def update_refs(self, deck_key, card_refs, blobs, replace_deck=False):
+        """
+        Record the media used by some cards of a deck (all of them if
+        replace_deck), store new blobs and delete media nobody uses any more.
+        """
+        refs = self.get_refs()
+        self.store_blobs(blobs)
+
+        deck_refs = refs.setdefault(deck_key, {})
+        old_names = Counter()
+        if replace_deck:
+            old_names.update(name for names in deck_refs.values() for name in names)
+            deck_refs.clear()
+        for card_id, names in card_refs.items():
+            old_names.update(deck_refs.pop(card_id, []))
+            if names:
+                deck_refs[card_id] = list(names)
+        if not deck_refs:
+            del refs[deck_key]
+
+        self.counts.subtract(old_names)
+        self.counts.update(name for names in card_refs.values() for name in names)
+        self.collect_garbage(old_names)
+        self.save_refs()
+
+    def drop_deck(self, deck_key):
+        """Forget a deleted deck's references"""
+        deck_refs = self.get_refs().pop(deck_key, None)
+        if deck_refs is None:
+            return
+        old_names = Counter(name for names in deck_refs.values() for name in names)
+        self.counts.subtract(old_names)
+        self.collect_garbage(old_names)
+        self.save_refs()
+
+    def rename_deck(self, old_key, new_key):
+        """Move a renamed deck's references to its new key (its media stay where they are)"""
+        refs = self.get_refs()
+        deck_refs = refs.pop(old_key, None)
+        if deck_refs is None:
+            return
+        self.drop_deck(new_key)  # Stale references of an earlier deck with the new name
+        refs[new_key] = deck_refs
+        self.save_refs()
+
+    def collect_garbage(self, names):
+        """Delete media files among names that are no longer referenced"""
+        for name in names:
+            if self.counts[name] <= 0:
+                del self.counts[name]
+                path = self.get_media_path(name)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def save_refs(self):
+        os.makedirs(self.media_dir, exist_ok=True)
+        temp_path = self.refs_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.get_refs(), f)
+        os.replace(temp_path, self.refs_path)
+
+    def read_media(self, name):
+        """Base64 of a media file, read through a memory map"""
+        with open(self.get_media_path(name), 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return base64.b64encode(data).decode('ascii')
+
+    def resolve_html(self, html):
+        """Turn media references back into data URIs so Qt can display the images"""
+        if not html or "media:" not in html:
+            return html
+
+        def replace(match):
+            quote, name = match.groups()
+            try:
+                payload = self.read_media(name)
+            except (OSError, ValueError):
+                return match.group(0)
+            subtype = "jpeg" if name.endswith(".jpg") else name.rsplit(".", 1)[1]
+            return f'src={quote}data:image/{subtype};base64,{payload}{quote}'
+
+        return MEDIA_REF_PATTERN.sub(replace, html)
+
+    def inline_deck_data(self, deck_data):
+        """Copy of a deck dict with every media reference inlined (for export)"""
+        deck_data = dict(deck_data)
+        deck_data["flashcards"] = [
+            dict(card, **{field: self.resolve_html(card.get(field, "")) for field in CARD_HTML_FIELDS})
+            for card in deck_data.get("flashcards", [])
+        ]
+        return deck_data
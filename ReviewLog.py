@@ -0,0 +1,163 @@
+"""
+Review event log layout (all integers little-endian):
+
+    reviews/strings.txt   deck names and card ids, one JSON string per line;
+                          records refer to them by line number
+    reviews/YYYY-MM.log   the reviews of one month, fixed-width records (see
+                          RECORD) appended in the order they happen
+"""
+import bisect, json, os, struct
+from collections import namedtuple
+from Timestamps import timestamp_to_datetime
+
+# timestamp (seconds since EPOCH), deck name, card id (string numbers),
+# right (1) or wrong (0), difficulty, response time in ms, retention score before and after
+RECORD = struct.Struct("<dIIBBIdd")
+
+ReviewEvent = namedtuple("ReviewEvent", ["timestamp", "deck", "card_id", "is_right", "difficulty",
+                                         "response_ms", "retention_before", "retention_after"])
+
+
+def month_of(timestamp):
+    """Partition name ("YYYY-MM") of a timestamp"""
+    return timestamp_to_datetime(timestamp).strftime("%Y-%m")
+
+
+class ReviewLog:
+    """
+    Append-only store of every review, partitioned by month. A query only
+    reads the months its time range touches; a month once read stays in
+    memory with an index from card id to its reviews.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.strings = None  # string number -> text, read on first use
+        self.string_numbers = None  # text -> string number
+        self.partitions = {}  # "YYYY-MM" -> {"events": [...], "timestamps": [...], "cards": {card id: [row]}}
+
+    def get_strings_path(self):
+        return os.path.join(self.directory, "strings.txt")
+
+    def get_partition_path(self, month):
+        return os.path.join(self.directory, f"{month}.log")
+
+    def load_strings(self):
+        if self.strings is None:
+            self.strings, self.string_numbers = [], {}
+            if os.path.exists(self.get_strings_path()):
+                with open(self.get_strings_path(), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            text = json.loads(line)
+                        except json.JSONDecodeError:
+                            break  # Torn last line from an interrupted append
+                        self.string_numbers.setdefault(text, len(self.strings))
+                        self.strings.append(text)
+        return self.strings
+
+    def string_number(self, text):
+        """Number of a deck name or card id, adding it to the string table if it is new"""
+        self.load_strings()
+        number = self.string_numbers.get(text)
+        if number is None:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.get_strings_path(), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(text, ensure_ascii=False) + "\n")
+            number = self.string_numbers[text] = len(self.strings)
+            self.strings.append(text)
+        return number
+
+    def append(self, event):
+        """Append one ReviewEvent to its month (called from the save queue)"""
+        record = RECORD.pack(event.timestamp, self.string_number(event.deck), self.string_number(event.card_id),
+                             1 if event.is_right else 0, event.difficulty, event.response_ms,
+                             event.retention_before, event.retention_after)
+        month = month_of(event.timestamp)
+        with open(self.get_partition_path(month), 'ab') as f:
+            # Drop a record left half-written by an interrupted append
+            if f.tell() % RECORD.size:
+                f.truncate(f.tell() - f.tell() % RECORD.size)
+                f.seek(0, os.SEEK_END)
+            f.write(record)
+        if month in self.partitions:
+            self.add_to_partition(self.partitions[month], event)
+
+    def rename_deck(self, old_name, new_name):
+        """Credit a deck's logged reviews to its new name (called from the save queue)"""
+        self.load_strings()
+        if old_name not in self.string_numbers:
+            return
+        strings = [new_name if text == old_name else text for text in self.strings]
+        temp_path = self.get_strings_path() + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(text, ensure_ascii=False) + "\n" for text in strings)
+        os.replace(temp_path, self.get_strings_path())
+        self.strings, self.string_numbers = strings, {}
+        for number, text in enumerate(strings):
+            self.string_numbers.setdefault(text, number)
+        for partition in self.partitions.values():
+            partition["events"] = [event._replace(deck=new_name) if event.deck == old_name else event
+                                   for event in partition["events"]]
+
+    def months(self):
+        """Names of the months that have reviews, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(self.directory) if name.endswith(".log"))
+
+    def add_to_partition(self, partition, event):
+        row = len(partition["events"])
+        partition["events"].append(event)
+        partition["timestamps"].append(event.timestamp)
+        partition["cards"].setdefault(event.card_id, []).append(row)
+        # Reviews are appended as they happen; a clock set back breaks the order
+        partition["ordered"] = partition["ordered"] and (row == 0 or partition["timestamps"][row - 1] <= event.timestamp)
+
+    def get_partition(self, month):
+        """The reviews of one month, read from disk the first time"""
+        partition = self.partitions.get(month)
+        if partition is None:
+            partition = {"events": [], "timestamps": [], "cards": {}, "ordered": True}
+            strings = self.load_strings()
+            with open(self.get_partition_path(month), 'rb') as f:
+                data = f.read()
+            data = data[:len(data) - len(data) % RECORD.size]
+            for timestamp, deck, card_id, is_right, difficulty, response_ms, before, after in RECORD.iter_unpack(data):
+                self.add_to_partition(partition, ReviewEvent(timestamp, strings[deck], strings[card_id], bool(is_right),
+                                                             difficulty, response_ms, before, after))
+            self.partitions[month] = partition
+        return partition
+
+    def scan(self, start=None, end=None):
+        """Reviews with start <= timestamp < end (either may be None), oldest first"""
+        first = month_of(start) if start is not None else None
+        last = month_of(end) if end is not None else None
+        events = []
+        for month in self.months():
+            if (first and month < first) or (last and month > last):
+                continue
+            partition = self.get_partition(month)
+            if partition["ordered"]:
+                low = bisect.bisect_left(partition["timestamps"], start) if start is not None else 0
+                high = bisect.bisect_left(partition["timestamps"], end) if end is not None else len(partition["events"])
+                events.extend(partition["events"][low:high])
+            else:
+                events.extend(event for event in partition["events"]
+                              if (start is None or event.timestamp >= start) and (end is None or event.timestamp < end))
+        return events
+
+    def card_history(self, card_id, deck=None, start=None, end=None):
+        """Reviews of one card (optionally only in one deck and a time range), oldest first"""
+        first = month_of(start) if start is not None else None
+        last = month_of(end) if end is not None else None
+        events = []
+        for month in self.months():
+            if (first and month < first) or (last and month > last):
+                continue
+            partition = self.get_partition(month)
+            for row in partition["cards"].get(card_id, ()):
+                event = partition["events"][row]
+                if ((deck is None or event.deck == deck) and (start is None or event.timestamp >= start)
+                        and (end is None or event.timestamp < end)):
+                    events.append(event)
+        return events
@@ -0,0 +1,336 @@
+import os, sqlite3, threading
+from datetime import date, timedelta
+from itertools import groupby
+from Ido_241524047 import Deck, DataManager, get_media_key, get_search_fields, FORECAST_DAYS
+from Cards import Flashcard
+from Timestamps import timestamp_to_iso, end_of_day_timestamp
+from SearchIndex import SearchIndex
+
+# Card columns in the same order as Flashcard.to_dict() (minus the id)
+CARD_FIELDS = ("front", "back", "notes", "right_count", "wrong_count", "difficulty",
+               "retention_score", "last_reviewed", "next_review")
+
+# Columns touched by a review, written by save_card() as a single-row upsert
+REVIEW_FIELDS = ("notes", "right_count", "wrong_count", "difficulty",
+                 "retention_score", "last_reviewed", "next_review")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS decks (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    study_time INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (user_id, name)
+);
+CREATE TABLE IF NOT EXISTS cards (
+    deck_id INTEGER NOT NULL REFERENCES decks(id) ON DELETE CASCADE,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    front TEXT NOT NULL DEFAULT '',
+    back TEXT NOT NULL DEFAULT '',
+    notes TEXT NOT NULL DEFAULT '',
+    right_count INTEGER NOT NULL DEFAULT 0,
+    wrong_count INTEGER NOT NULL DEFAULT 0,
+    difficulty INTEGER NOT NULL DEFAULT 1,
+    retention_score REAL NOT NULL DEFAULT 0.0,
+    last_reviewed TEXT,
+    next_review TEXT,
+    PRIMARY KEY (deck_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_decks_user ON decks (user_id);
+CREATE INDEX IF NOT EXISTS idx_cards_deck ON cards (deck_id, position);
+CREATE INDEX IF NOT EXISTS idx_cards_next_review ON cards (next_review);
+"""
+
+
+# Data Manager (stores decks in a SQLite database)
+class SQLiteDataManager(DataManager):
+    def __init__(self, username=None):
+        """
+        Initialize a SQLite-backed DataManager for a specific user.
+        Has the same surface as DataManager; on first use the user's
+        existing JSON deck files are imported into the database.
+        """
+        super().__init__(username)
+        # One database for all users, next to the per-user directories
+        self.db_path = os.path.join(self.root_dir, "flashcards.db")
+        # Writes run on the save queue's thread, reads on the caller's
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.db_lock = threading.RLock()
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.deck_ids = {}  # deck name -> decks.id, so save_card skips the lookup
+
+        is_new_user = self.get_user_id() is None
+        self.user_id = self.get_user_id(create=True)
+        if is_new_user:
+            self.import_json_decks()
+
+    def get_user_id(self, create=False):
+        """Return the users.id row for the current user (None if missing)"""
+        username = self.username or ""
+        row = self.conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+        if row:
+            return row[0]
+        if not create:
+            return None
+        with self.conn:
+            cursor = self.conn.execute("INSERT INTO users (username) VALUES (?)", (username,))
+        return cursor.lastrowid
+
+    def import_json_decks(self):
+        """Copy decks stored by the JSON DataManager into the database"""
+        json_store = DataManager(self.username)
+        for deck in json_store.load_decks():
+            self.save_deck(deck)
+
+    def get_deck_id(self, deck_name, create=False, study_time=0):
+        """Return the decks.id row for a deck name (None if missing)"""
+        if deck_name in self.deck_ids:
+            return self.deck_ids[deck_name]
+        row = self.conn.execute(
+            "SELECT id FROM decks WHERE user_id = ? AND name = ?", (self.user_id, deck_name)
+        ).fetchone()
+        if row:
+            deck_id = row[0]
+        elif create:
+            deck_id = self.conn.execute(
+                "INSERT INTO decks (user_id, name, study_time) VALUES (?, ?, ?)",
+                (self.user_id, deck_name, study_time or 0),
+            ).lastrowid
+        else:
+            return None
+        self.deck_ids[deck_name] = deck_id
+        return deck_id
+
+    def get_media_key(self, deck_name):
+        """Media store key of a deck (same as the JSON store's, so both share references)"""
+        return get_media_key(self.get_user_file_path(deck_name))
+
+    def save_deck(self, deck):
+        """Queue a save of a deck and all of its cards (one transaction)"""
+        blobs = {}
+        card_refs = self.media_store.externalize_deck(deck, blobs)
+        deck_name, study_time = deck.name, deck.study_time or 0
+        cards = [card.to_dict() for card in deck.flashcards]  # Snapshot on the caller's thread
+        self.save_queue.submit(("deck", deck_name), lambda: self.write_deck_rows(deck_name, study_time, cards))
+        deck_key = self.get_media_key(deck_name)
+        self.save_queue.submit(("media", deck_key),
+                               lambda: self.media_store.update_refs(deck_key, card_refs, blobs, replace_deck=True),
+                               coalesce=False)
+        self.queue_rollup_saves(self.get_user_file_path(deck_name))
+        if self.search_index is not None:
+            self.search_index.set_deck(deck_name, deck_name, get_search_fields(deck.flashcards))
+
+    def write_deck_rows(self, deck_name, study_time, cards):
+        """Write a deck snapshot (runs on the save queue)"""
+        with self.db_lock, self.conn:
+            deck_id = self.get_deck_id(deck_name, create=True, study_time=study_time)
+            self.conn.execute("UPDATE decks SET study_time = ? WHERE id = ?", (study_time, deck_id))
+
+            rows = [(deck_id, data["id"], position) + tuple(data[field] for field in CARD_FIELDS)
+                    for position, data in enumerate(cards)]
+            columns = ", ".join(CARD_FIELDS)
+            updates = ", ".join(f"{field} = excluded.{field}" for field in ("position",) + CARD_FIELDS)
+            self.conn.executemany(
+                f"INSERT INTO cards (deck_id, id, position, {columns}) "
+                f"VALUES (?, ?, ?{', ?' * len(CARD_FIELDS)}) "
+                f"ON CONFLICT (deck_id, id) DO UPDATE SET {updates}",
+                rows,
+            )
+
+            # Drop cards that were removed from the deck since the last save
+            stored_ids = {row[0] for row in self.conn.execute("SELECT id FROM cards WHERE deck_id = ?", (deck_id,))}
+            removed_ids = stored_ids - {data["id"] for data in cards}
+            self.conn.executemany("DELETE FROM cards WHERE deck_id = ? AND id = ?",
+                                  [(deck_id, card_id) for card_id in removed_ids])
+
+    def save_card(self, deck, card):
+        """Queue a save of a single reviewed card (a one-row write)"""
+        deck_key, blobs = self.get_media_key(deck.name), {}
+        names = self.media_store.externalize_card(card, blobs)
+        if names or self.media_store.has_card_refs(deck_key, card.id):
+            self.save_queue.submit(("media", deck_key),
+                                   lambda: self.media_store.update_refs(deck_key, {card.id: names}, blobs),
+                                   coalesce=False)
+        self.requeue_card(deck, card)
+        deck_name, study_time, data = deck.name, deck.study_time or 0, card.to_dict()
+        self.save_queue.submit(("deck", deck_name), lambda: self.write_card_row(deck_name, study_time, data),
+                               coalesce=False)
+        if self.search_index is not None:
+            self.search_index.update_card(deck_name, card.id, card.front, card.back, card.notes)
+
+    def write_card_row(self, deck_name, study_time, data):
+        """Write one card row (runs on the save queue)"""
+        columns = ", ".join(CARD_FIELDS)
+        updates = ", ".join(f"{field} = excluded.{field}" for field in REVIEW_FIELDS)
+        with self.db_lock, self.conn:
+            deck_id = self.get_deck_id(deck_name, create=True, study_time=study_time)
+            # A card the database hasn't seen yet is appended after the deck's last card
+            self.conn.execute(
+                f"INSERT INTO cards (deck_id, id, position, {columns}) "
+                f"VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM cards WHERE deck_id = ?)"
+                f"{', ?' * len(CARD_FIELDS)}) "
+                f"ON CONFLICT (deck_id, id) DO UPDATE SET {updates}",
+                (deck_id, data["id"], deck_id) + tuple(data[field] for field in CARD_FIELDS),
+            )
+
+    def get_due_queue(self, deck):
+        """The deck's due queue (not saved for the database; built from the cards)"""
+        return deck.get_due_queue()
+
+    def get_due_cards(self, until=None):
+        """(deck name, card id) of every card due before `until` across all decks (from the next_review index)"""
+        self.flush()
+        until = end_of_day_timestamp() if until is None else until
+        with self.db_lock:
+            return self.conn.execute(
+                "SELECT decks.name, cards.id FROM cards JOIN decks ON decks.id = cards.deck_id "
+                "WHERE decks.user_id = ? AND cards.next_review < ? ORDER BY cards.next_review, cards.rowid",
+                (self.user_id, timestamp_to_iso(until)),
+            ).fetchall()
+    
+    def peek_due_cards(self, count, skip=(), until=None):
+        """The first `count` of get_due_cards(until), leaving out the cards in skip (read off the next_review index)"""
+        self.flush()
+        until = end_of_day_timestamp() if until is None else until
+        cards = []
+        with self.db_lock:
+            # Every card in skip can take up at most one of the rows
+            rows = self.conn.execute(
+                "SELECT decks.name, cards.id FROM cards JOIN decks ON decks.id = cards.deck_id "
+                "WHERE decks.user_id = ? AND cards.next_review < ? ORDER BY cards.next_review, cards.rowid LIMIT ?",
+                (self.user_id, timestamp_to_iso(until), count + len(skip)),
+            )
+            for card in rows:
+                if len(cards) == count:
+                    break
+                if card not in skip:
+                    cards.append(card)
+        return cards
+    
+    def get_forecast(self, days=FORECAST_DAYS, day=None):
+        """Cards coming due per day for the next `days` days, per deck and in total (counted by the database)"""
+        self.flush()
+        day = day or date.today()
+        end = (day + timedelta(days=days)).isoformat()
+        with self.db_lock:
+            names = [row[0] for row in self.conn.execute(
+                "SELECT name FROM decks WHERE user_id = ? ORDER BY id", (self.user_id,))]
+            rows = self.conn.execute(
+                "SELECT decks.name, MAX(0, CAST(julianday(cards.next_review) - julianday(?) AS INTEGER)), COUNT(*) "
+                "FROM cards JOIN decks ON decks.id = cards.deck_id "
+                "WHERE decks.user_id = ? AND cards.next_review < ? GROUP BY 1, 2",
+                (day.isoformat(), self.user_id, end),
+            ).fetchall()
+        decks = {name: [0] * days for name in names}
+        for name, offset, count in rows:
+            if offset is not None and offset < days:
+                decks[name][offset] += count
+        return self.combine_forecasts(day, days, decks)
+    
+    def get_search_index(self):
+        """
+        Search index of all the user's decks, built from the database the
+        first time it is needed (one query; it isn't written to disk) and
+        kept up to date by save_deck/save_card from then on
+        """
+        if self.search_index is None:
+            self.flush()
+            index = SearchIndex()
+            with self.db_lock:
+                rows = self.conn.execute(
+                    "SELECT decks.name, cards.id, cards.front, cards.back, cards.notes "
+                    "FROM cards JOIN decks ON decks.id = cards.deck_id "
+                    "WHERE decks.user_id = ? ORDER BY decks.id, cards.position",
+                    (self.user_id,),
+                ).fetchall()
+            for deck_name, cards in groupby(rows, key=lambda row: row[0]):
+                index.set_deck(deck_name, deck_name, (row[1:] for row in cards))
+            self.search_index = index
+        return self.search_index
+    
+    def select_deck_cards(self, deck_id):
+        """Read the cards of one deck (called when a lazy deck is first opened)"""
+        self.flush()
+        columns = ", ".join(CARD_FIELDS)
+        with self.db_lock:
+            rows = self.conn.execute(
+                f"SELECT id, {columns} FROM cards WHERE deck_id = ? ORDER BY position", (deck_id,)
+            ).fetchall()
+        return [Flashcard(id=row[0], **dict(zip(CARD_FIELDS, row[1:]))) for row in rows]
+
+    def load_decks(self):
+        """Load all decks for the current user (cards are read when a deck is first opened)"""
+        self.flush()
+        if not self.media_store.exists():
+            self.migrate_media_rows()
+        self.media_store.get_refs()
+        decks = []
+        with self.db_lock:
+            rows = self.conn.execute(
+                "SELECT id, name, study_time FROM decks WHERE user_id = ? ORDER BY id", (self.user_id,)
+            ).fetchall()
+        for deck_id, name, study_time in rows:
+            self.deck_ids[name] = deck_id
+            decks.append(Deck(name=name, study_time=study_time,
+                              loader=lambda deck_id=deck_id: self.select_deck_cards(deck_id)))
+        return decks
+
+    def migrate_media_rows(self):
+        """One-time move of inline data-URI images from stored cards into the media store"""
+        with self.db_lock:
+            rows = self.conn.execute("SELECT id, name, study_time FROM decks WHERE user_id = ?",
+                                     (self.user_id,)).fetchall()
+        for deck_id, name, study_time in rows:
+            self.save_deck(Deck(name=name, study_time=study_time, flashcards=self.select_deck_cards(deck_id)))
+        # Creates refs.json even when no card had images, marking the migration done
+        self.save_queue.submit(("media", None), self.media_store.save_refs)
+        self.flush()
+
+    def delete_deck(self, deck_name):
+        """Delete a deck and its cards"""
+        self.flush()
+        with self.db_lock:
+            deck_id = self.get_deck_id(deck_name)
+            if deck_id is None:
+                return False
+            with self.conn:
+                self.conn.execute("DELETE FROM decks WHERE id = ?", (deck_id,))
+            self.deck_ids.pop(deck_name, None)
+        self.media_store.drop_deck(self.get_media_key(deck_name))
+        if self.search_index is not None:
+            self.search_index.remove_deck(deck_name)
+        rollup_path = self.get_rollup_path(self.get_user_file_path(deck_name))
+        if os.path.exists(rollup_path):
+            os.remove(rollup_path)
+        self.rollups.pop(self.get_user_file_path(deck_name), None)
+        return True
+
+    def get_user_stats(self):
+        """Get statistics for the current user (aggregated by the database)"""
+        self.flush()
+        # A card is due if its next review falls on or before today
+        due_before = (date.today() + timedelta(days=1)).isoformat()
+        with self.db_lock:
+            rows = self.conn.execute(
+                "SELECT decks.name, decks.study_time, COUNT(cards.id), "
+                "COALESCE(SUM(cards.next_review < ?), 0), "
+                "COALESCE(SUM(cards.right_count), 0), COALESCE(SUM(cards.wrong_count), 0) "
+                "FROM decks LEFT JOIN cards ON cards.deck_id = decks.id "
+                "WHERE decks.user_id = ? GROUP BY decks.id",
+                (due_before, self.user_id),
+            ).fetchall()
+
+        deck_stats = {
+            name: {"card_count": card_count, "due_count": due_count, "right_total": right_total,
+                   "wrong_total": wrong_total, "study_time": study_time}
+            for name, study_time, card_count, due_count, right_total, wrong_total in rows
+        }
+        return self.combine_deck_stats(deck_stats)
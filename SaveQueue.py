@@ -0,0 +1,98 @@
+import atexit, threading, time
+
+
+class SaveQueue:
+    """
+    Background writer for deck files.
+    Writes run one at a time, in submission order, on a worker thread so the
+    Qt main thread never waits on disk. Submitting a write with coalesce=True
+    drops any still-pending writes for the same key (the newer one supersedes
+    them), so repeated saves of one deck turn into a single write.
+    """
+    def __init__(self, name="SaveQueue"):
+        self.name = name
+        self.pending = []  # [(key, write_fn)] waiting to run, oldest first
+        self.busy = False  # True while a write is running
+        self.condition = threading.Condition()
+        self.thread = None
+
+        # Metrics
+        self.submitted = 0
+        self.coalesced = 0
+        self.writes = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.total_write_time = 0.0
+        self.max_write_time = 0.0
+        self.last_write_time = 0.0
+
+        # Make sure nothing queued is lost when the interpreter exits
+        atexit.register(self.flush)
+
+    def submit(self, key, write_fn, coalesce=True):
+        """Queue write_fn() for the worker thread"""
+        with self.condition:
+            if coalesce:
+                kept = [(k, fn) for k, fn in self.pending if k != key]
+                self.coalesced += len(self.pending) - len(kept)
+                self.pending = kept
+            self.pending.append((key, write_fn))
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, len(self.pending))
+
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def run(self):
+        """Worker loop: run queued writes one by one"""
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                key, write_fn = self.pending.pop(0)
+                self.busy = True
+
+            start = time.perf_counter()
+            try:
+                write_fn()
+            except Exception as e:
+                self.errors += 1
+                print(f"Error saving {key}: {e}")
+            elapsed = time.perf_counter() - start
+
+            with self.condition:
+                self.busy = False
+                self.writes += 1
+                self.last_write_time = elapsed
+                self.total_write_time += elapsed
+                self.max_write_time = max(self.max_write_time, elapsed)
+                self.condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Block until every queued write has hit the disk. Returns False on timeout"""
+        if self.thread is threading.current_thread():
+            return True  # Called from a write; waiting here would deadlock
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.pending and not self.busy, timeout)
+
+    def depth(self):
+        """Number of writes waiting (including the one in progress)"""
+        with self.condition:
+            return len(self.pending) + (1 if self.busy else 0)
+
+    def get_metrics(self):
+        """Queue depth and write latency figures (times in milliseconds)"""
+        with self.condition:
+            return {
+                "queue_depth": len(self.pending) + (1 if self.busy else 0),
+                "max_queue_depth": self.max_depth,
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "writes": self.writes,
+                "errors": self.errors,
+                "last_write_ms": self.last_write_time * 1000,
+                "avg_write_ms": (self.total_write_time / self.writes * 1000) if self.writes else 0.0,
+                "max_write_ms": self.max_write_time * 1000,
+            }
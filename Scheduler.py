@@ -1,17 +1,19 @@
-from datetime import datetime, timedelta
 import math
+from Timestamps import now_timestamp, SECONDS_PER_DAY
 
 class Scheduler:
-    def __init__(self):
+    def __init__(self, clock=None):
+        self.clock = clock or now_timestamp  # Current time in seconds since EPOCH (the Simulator passes its own)
         self.base_interval = 1  # Base interval in days
         self.max_interval = 365  # Maximum interval in days
         self.learning_rate = 1.0  # Adjusted based on user performance
     
-    def calculate_retention_score(self, card, is_right):
+    def calculate_retention_score(self, card, is_right, now=None):
         """
         Calculate retention score based on performance and time since last review.
         """
-        time_since_review = (datetime.now() - datetime.fromisoformat(card.last_reviewed)).days
+        now = self.clock() if now is None else now
+        time_since_review = int((now - card.last_reviewed_ts) // SECONDS_PER_DAY)
         if time_since_review < 1:
             time_since_review = 1
         
@@ -34,9 +36,7 @@ class Scheduler:
         if not deck.flashcards:
             return
         
-        total_attempts = sum(card.right_count + card.wrong_count for card in deck.flashcards)
-        total_right = sum(card.right_count for card in deck.flashcards)
-        accuracy = total_right / total_attempts if total_attempts > 0 else 0
+        accuracy = deck.accuracy()
         
         # Increase learning rate for high accuracy, decrease for low
         if accuracy > 0.8:
@@ -44,13 +44,10 @@ class Scheduler:
         elif accuracy < 0.5:
             self.learning_rate = max(self.learning_rate - 0.1, 0.5)
     
-    def schedule_card(self, card, is_right):
+    def calculate_interval(self, card, is_right):
         """
-        Schedule the next review for a card based on performance.
+        Days until the next review, from the card's retention score.
         """
-        card.retention_score = self.calculate_retention_score(card, is_right)
-        card.last_reviewed = datetime.now().isoformat()
-        
         # Calculate interval based on retention score, difficulty, and learning rate
         interval = self.base_interval * (card.retention_score * 5) * (1 / card.difficulty) * self.learning_rate
         interval = max(1, min(self.max_interval, interval))
@@ -58,7 +55,143 @@ class Scheduler:
         # Adjust interval based on consecutive correct answers
         if is_right and card.right_count > card.wrong_count:
             interval *= (1 + card.right_count * 0.1)
-        
-        card.next_review = (datetime.now() + timedelta(days=interval)).isoformat()
+        return interval
+    
+    def schedule_card(self, card, is_right, now=None):
+        """
+        Schedule the next review for a card based on performance.
+        """
+        now = self.clock() if now is None else now
+        card.retention_score = self.calculate_retention_score(card, is_right, now)
+        card.last_reviewed_ts = now
+        card.next_review_ts = now + self.calculate_interval(card, is_right) * SECONDS_PER_DAY
         return card.next_review
     
+    def reschedule_card(self, card):
+        """
+        Re-plan a reviewed card's next review from its last review (e.g. after
+        the learning rate changed). The streak bonus applies while the card
+        has more right than wrong answers. Cards never reviewed are left alone.
+        """
+        if card.right_count + card.wrong_count == 0:
+            return False
+        is_right = card.right_count > card.wrong_count
+        card.next_review_ts = card.last_reviewed_ts + self.calculate_interval(card, is_right) * SECONDS_PER_DAY
+        return True
+    
+    # Batch operations: vectorized over the deck's columns when NumPy is
+    # available, card by card otherwise. Both give the same results.
+    # NumPy is imported only on the column paths (deck.get_columns() has
+    # already loaded it there), so it stays out of app startup.
+    
+    def select_rows(self, columns, mask):
+        """Row numbers picked by mask: None (all cards), a boolean mask or row numbers"""
+        import numpy as np
+        if mask is None:
+            return np.arange(len(columns))
+        mask = np.asarray(mask)
+        return np.flatnonzero(mask) if mask.dtype == bool else mask.astype(np.int64)
+    
+    def select_cards(self, deck, mask):
+        """select_rows() without NumPy: the picked cards"""
+        if mask is None:
+            return list(deck.flashcards)
+        mask = list(mask)
+        if all(isinstance(value, bool) for value in mask):
+            return [card for card, picked in zip(deck.flashcards, mask) if picked]
+        return [deck.flashcards[row] for row in mask]
+    
+    def refresh_due_queue(self, deck, cards):
+        """Tell the deck's due queue (if it was built) about rescheduled cards"""
+        if deck.due_queue is not None:
+            deck.due_queue.update_many((card.id, card.next_review_ts) for card in cards)
+    
+    def schedule_batch(self, deck, mask=None, outcomes=True, now=None):
+        """
+        schedule_card() for many cards at once. mask picks the cards (see
+        select_rows), outcomes is one is_right for all of them or one per
+        picked card. Returns the number of cards scheduled.
+        """
+        now = self.clock() if now is None else now
+        columns = deck.get_columns()
+        if columns is None:
+            cards = self.select_cards(deck, mask)
+            if isinstance(outcomes, bool):
+                outcomes = [outcomes] * len(cards)
+            for card, is_right in zip(cards, outcomes):
+                self.schedule_card(card, is_right, now)
+            self.refresh_due_queue(deck, cards)
+            return len(cards)
+        
+        import numpy as np
+        rows = self.select_rows(columns, mask)
+        is_right = np.broadcast_to(np.asarray(outcomes, dtype=bool), rows.shape)
+        retention = columns.column("retention_score")[rows]
+        difficulty = columns.column("difficulty")[rows]
+        last_reviewed = columns.column("last_reviewed_ts")[rows]
+        
+        # calculate_retention_score(), same operations in the same order
+        time_since_review = np.maximum(np.floor_divide(now - last_reviewed, SECONDS_PER_DAY), 1)
+        score = np.where(is_right, retention + 0.1 * (1 / difficulty),
+                         np.maximum(0.0, retention - 0.2 * difficulty))
+        score = score * (1 / (1 + time_since_review / 30))
+        score = np.minimum(1.0, np.maximum(0.0, score))
+        
+        columns.column("retention_score")[rows] = score
+        columns.column("last_reviewed_ts")[rows] = now
+        columns.column("next_review_ts")[rows] = now + self.batch_intervals(columns, rows, is_right) * SECONDS_PER_DAY
+        columns.clear_texts(rows)
+        self.refresh_due_queue(deck, (columns.cards[row] for row in rows))
+        return len(rows)
+    
+    def batch_intervals(self, columns, rows, is_right):
+        """calculate_interval() for rows of a DeckColumns"""
+        import numpy as np
+        right_count = columns.column("right_count")[rows]
+        wrong_count = columns.column("wrong_count")[rows]
+        interval = (self.base_interval * (columns.column("retention_score")[rows] * 5)
+                    * (1 / columns.column("difficulty")[rows]) * self.learning_rate)
+        interval = np.maximum(1, np.minimum(self.max_interval, interval))
+        return np.where(is_right & (right_count > wrong_count), interval * (1 + right_count * 0.1), interval)
+    
+    def reschedule_deck(self, deck, mask=None):
+        """
+        reschedule_card() for a whole deck (or the cards picked by mask).
+        Returns the number of cards re-planned.
+        """
+        columns = deck.get_columns()
+        if columns is None:
+            cards = [card for card in self.select_cards(deck, mask) if self.reschedule_card(card)]
+            self.refresh_due_queue(deck, cards)
+            return len(cards)
+        
+        rows = self.select_rows(columns, mask)
+        right_count = columns.column("right_count")[rows]
+        wrong_count = columns.column("wrong_count")[rows]
+        rows = rows[right_count + wrong_count > 0]
+        is_right = columns.column("right_count")[rows] > columns.column("wrong_count")[rows]
+        columns.column("next_review_ts")[rows] = (columns.column("last_reviewed_ts")[rows]
+                                                  + self.batch_intervals(columns, rows, is_right) * SECONDS_PER_DAY)
+        columns.clear_texts(rows, last_reviewed=False)
+        self.refresh_due_queue(deck, (columns.cards[row] for row in rows))
+        return len(rows)
+    
+    def postpone(self, deck, days, mask=None):
+        """
+        Push the next review of a deck's cards (or those picked by mask)
+        back by a number of days (forward if negative). Returns the number of cards moved.
+        """
+        columns = deck.get_columns()
+        if columns is None:
+            cards = self.select_cards(deck, mask)
+            for card in cards:
+                card.next_review_ts = card.next_review_ts + days * SECONDS_PER_DAY
+            self.refresh_due_queue(deck, cards)
+            return len(cards)
+        
+        rows = self.select_rows(columns, mask)
+        columns.column("next_review_ts")[rows] += days * SECONDS_PER_DAY
+        columns.clear_texts(rows, last_reviewed=False)
+        self.refresh_due_queue(deck, (columns.cards[row] for row in rows))
+        return len(rows)
+    
@@ -0,0 +1,202 @@
+import bisect, heapq, html, re, zlib
+
+# Markup of QTextEdit.toHtml(): drop <head>/<style>/<script> with their contents, and every other tag
+MARKUP = re.compile(r"<(head|style|script)\b.*?</\1\s*>|<[^>]*>", re.IGNORECASE | re.DOTALL)
+WORD = re.compile(r"\w+")
+
+PREVIEW_LENGTH = 60  # Characters of a card's front kept for result lists
+
+
+def html_to_text(text):
+    """Plain text of a card's HTML (whitespace collapsed)"""
+    return " ".join(html.unescape(MARKUP.sub(" ", text)).split())
+
+
+def card_checksum(front, back, notes):
+    """Checksum of a card's searchable text, to tell whether it needs indexing again"""
+    return zlib.crc32("\0".join((front, back, notes)).encode("utf-8"))
+
+
+def notes_checksum(notes):
+    """Checksum of a card's notes alone, the only searchable text a journaled review carries"""
+    return zlib.crc32(notes.encode("utf-8"))
+
+
+class SearchIndex:
+    """
+    Inverted index over the front, back and notes (as plain text) of
+    every card in a user's decks: each word maps to the cards that
+    contain it. A query matches the cards holding all of its words, the
+    last one as a prefix, so results can follow the search box as the
+    user types. Cards are indexed again only when their text changed.
+
+    Every indexed version of a card gets a new document number; replaced
+    and removed documents stay in the posting lists (skipped when
+    searching) until compact() renumbers them.
+    """
+    def __init__(self):
+        self.decks = {}  # deck key (file name) -> {"name": deck name, "cards": {card id: doc number}}
+        self.docs = []  # doc number -> (deck key, card id, checksum, preview, words, notes checksum), None once replaced
+        self.removed = 0  # docs set to None since the last compact()
+        self.postings = {}  # word -> [doc number], ascending
+        self.words = None  # sorted words, for prefix lookups; rebuilt after new words arrive
+        self.snapshots = {}  # deck key -> to_dict() entry, until the deck changes
+
+    def __len__(self):
+        return len(self.docs) - self.removed
+
+    def __contains__(self, key):
+        return key in self.decks
+
+    def add_doc(self, key, card_id, checksum, preview, words, notes_crc):
+        doc = len(self.docs)
+        self.docs.append((key, card_id, checksum, preview, words, notes_crc))
+        for word in words.split():
+            posting = self.postings.get(word)
+            if posting is None:
+                self.postings[word] = [doc]
+                self.words = None
+            else:
+                posting.append(doc)
+        return doc
+
+    def index_card(self, key, card_id, front, back, notes, checksum=None):
+        """Index (or index again) one card of an indexed deck"""
+        checksum = card_checksum(front, back, notes) if checksum is None else checksum
+        text = html_to_text(front)
+        preview = text[:PREVIEW_LENGTH] + ("..." if len(text) > PREVIEW_LENGTH else "")
+        words = {word.lower() for part in (text, html_to_text(back), html_to_text(notes))
+                 for word in WORD.findall(part)}
+        self.drop_doc(self.decks[key]["cards"].get(card_id))
+        self.decks[key]["cards"][card_id] = self.add_doc(key, card_id, checksum, preview, " ".join(sorted(words)),
+                                                         notes_checksum(notes))
+
+    def drop_doc(self, doc):
+        if doc is not None and self.docs[doc] is not None:
+            self.docs[doc] = None
+            self.removed += 1
+
+    def set_deck(self, key, deck_name, cards):
+        """
+        Bring a deck up to date from its cards, as (card id, front, back,
+        notes) tuples: new and changed cards are indexed, cards no longer
+        in the deck dropped
+        """
+        self.snapshots.pop(key, None)
+        deck = self.decks.setdefault(key, {"name": deck_name, "cards": {}})
+        deck["name"] = deck_name
+        stale = dict(deck["cards"])
+        for card_id, front, back, notes in cards:
+            doc = stale.pop(card_id, None)
+            checksum = card_checksum(front, back, notes)
+            if doc is None or self.docs[doc][2] != checksum:
+                self.index_card(key, card_id, front, back, notes, checksum)
+        for card_id, doc in stale.items():
+            self.drop_doc(doc)
+            del deck["cards"][card_id]
+        self.compact_if_needed()
+
+    def update_card(self, key, card_id, front, back, notes):
+        """Index one card again if its text changed; False if its deck isn't indexed or nothing changed"""
+        deck = self.decks.get(key)
+        if deck is None:
+            return False
+        doc = deck["cards"].get(card_id)
+        checksum = card_checksum(front, back, notes)
+        if doc is not None and self.docs[doc][2] == checksum:
+            return False
+        self.snapshots.pop(key, None)
+        self.index_card(key, card_id, front, back, notes, checksum)
+        self.compact_if_needed()
+        return True
+
+    def remove_deck(self, key):
+        deck = self.decks.pop(key, None)
+        self.snapshots.pop(key, None)
+        if deck is not None:
+            for doc in deck["cards"].values():
+                self.drop_doc(doc)
+            self.compact_if_needed()
+
+    def compact_if_needed(self):
+        if self.removed > 1000 and self.removed > len(self.docs) // 2:
+            self.compact()
+
+    def compact(self):
+        """Renumber the live documents and rebuild the posting lists without the dead ones"""
+        docs, self.docs, self.postings, self.words, self.removed = self.docs, [], {}, None, 0
+        for entry in docs:
+            if entry is not None:
+                key, card_id = entry[0], entry[1]
+                self.decks[key]["cards"][card_id] = self.add_doc(*entry)
+
+    # Queries
+
+    def prefix_postings(self, prefix):
+        """Posting lists of every word starting with prefix"""
+        if self.words is None:
+            self.words = sorted(self.postings)
+        postings = []
+        for position in range(bisect.bisect_left(self.words, prefix), len(self.words)):
+            if not self.words[position].startswith(prefix):
+                break
+            postings.append(self.postings[self.words[position]])
+        return postings
+
+    def search(self, query, limit=100):
+        """(deck name, card id, preview) of up to `limit` cards matching a query, in indexing order"""
+        words = [word.lower() for word in WORD.findall(query)]
+        if not words:
+            return []
+        *whole, prefix = words  # The last word may still be being typed
+        if whole:
+            matches = sorted((self.postings.get(word, ()) for word in set(whole)), key=len)
+            candidates = set(matches[0]).intersection(*matches[1:])
+            # Checking the few candidates beats merging every posting list of a short prefix
+            docs = sorted(doc for doc in candidates
+                          if self.docs[doc] is not None and " " + prefix in " " + self.docs[doc][4])
+        else:
+            postings = self.prefix_postings(prefix)
+            hits = sum(len(posting) for posting in postings)
+            if limit * len(self.docs) < hits * len(postings):
+                # A short prefix matching many words: the first `limit` docs holding one of them
+                # are found sooner by walking the docs in order than by merging all those lists
+                docs = (doc for doc, entry in enumerate(self.docs)
+                        if entry is not None and " " + prefix in " " + entry[4])
+            else:
+                # Posting lists are ascending, so merging them yields docs in order and can stop at `limit`
+                docs = heapq.merge(*postings)
+        results = []
+        last = None
+        for doc in docs:
+            entry = self.docs[doc]
+            if doc != last and entry is not None:
+                results.append((self.decks[entry[0]]["name"], entry[1], entry[3]))
+                if len(results) == limit:
+                    break
+            last = doc
+        return results
+
+    # Saving
+
+    def to_dict(self):
+        """
+        Snapshot of the index (safe to write on another thread). Entries of
+        decks that haven't changed since the last snapshot are reused.
+        """
+        for key, deck in self.decks.items():
+            if key not in self.snapshots:
+                self.snapshots[key] = {
+                    "name": deck["name"],
+                    "cards": {card_id: list(self.docs[doc][2:]) for card_id, doc in deck["cards"].items()},
+                }
+        return dict(self.snapshots)
+
+    def load_deck(self, key, entry):
+        """Add a deck from a to_dict() entry"""
+        self.remove_deck(key)
+        cards = {}
+        for card_id, (checksum, preview, words, notes_crc) in entry["cards"].items():
+            cards[card_id] = self.add_doc(key, card_id, checksum, preview, words, notes_crc)
+        self.decks[key] = {"name": entry["name"], "cards": cards}
+        self.snapshots[key] = {"name": entry["name"], "cards": entry["cards"]}
@@ -0,0 +1,187 @@
+"""
+Headless simulation of the Scheduler over a synthetic collection: every
+simulated day the due cards are reviewed, a recall model decides which
+answers are right, and the whole batch is rescheduled at once.
+
+    python Simulator.py [--cards 100000] [--years 1] [--new-per-day 1000]
+                        [--recall exponential|constant] [--csv daily.csv]
+
+Prints the daily review load, recall rate and mean retention score
+(averaged over each reporting period) and the scheduling throughput.
+"""
+import argparse, csv, math, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from Cards import Deck
+from Timestamps import now_timestamp, SECONDS_PER_DAY
+from DeckColumns import DeckColumns, columns_available
+from Scheduler import Scheduler
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class ExponentialRecall:
+    """
+    Forgetting curve: a card is recalled with probability
+    exp(-days since last review / stability), where stability grows with
+    the card's retention score and shrinks with its difficulty.
+    Cards never reviewed before are recalled with probability new_recall.
+    """
+    def __init__(self, base_stability=2.0, retention_weight=60.0, new_recall=0.6):
+        self.base_stability = base_stability
+        self.retention_weight = retention_weight
+        self.new_recall = new_recall
+
+    def __call__(self, columns, rows, now):
+        elapsed = (now - columns.column("last_reviewed_ts")[rows]) / SECONDS_PER_DAY
+        stability = (self.base_stability + self.retention_weight * columns.column("retention_score")[rows]) \
+            / columns.column("difficulty")[rows]
+        probability = np.exp(-elapsed / stability)
+        answered = columns.column("right_count")[rows] + columns.column("wrong_count")[rows]
+        return np.where(answered > 0, probability, self.new_recall)
+
+
+class ConstantRecall:
+    """Every review is recalled with the same probability"""
+    def __init__(self, probability=0.85):
+        self.probability = probability
+
+    def __call__(self, columns, rows, now):
+        return np.full(len(rows), self.probability)
+
+
+RECALL_MODELS = {"exponential": ExponentialRecall, "constant": ConstantRecall}
+
+
+class Simulator:
+    """
+    Drives a Scheduler through simulated days. The Scheduler reads the
+    simulated time from its clock, so the results don't depend on when
+    the simulation runs.
+    """
+    def __init__(self, cards, new_per_day=None, recall=None, scheduler=None, seed=0, start=None):
+        self.now = start if start is not None else now_timestamp()
+        self.start = self.now
+        self.scheduler = scheduler or Scheduler()
+        self.scheduler.clock = lambda: self.now
+        self.recall = recall or ExponentialRecall()
+        self.random = np.random.default_rng(seed)
+        self.deck = self.make_collection(cards, new_per_day)
+        self.days = []  # one dict of metrics per simulated day
+        self.scheduled = 0  # cards rescheduled so far
+        self.schedule_time = 0.0  # seconds spent in the Scheduler
+
+    def make_collection(self, cards, new_per_day):
+        """
+        Synthetic deck held only as columns (no card objects). With
+        new_per_day, cards are introduced in batches of that many per day.
+        """
+        introduced = self.start + (np.arange(cards) // new_per_day) * SECONDS_PER_DAY if new_per_day \
+            else np.full(cards, self.start)
+        deck = Deck("Simulation")
+        deck.columns = DeckColumns.from_arrays({
+            "right_count": np.zeros(cards),
+            "wrong_count": np.zeros(cards),
+            "difficulty": self.random.integers(1, 6, cards),
+            "retention_score": np.zeros(cards),
+            "last_reviewed_ts": introduced,
+            "next_review_ts": introduced,
+        })
+        return deck
+
+    def step(self):
+        """Simulate one day: review every card due by the end of it"""
+        columns = self.deck.columns
+        self.now += SECONDS_PER_DAY
+        rows = np.flatnonzero(columns.due_mask(self.now))
+        recalled = self.random.random(len(rows)) < self.recall(columns, rows, self.now)
+
+        # Count the answers, as StatsManager does for each card; the deck totals
+        # are read first, or the first day's answers would be counted twice
+        right_total, wrong_total = self.deck.answer_totals()
+        right = int(recalled.sum())
+        columns.column("right_count")[rows] += recalled
+        columns.column("wrong_count")[rows] += ~recalled
+        self.deck.right_total, self.deck.wrong_total = right_total + right, wrong_total + len(rows) - right
+
+        started = time.perf_counter()
+        self.scheduler.schedule_batch(self.deck, rows, recalled)
+        elapsed = time.perf_counter() - started
+        self.scheduled += len(rows)
+        self.schedule_time += elapsed
+
+        day = {
+            "day": len(self.days) + 1,
+            "reviews": len(rows),
+            "recalled": right,
+            "recall_rate": right / len(rows) if len(rows) else 0.0,
+            "mean_retention": float(columns.column("retention_score").mean()) if len(columns) else 0.0,
+            "schedule_ms": elapsed * 1000,
+        }
+        self.days.append(day)
+        return day
+
+    def run(self, days, report_every=30, out=sys.stdout):
+        """Simulate a number of days, printing a line per reporting period"""
+        print(f"{'days':>11} {'reviews/day':>12} {'recall':>7} {'retention':>10} {'cards/s':>12}", file=out)
+        for _ in range(days):
+            self.step()
+            if len(self.days) % report_every == 0 or len(self.days) == days:
+                period = self.days[-((len(self.days) - 1) % report_every + 1):]
+                reviews = sum(day["reviews"] for day in period)
+                recalled = sum(day["recalled"] for day in period)
+                seconds = sum(day["schedule_ms"] for day in period) / 1000
+                print(f"{period[0]['day']:>5}-{period[-1]['day']:<5} {reviews / len(period):>12.0f} "
+                      f"{recalled / reviews if reviews else 0:>7.1%} {period[-1]['mean_retention']:>10.3f} "
+                      f"{reviews / seconds if seconds else 0:>12.0f}", file=out)
+        return self.days
+
+    def throughput(self):
+        """Cards scheduled per second of Scheduler time"""
+        return self.scheduled / self.schedule_time if self.schedule_time else 0.0
+
+    def write_csv(self, path):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(self.days[0]))
+            writer.writeheader()
+            writer.writerows(self.days)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the Scheduler over a synthetic collection")
+    parser.add_argument("--cards", type=int, default=100000)
+    parser.add_argument("--years", type=float, default=1)
+    parser.add_argument("--new-per-day", type=int, default=None,
+                        help="cards introduced per day (default: all on day one)")
+    parser.add_argument("--recall", choices=sorted(RECALL_MODELS), default="exponential")
+    parser.add_argument("--learning-rate", type=float, default=1.0)
+    parser.add_argument("--report-every", type=int, default=30, help="days per printed line")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="also write the daily metrics to this file")
+    args = parser.parse_args()
+
+    if not columns_available():
+        sys.exit("The simulator needs NumPy (pip install numpy)")
+
+    scheduler = Scheduler()
+    scheduler.learning_rate = args.learning_rate
+    days = math.ceil(args.years * 365)
+    print(f"simulating {args.cards} cards over {days} days ({args.recall} recall)")
+
+    started = time.perf_counter()
+    simulator = Simulator(args.cards, args.new_per_day, RECALL_MODELS[args.recall](), scheduler, args.seed)
+    simulator.run(days, args.report_every)
+    total = time.perf_counter() - started
+
+    reviews = sum(day["reviews"] for day in simulator.days)
+    print(f"{reviews} reviews in {total:.1f} s; scheduler throughput {simulator.throughput():,.0f} cards/s")
+    if args.csv:
+        simulator.write_csv(args.csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Startup trace: wall time of each startup phase (from main.py to the
+first usable FlashcardApp window) and of every module imported on the way.
+
+    FLASHCARD_STARTUP_TRACE=startup_trace.json python main.py
+
+Log in; the trace is written once set_user() has loaded the user's decks.
+The file is JSON:
+
+    {"total_ms": ..., "phases": [{"name", "start_ms", "ms", "depth", "imports"}],
+     "repeated": {phase name: times run}, "imports": [{"module", "ms", "phase"}]}
+
+Phases nest (depth 0 is the outermost); "imports" of a phase is the
+number of modules first imported while it ran. Module import times are
+inclusive of the modules they import in turn.
+"""
+import importlib.abc, json, os, sys, time
+from collections import Counter
+from contextlib import contextmanager
+
+TRACE_ENV = "FLASHCARD_STARTUP_TRACE"
+
+
+class TimedLoader(importlib.abc.Loader):
+    """Wraps a module's loader to time how long executing the module takes"""
+    def __init__(self, loader, trace):
+        self.loader = loader
+        self.trace = trace
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        started = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.trace.imported(module.__name__, time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """First finder on sys.meta_path: finds modules with the other finders and times their loading"""
+    def __init__(self, trace):
+        self.trace = trace
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = TimedLoader(spec.loader, self.trace)
+                return spec
+        return None
+
+
+class StartupTrace:
+    """
+    Records nested phases with phase(). Does nothing until start() is
+    called, so the phase() calls can stay in the code for good.
+    """
+    def __init__(self):
+        self.path = None  # Output file; None while tracing is off
+        self.started = 0.0
+        self.phases = []  # Finished and running phases, in start order
+        self.stack = []  # Phases currently running
+        self.imports = []  # (module, seconds, phase name)
+        self.import_timer = None
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def start(self, path):
+        """Start tracing (imports included) and write the result to path on finish()"""
+        self.path = path
+        self.started = time.perf_counter()
+        self.import_timer = ImportTimer(self)
+        sys.meta_path.insert(0, self.import_timer)
+
+    def start_from_environment(self):
+        """start() if FLASHCARD_STARTUP_TRACE names an output file"""
+        path = os.environ.get(TRACE_ENV)
+        if path:
+            self.start(path)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    @contextmanager
+    def phase(self, name):
+        """Time the block as one phase"""
+        if not self.enabled:
+            yield
+            return
+        entry = {"name": name, "start_ms": self.elapsed_ms(), "ms": None,
+                 "depth": len(self.stack), "imports": 0}
+        self.phases.append(entry)
+        self.stack.append(entry)
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            entry["ms"] = self.elapsed_ms() - entry["start_ms"]
+
+    def imported(self, module, seconds):
+        """Called by ImportTimer once a module has been executed"""
+        phase = self.stack[-1]["name"] if self.stack else None
+        for entry in self.stack:
+            entry["imports"] += 1
+        self.imports.append((module, seconds, phase))
+
+    def to_dict(self):
+        return {
+            "total_ms": self.elapsed_ms(),
+            "phases": self.phases,
+            "repeated": {name: count for name, count in Counter(entry["name"] for entry in self.phases).items()
+                         if count > 1},
+            "imports": [{"module": module, "ms": seconds * 1000, "phase": phase}
+                        for module, seconds, phase in sorted(self.imports, key=lambda item: -item[1])],
+        }
+
+    def finish(self):
+        """Stop tracing and write the trace file (only the first call does anything)"""
+        if not self.enabled:
+            return
+        path, self.path = self.path, None
+        sys.meta_path.remove(self.import_timer)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, indent=2)
+        except OSError as e:
+            print(f"Error writing startup trace: {e}")
+
+
+trace = StartupTrace()  # The application's trace, shared by every module
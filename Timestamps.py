@@ -0,0 +1,44 @@
+from datetime import datetime, date, timedelta
+
+# Cards keep their review times as seconds since this moment, in the same
+# local wall-clock time that datetime.now() gives
+EPOCH = datetime(1970, 1, 1)
+SECONDS_PER_DAY = 86400
+
+
+def now_timestamp():
+    """The current time as seconds since EPOCH"""
+    return (datetime.now() - EPOCH).total_seconds()
+
+
+def timestamp_to_datetime(timestamp):
+    """Naive local datetime of seconds since EPOCH"""
+    return EPOCH + timedelta(seconds=timestamp)
+
+
+def timestamp_to_iso(timestamp):
+    """ISO string (as stored in deck files) for seconds since EPOCH"""
+    return timestamp_to_datetime(timestamp).isoformat()
+
+
+def parse_timestamp(value):
+    """
+    Convert a stored ISO timestamp to (seconds since EPOCH, text).
+    text is None when timestamp_to_iso() gives the same string back;
+    otherwise (time zones, dates without a time, ...) it is the original
+    string, so saving the card writes exactly what was read.
+    """
+    try:
+        moment = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return now_timestamp(), value
+    timestamp = (moment.replace(tzinfo=None) - EPOCH).total_seconds()
+    # Floats hold microseconds exactly up to 2**32 seconds (the year 2106)
+    exact = moment.tzinfo is None and abs(timestamp) < 2 ** 32 and moment.isoformat() == value
+    return timestamp, (None if exact else value)
+
+
+def end_of_day_timestamp(day=None):
+    """Seconds since EPOCH at midnight after a day (default: today)"""
+    day = day or date.today()
+    return (datetime.combine(day + timedelta(days=1), datetime.min.time()) - EPOCH).total_seconds()
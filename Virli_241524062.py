@@ -1,13 +1,16 @@
+import time
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QInputDialog, QMessageBox, QSplitter, QPushButton, QListWidget, QLabel)
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QIcon, QAction
 
-from Ido_241524047 import Deck, DataManager, AddCardDialog, ManageCardsDialog, RenameDeckDialog, RateDifficultyDialog
+from Ido_241524047 import (Deck, create_data_manager, AddCardDialog, ManageCardsDialog, RenameDeckDialog, RateDifficultyDialog,
+                           SearchDialog)
 from Zein_241524056 import StatsManager, StatsPage
 from Lukman_241524050 import NotesPanel, NotesManager
 from Fakhri_241524053 import FlashcardDisplay
 from DeckIOHandler import DeckIOHandler
 from Scheduler import Scheduler
+from StartupTrace import trace
 
 
 
@@ -29,6 +32,10 @@ class DeckListPanel(QWidget):  # Class untuk panel daftar deck pada flashcard
         self.deck_list = QListWidget()
         layout.addWidget(self.deck_list)
         
+        # Tombol untuk belajar kartu yang jatuh tempo hari ini dari semua deck
+        self.due_today_btn = QPushButton("Study Due Today")
+        layout.addWidget(self.due_today_btn)
+        
         # Tombol untuk menambah, menghapus, dan rename deck 
         self.add_deck_btn = QPushButton("Add New Deck")
         self.delete_deck_btn = QPushButton("Delete Deck")
@@ -62,10 +69,16 @@ class FlashcardApp(QMainWindow):
         self.user_manager = None
         
         # Initialize with default data manager (will be updated when user logs in)
-        self.data_manager = DataManager()
+        self.data_manager = create_data_manager()
         self.decks = []  # Daftar deck
         self.current_deck = None  # Deck yang dipilih
-        self.init_ui()
+        self.due_session = None  # (nama deck, id kartu) yang sudah ditampilkan pada sesi "Due Today"
+        self.due_position = 0  # Posisi kartu yang sedang ditampilkan dalam due_session
+        self.card_shown_at = time.perf_counter()  # Untuk mengukur waktu jawab pada log review
+        with trace.phase("FlashcardApp.init_ui"):
+            self.init_ui()
+        self.flashcard_display.upcoming_cards = self.upcoming_cards  # Untuk prefetch tampilan kartu
+        self.use_media_store()
         self.load_decks()
         self.stats_manager.start_timer()
         self.scheduler = Scheduler()
@@ -181,6 +194,13 @@ class FlashcardApp(QMainWindow):
         export_action.triggered.connect(self.export_deck)
         file_menu.addAction(export_action)
         
+        # Search Cards action
+        search_action = QAction('Search Cards', self)
+        search_action.setShortcut('Ctrl+F')
+        search_action.setStatusTip('Search the cards of all decks')
+        search_action.triggered.connect(self.search_cards)
+        file_menu.addAction(search_action)
+        
         # User menu (only show if multi-user mode is active)
         if hasattr(self, 'current_user') and self.current_user:
             user_menu = menubar.addMenu('User')
@@ -241,6 +261,7 @@ class FlashcardApp(QMainWindow):
         self.deck_panel.delete_deck_btn.clicked.connect(self.delete_deck)
         self.deck_panel.edit_deck_btn.clicked.connect(self.edit_deck)
         self.deck_panel.deck_list.itemClicked.connect(self.select_deck)
+        self.deck_panel.due_today_btn.clicked.connect(self.start_due_session)
 
         # Flashcard navigation signals
         self.flip_btn.clicked.connect(self.flip_card)
@@ -268,9 +289,15 @@ class FlashcardApp(QMainWindow):
         # Add stats button signal
         self.stats_btn.clicked.connect(self.show_stats)
 
+    def use_media_store(self):
+        """Let the display widgets resolve images from the current user's media store"""
+        self.flashcard_display.media_store = self.data_manager.media_store
+        self.notes_panel.media_store = self.data_manager.media_store
+
     def load_decks(self):
-        self.decks = self.data_manager.load_decks()
-        self.deck_panel.populate_decks(self.decks)
+        with trace.phase("FlashcardApp.load_decks"):
+            self.decks = self.data_manager.load_decks()
+            self.deck_panel.populate_decks(self.decks)
 
     def add_deck(self):
         name, ok = QInputDialog.getText(self, "Add New Deck", "Enter deck name:")
@@ -307,6 +334,7 @@ class FlashcardApp(QMainWindow):
             # Hapus tampilan saat ini jika dek yang dihapus dipilih
             if self.current_deck and self.current_deck.name == deck_name:
                 self.current_deck = None
+                self.due_session = None
                 self.stats_manager.set_current_deck(None)  # Reset stats manager's current deck
                 self.flashcard_display.show_welcome_screen()
                 self.notes_panel.set_card(None)
@@ -334,41 +362,126 @@ class FlashcardApp(QMainWindow):
         if deck_name:
             for deck in self.decks:
                 if deck.name == deck_name:
-                    # Need to save previous deck's study time
-                    if self.current_deck:
-                        self.stats_manager.stop_timer()
-                        self.data_manager.save_deck(self.current_deck)
-                    self.current_deck = deck
-                    self.stats_manager.set_current_deck(deck)  # Set current deck in StatsManager
-                    self.scheduler.update_learning_rate(deck)
-                    showing_front, notes_visible = self.flashcard_display.set_deck(deck)
-                    
-                    # Mengupdate notes dan stats display
-                    self.notes_manager.update_notes_panel(
-                        deck, 
-                        self.flashcard_display.current_index, 
-                        showing_front,
-                        notes_visible
-                    )
-                    
-                    # Mengreset stats manager state
-                    self.stats_manager.reset_feedback_state()
-                    self.stats_manager.update_feedback_buttons(
-                        showing_front, 
-                        self.flashcard_display.get_current_card()
-                    )
-                    
-                    # Update the toggle notes button (Untuk card sebelum di flip tidak terlihat jawaban nya)
-                    self.notes_manager.update_toggle_notes_button(
-                        self.toggle_notes_btn,
-                        showing_front,
-                        notes_visible
-                    )
-                    
-                    # Tampilkan tombol sekarang setelah dek dipilih dan cek apakah ada flashcard
-                    self.update_button_visibility(True)
+                    self.due_session = None  # Memilih deck sendiri mengakhiri sesi "Due Today"
+                    self.switch_deck(deck)
+                    # Mulai dari kartu yang paling lama lewat jadwal ulangnya
+                    card_id = self.data_manager.get_due_queue(deck).next()
+                    start_index = deck.index_of(card_id) if card_id is not None else 0
+                    self.show_deck(deck, start_index)
                     break
 
+    def switch_deck(self, deck):
+        """Menjadikan deck sebagai deck aktif"""
+        # Need to save previous deck's study time
+        if self.current_deck:
+            self.stats_manager.stop_timer()
+            self.data_manager.save_deck(self.current_deck)
+        self.current_deck = deck
+        deck.ensure_loaded()  # Decks from the manifest read their cards on first open
+        self.stats_manager.set_current_deck(deck)  # Set current deck in StatsManager
+        self.scheduler.update_learning_rate(deck)
+
+    def show_deck(self, deck, start_index):
+        """Menampilkan deck aktif mulai dari kartu ke-start_index"""
+        showing_front, notes_visible = self.flashcard_display.set_deck(deck, start_index)
+        self.card_shown_at = time.perf_counter()
+        
+        # Mengupdate notes dan stats display
+        self.notes_manager.update_notes_panel(
+            deck, 
+            self.flashcard_display.current_index, 
+            showing_front,
+            notes_visible
+        )
+        
+        # Mengreset stats manager state
+        self.stats_manager.reset_feedback_state()
+        self.stats_manager.update_feedback_buttons(
+            showing_front, 
+            self.flashcard_display.get_current_card()
+        )
+        
+        # Update the toggle notes button (Untuk card sebelum di flip tidak terlihat jawaban nya)
+        self.notes_manager.update_toggle_notes_button(
+            self.toggle_notes_btn,
+            showing_front,
+            notes_visible
+        )
+        
+        # Tampilkan tombol sekarang setelah dek dipilih dan cek apakah ada flashcard
+        self.update_button_visibility(True)
+
+    def start_due_session(self):
+        """Mulai sesi belajar lintas deck: kartu yang jatuh tempo hari ini, yang paling lama lewat jadwal duluan"""
+        self.due_session = []
+        self.due_position = -1
+        if not self.show_next_due_card():
+            QMessageBox.information(self, "Due Today", "No cards are due today.")
+
+    def show_next_due_card(self):
+        """Menampilkan kartu jatuh tempo berikutnya yang belum ditampilkan pada sesi ini"""
+        if self.due_position + 1 < len(self.due_session):
+            # Kembali maju setelah menekan Previous
+            self.due_position += 1
+            return self.show_due_card(*self.due_session[self.due_position])
+        
+        # Indeks jatuh tempo ikut diperbarui setiap kali kartu dijadwalkan ulang
+        shown = set(self.due_session)
+        while True:
+            due = self.data_manager.peek_due_cards(1, shown)
+            if not due:
+                return False
+            if self.show_due_card(*due[0]):
+                self.due_session.append(due[0])
+                self.due_position = len(self.due_session) - 1
+                return True
+            shown.add(due[0])  # Deck atau kartunya sudah tidak ada
+
+    def show_due_card(self, deck_name, card_id):
+        """Membuka deck milik kartu (jika perlu) lalu menampilkan kartunya"""
+        deck = next((deck for deck in self.decks if deck.name == deck_name), None)
+        if deck is None:
+            return False
+        if deck is not self.current_deck:
+            self.switch_deck(deck)
+        index = deck.index_of(card_id)
+        if index is None:
+            return False
+        self.show_deck(deck, index)
+        return True
+
+    def upcoming_cards(self, count):
+        """Kartu yang (kemungkinan besar) ditampilkan berikutnya saat menekan Next, paling banyak count"""
+        if self.due_session is not None:
+            # Sesi "Due Today": kartu setelah posisi sekarang, lalu kartu jatuh tempo yang belum tampil
+            upcoming = list(self.due_session[self.due_position + 1:self.due_position + 1 + count])
+            if len(upcoming) < count:
+                upcoming += self.data_manager.peek_due_cards(count - len(upcoming), set(self.due_session))
+            cards = []
+            for deck_name, card_id in upcoming:
+                deck = next((deck for deck in self.decks if deck.name == deck_name), None)
+                # Deck yang belum dibuka tidak dibaca dari disk hanya untuk prefetch
+                index = deck.index_of(card_id) if deck and deck.is_loaded() else None
+                if index is not None:
+                    cards.append(deck.flashcards[index])
+            return cards
+        
+        if not self.current_deck:
+            return []
+        queue = self.data_manager.get_due_queue(self.current_deck)
+        indexes = (self.current_deck.index_of(card_id) for card_id in queue.upcoming(count))
+        return [self.current_deck.flashcards[index] for index in indexes if index is not None]
+
+    def search_cards(self):
+        """Mencari kartu di semua deck lalu menampilkan kartu yang dipilih"""
+        dialog = SearchDialog(self.data_manager, self)
+        if dialog.exec():
+            result = dialog.get_selected_result()
+            if result:
+                self.due_session = None  # Membuka hasil pencarian mengakhiri sesi "Due Today"
+                if not self.show_due_card(*result):
+                    QMessageBox.warning(self, "Warning", "The card could not be found.")
+
     def export_deck(self):  
         deck_name = self.deck_panel.get_selected_deck_name()
         if not deck_name:
@@ -377,7 +490,7 @@ class FlashcardApp(QMainWindow):
             
         deck = next((d for d in self.decks if d.name == deck_name), None)
         if deck:
-            DeckIOHandler.export_deck(deck, self)
+            DeckIOHandler.export_deck(deck, self, self.data_manager.media_store)
         else:
             QMessageBox.warning(self, "Warning", "Selected deck not found.")
 
@@ -410,10 +523,17 @@ class FlashcardApp(QMainWindow):
     def next_card(self):
         if not self.current_deck or not self.current_deck.flashcards:
             return
-            
-        # Panggil metode untuk mendapatkan indeks kartu berikutnya dari scheduler
         
-        self.flashcard_display.current_index = (self.flashcard_display.current_index + 1) % len(self.current_deck.flashcards)
+        if self.due_session is not None:
+            if not self.show_next_due_card():
+                QMessageBox.information(self, "Due Today", "No more cards are due today.")
+            return
+            
+        # Kartu berikutnya diambil dari antrean jadwal (yang paling lama lewat jadwal duluan)
+        card_id = self.data_manager.get_due_queue(self.current_deck).next()
+        if card_id is None:
+            return
+        self.flashcard_display.current_index = self.current_deck.index_of(card_id)
         self.flashcard_display.showing_front = True
         card = self.flashcard_display.update_card_display()
         self.flashcard_display.cardChanged.emit(self.flashcard_display.current_index, self.flashcard_display.showing_front)
@@ -422,10 +542,20 @@ class FlashcardApp(QMainWindow):
     def prev_card(self):
         if not self.current_deck or not self.current_deck.flashcards:
             return
+        
+        if self.due_session is not None:
+            # Kembali ke kartu sebelumnya dalam sesi "Due Today"
+            if self.due_position > 0:
+                self.due_position -= 1
+                self.show_due_card(*self.due_session[self.due_position])
+            return
             
-        # Panggil metode untuk menampilkan kartu sebelumnya
+        # Kembali ke kartu yang ditampilkan sebelumnya
         if self.current_deck and self.current_deck.flashcards:
-            self.flashcard_display.current_index = (self.flashcard_display.current_index - 1) % len(self.current_deck.flashcards)
+            card_id = self.data_manager.get_due_queue(self.current_deck).prev()
+            if card_id is None:
+                return
+            self.flashcard_display.current_index = self.current_deck.index_of(card_id)
             self.flashcard_display.showing_front = True
             card = self.flashcard_display.update_card_display()
             self.flashcard_display.cardChanged.emit(self.flashcard_display.current_index, self.flashcard_display.showing_front)
@@ -435,6 +565,7 @@ class FlashcardApp(QMainWindow):
         """Handle card changed event from flashcard display"""
         # Reset feedback state for new card
         self.stats_manager.reset_feedback_state()
+        self.card_shown_at = time.perf_counter()
         
         # Get the current card
         card = self.flashcard_display.get_current_card()
@@ -471,7 +602,7 @@ class FlashcardApp(QMainWindow):
 
     def save_notes(self):
         if self.notes_manager.save_notes() and self.current_deck:
-            self.data_manager.save_deck(self.current_deck)
+            self.data_manager.save_card(self.current_deck, self.notes_panel.current_card)
             QMessageBox.information(self, "Success", "Notes saved successfully.")
 
     def handle_card_flip(self, is_showing_answer):
@@ -514,7 +645,7 @@ class FlashcardApp(QMainWindow):
             QMessageBox.warning(self, "Warning", "Please select a deck first.")
             return
             
-        dialog = ManageCardsDialog(self.current_deck, self)
+        dialog = ManageCardsDialog(self.current_deck, self, self.data_manager.media_store)
         if dialog.exec():
             # Jika perubahan dilakukan pada dialog, perbarui tampilan dan simpan
             card = self.flashcard_display.update_card_display()
@@ -542,6 +673,10 @@ class FlashcardApp(QMainWindow):
         """Mark the current card as right or wrong"""
         if not self.current_deck or not self.current_deck.flashcards:
             return
+        
+        # Dicatat sebelum kartu dijadwalkan ulang, untuk log review
+        response_ms = (time.perf_counter() - self.card_shown_at) * 1000
+        retention_before = self.flashcard_display.get_current_card().retention_score
             
         self.stats_manager.mark_card_feedback(
             is_right, 
@@ -552,7 +687,8 @@ class FlashcardApp(QMainWindow):
         dialog.exec()  # No need to check dialog result since it always saves
         card.difficulty = dialog.get_difficulty()
         self.scheduler.schedule_card(card, is_right)
-        self.data_manager.save_deck(self.current_deck)
+        self.data_manager.save_card(self.current_deck, card)
+        self.data_manager.log_review(self.current_deck, card, is_right, response_ms, retention_before)
         self.stats_manager.update_feedback_buttons(
             self.flashcard_display.showing_front,
             card
@@ -570,7 +706,7 @@ class FlashcardApp(QMainWindow):
         if success and self.current_deck:
             card = self.current_deck.get_flashcard(card_index)
             self.scheduler.schedule_card(card, is_right)
-            self.data_manager.save_deck(self.current_deck)
+            self.data_manager.save_card(self.current_deck, card)
 
     def show_stats(self):
         """Show statistics for current card"""
@@ -581,6 +717,10 @@ class FlashcardApp(QMainWindow):
         current_card = self.flashcard_display.get_current_card()
         stats_window = StatsPage(
             card=current_card,
+            deck=self.current_deck,
+            forecast=self.data_manager.get_forecast(),
+            history=self.data_manager.get_review_history(current_card.id, self.current_deck.name),
+            rollup=self.data_manager.get_rollup(self.current_deck),
             last_session_score=self.calculate_session_score(),
             total_study_time=self.stats_manager.get_elapsed_time(),
             parent=self
@@ -588,7 +728,7 @@ class FlashcardApp(QMainWindow):
         stats_window.setWindowModality(Qt.WindowModality.WindowModal)
         stats_window.exec()
         # Update display after potential reset
-        self.data_manager.save_deck(self.current_deck)
+        self.data_manager.save_card(self.current_deck, current_card)
         self.flashcard_display.update_card_display()
     
     def calculate_session_score(self):
@@ -596,11 +736,7 @@ class FlashcardApp(QMainWindow):
         if not self.current_deck or not self.current_deck.flashcards:
             return 0
             
-        total_right = sum(card.right_count for card in self.current_deck.flashcards)
-        total_attempts = sum(card.right_count + card.wrong_count 
-                           for card in self.current_deck.flashcards)
-        
-        return (total_right / total_attempts * 100) if total_attempts > 0 else 0
+        return self.current_deck.accuracy() * 100
 
     def closeEvent(self, event):
         """Save study time when closing app"""
@@ -608,6 +744,8 @@ class FlashcardApp(QMainWindow):
             self.stats_manager.stop_timer()
             self.data_manager.save_deck(self.current_deck)
         
+        # Wait for queued saves to hit the disk (also covers logout, which closes this window)
+        self.data_manager.flush()
         event.accept()
     
     def show_user_profile(self):
@@ -625,8 +763,8 @@ class FlashcardApp(QMainWindow):
         self.user_manager = user_manager
         
         # Update data manager to be user-specific
-        from Ido_241524047 import DataManager
-        self.data_manager = DataManager(username)
+        self.data_manager = create_data_manager(username)
+        self.use_media_store()
         
         # Update window title
         self.setWindowTitle(f"Flashcard App - {username}")
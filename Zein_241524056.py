@@ -1,12 +1,10 @@
 from PyQt6.QtWidgets import QLabel, QPushButton, QHBoxLayout, QWidget, QApplication, QGroupBox, QVBoxLayout, QDialog, QMessageBox
 from PyQt6.QtCore import QObject, pyqtSignal, Qt, QElapsedTimer
 from PyQt6.QtGui import QIcon
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import numpy as np
 import json
 import os
 from Ido_241524047 import Deck
+from ChartRenderer import chart_renderer
 
 class StatsManager(QObject):
     cardMarkedRight = pyqtSignal(int)  # Signal untuk menandai kartu sebagai benar
@@ -17,7 +15,7 @@ class StatsManager(QObject):
         self.feedback_given = False
         self.deck_timers = {}  # Dictionary to store timers for each deck
         self.current_deck = None
-        self.session_right = 0  # Add session tracking
+        self.session_right = 0  # Jawaban benar/salah sejak deck ini dipilih
         self.session_wrong = 0
 
     def save_study_time(self):
@@ -56,6 +54,11 @@ class StatsManager(QObject):
         if self.current_deck and self.current_deck.name in self.deck_timers:
             self.stop_timer(self.current_deck.name)
 
+        # Sesi baru dimulai setiap kali pindah ke deck lain
+        if deck is not self.current_deck:
+            self.session_right = 0
+            self.session_wrong = 0
+
         self.current_deck = deck
         if deck:
             # Create new timer for deck if it doesn't exist
@@ -172,7 +175,8 @@ class StatsManager(QObject):
         if deck and deck.flashcards:
             card = deck.get_flashcard(card_index)
             if card:
-                card.right_count += 1
+                deck.record_answer(card, True)  # Total deck ikut diperbarui
+                self.session_right += 1
                 return True
         return False
     
@@ -181,7 +185,8 @@ class StatsManager(QObject):
         if deck and deck.flashcards:
             card = deck.get_flashcard(card_index)
             if card:
-                card.wrong_count += 1
+                deck.record_answer(card, False)
+                self.session_wrong += 1
                 return True
         return False
         
@@ -198,18 +203,21 @@ class StatsManager(QObject):
         return (self.session_right / total * 100) if total > 0 else 0
 
 class PlotDialog(QDialog):
-    """Custom dialog to display Matplotlib plots"""
-    def __init__(self, fig, title, parent=None):
+    """Custom dialog to display a chart rendered by ChartRenderer"""
+    def __init__(self, pixmap, title, parent=None):
         super().__init__(parent)
         self.setWindowTitle(title)
         self.setGeometry(200, 200, 800, 600)
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)  # Jangan menumpuk dialog lama di StatsPage
         
         # Create layout
         layout = QVBoxLayout()
         
-        # Embed Matplotlib figure
-        canvas = FigureCanvas(fig)
-        layout.addWidget(canvas)
+        # Chart yang sudah dirender (dan di-cache) sebagai pixmap
+        chart_label = QLabel()
+        chart_label.setPixmap(pixmap)
+        chart_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(chart_label)
         
         # Add close button
         close_button = QPushButton("Close")
@@ -232,7 +240,8 @@ class PlotDialog(QDialog):
         self.setLayout(layout)
 
 class StatsPage(QDialog):
-    def __init__(self, card, last_session_score, total_study_time, parent=None):
+    def __init__(self, card, last_session_score, total_study_time, parent=None, deck=None, forecast=None, history=None,
+                 rollup=None):
         super().__init__(parent)
         
         # Set window properties 
@@ -294,6 +303,7 @@ class StatsPage(QDialog):
 
         # Store card reference and study time
         self.card = card
+        self.deck = deck  # Deck kartu ini, agar reset ikut memperbarui total deck
         self.correct = self.card.right_count if self.card else 0
         self.incorrect = self.card.wrong_count if self.card else 0
         self.total = self.correct + self.incorrect
@@ -301,6 +311,9 @@ class StatsPage(QDialog):
         self.difficulty = self.card.difficulty if self.card else 1
         self.retention = self.card.retention_score if self.card else 0.0
         self.total_study_time = total_study_time  # Store for use in visualizations
+        self.forecast = forecast  # Hasil DataManager.get_forecast(): jumlah kartu jatuh tempo per hari
+        self.history = history or []  # Riwayat review kartu ini dari log review (ReviewEvent)
+        self.rollup = rollup  # Total review harian deck ini (DailyRollup)
 
         # Main stats box with solid background color #FFC300
         main_stats_box = QGroupBox("📊 Statistik Utama")
@@ -354,6 +367,17 @@ class StatsPage(QDialog):
             (f"🎯 Last Session Score: {last_session_score:.1f}%", "#8e44ad"),
             (f"⏳ Total Study Time: {total_study_time:.1f} minute", "#d35400")
         ]
+        if self.forecast:
+            # Perkiraan beban review dari semua deck
+            total = self.forecast["total"]
+            extra_labels += [
+                (f"📅 Due Today (all decks): {total[0]}", "#2980b9"),
+                (f"🗓️ Due Next 7 Days: {sum(total[:7])}", "#2980b9"),
+            ]
+        if self.rollup:
+            # Review deck ini hari ini, langsung dari rollup harian
+            reviews, correct, _, _ = self.rollup.totals()
+            extra_labels.append((f"📆 Deck Reviews Today: {reviews} ({correct} correct)", "#16a085"))
         for text, color in extra_labels:
             label = QLabel(text)
             label.setStyleSheet(f"""
@@ -393,6 +417,10 @@ class StatsPage(QDialog):
         self.add_viz_button("📊 Performance Bar Chart", self.show_performance_chart, viz_buttons_row)
         self.add_viz_button("📈 Learning Progress", self.show_learning_progress, viz_buttons_row)
         self.add_viz_button("🎯 Accuracy Distribution", self.show_accuracy_dist, viz_buttons_row)
+        if self.forecast:
+            self.add_viz_button("📅 Review Forecast", self.show_forecast, viz_buttons_row)
+        if self.rollup and self.rollup.days:
+            self.add_viz_button("📆 Deck Activity", self.show_deck_activity, viz_buttons_row)
         
         # Reset button with full width
         reset_button = QPushButton("🔄 Reset Statistics")
@@ -446,10 +474,13 @@ class StatsPage(QDialog):
 
     def reset_stats(self):
         if self.card:
-            self.card.right_count = 0
-            self.card.wrong_count = 0
-            self.card.retention_score = 0.0
-            self.card.difficulty = 1
+            if self.deck:
+                self.deck.reset_card_stats(self.card)  # Total benar/salah deck ikut dikurangi
+            else:
+                self.card.right_count = 0
+                self.card.wrong_count = 0
+                self.card.retention_score = 0.0
+                self.card.difficulty = 1
             
             # Update display
             self.correct = 0
@@ -496,65 +527,128 @@ class StatsPage(QDialog):
         layout.addWidget(btn)
 
     def show_performance_chart(self):
-        """Show performance metrics using Matplotlib bar plot"""
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        metrics = ['Correct', 'Incorrect', 'Accuracy']
+        """Show performance metrics using a bar plot"""
         values = [self.correct, self.incorrect, self.accuracy]
-        colors = ['#27ae60', '#e74c3c', '#3498db']
         
-        bars = ax.bar(metrics, values, color=colors)
-        ax.set_title('Performance Metrics', pad=20, fontsize=14)
-        ax.set_ylabel('Value')
-        
-        for bar in bars:
-            yval = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2, yval, f'{yval:.1f}', va='bottom', fontsize=12)
+        def draw(fig):
+            ax = fig.subplots()
+            metrics = ['Correct', 'Incorrect', 'Accuracy']
+            colors = ['#27ae60', '#e74c3c', '#3498db']
+            
+            bars = ax.bar(metrics, values, color=colors)
+            ax.set_title('Performance Metrics', pad=20, fontsize=14)
+            ax.set_ylabel('Value')
+            
+            for bar in bars:
+                yval = bar.get_height()
+                ax.text(bar.get_x() + bar.get_width()/2, yval, f'{yval:.1f}', va='bottom', fontsize=12)
         
-        plt.tight_layout()
-        self.show_plot(fig, "Performance Metrics")
+        self.show_chart("Performance Metrics", tuple(values), draw)
 
     def show_learning_progress(self):
         """Show learning progress over time using line plot"""
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        reviews = range(1, self.total + 1)
-        accuracy_trend = [min(100, self.accuracy * (1 + i * 0.05)) for i in range(len(reviews))]
-        retention_trend = [min(100, self.retention * 100 * (1 + i * 0.03)) for i in range(len(reviews))]
-        
-        ax.plot(reviews, accuracy_trend, 'o-', label='Accuracy', color='#3498db')
-        ax.plot(reviews, retention_trend, 's-', label='Retention', color='#e67e22')
-        
-        ax.set_title('Learning Progress Over Time', pad=20, fontsize=14)
-        ax.set_xlabel('Review Number')
-        ax.set_ylabel('Score (%)')
-        ax.grid(True, alpha=0.3)
-        ax.legend()
+        if self.history:
+            # Riwayat asli dari log review: akurasi kumulatif dan retention setelah tiap review
+            right = 0
+            accuracy_trend = []
+            for number, event in enumerate(self.history, 1):
+                right += event.is_right
+                accuracy_trend.append(right / number * 100)
+            retention_trend = [event.retention_after * 100 for event in self.history]
+        else:
+            # Kartu tanpa riwayat (direview sebelum ada log review): perkiraan dari akurasi sekarang
+            accuracy_trend = [min(100, self.accuracy * (1 + i * 0.05)) for i in range(self.total)]
+            retention_trend = [min(100, self.retention * 100 * (1 + i * 0.03)) for i in range(self.total)]
+        
+        def draw(fig):
+            ax = fig.subplots()
+            reviews = range(1, len(accuracy_trend) + 1)
+            ax.plot(reviews, accuracy_trend, 'o-', label='Accuracy', color='#3498db')
+            ax.plot(reviews, retention_trend, 's-', label='Retention', color='#e67e22')
+            
+            ax.set_title('Learning Progress Over Time', pad=20, fontsize=14)
+            ax.set_xlabel('Review Number')
+            ax.set_ylabel('Score (%)')
+            ax.grid(True, alpha=0.3)
+            ax.legend()
         
-        plt.tight_layout()
-        self.show_plot(fig, "Learning Progress")
+        self.show_chart("Learning Progress", (tuple(accuracy_trend), tuple(retention_trend)), draw)
 
     def show_accuracy_dist(self):
-        """Show accuracy distribution using Matplotlib pie chart"""
+        """Show accuracy distribution using a pie chart"""
         # Add safety check
         if (self.correct + self.incorrect) == 0:
             QMessageBox.warning(self, "No Data", "No study data available yet.")
             return
             
-        fig, ax = plt.subplots(figsize=(8, 8))
-        
-        labels = ['Correct', 'Incorrect']
         sizes = [self.correct, self.incorrect]
-        colors = ['#27ae60', '#e74c3c']
         
-        ax.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-        ax.axis('equal')
-        ax.set_title('Accuracy Distribution', pad=20, fontsize=14)
+        def draw(fig):
+            ax = fig.subplots()
+            labels = ['Correct', 'Incorrect']
+            colors = ['#27ae60', '#e74c3c']
+            
+            ax.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
+            ax.axis('equal')
+            ax.set_title('Accuracy Distribution', pad=20, fontsize=14)
         
-        plt.tight_layout()
-        self.show_plot(fig, "Accuracy Distribution")
+        self.show_chart("Accuracy Distribution", tuple(sizes), draw, figsize=(8, 8))
+
+    def show_forecast(self):
+        """Show cards coming due per day (all decks, and this deck) using a bar plot"""
+        total = self.forecast["total"]
+        deck_name = self.deck.name if self.deck else None
+        deck_counts = self.forecast["decks"].get(deck_name) if deck_name else None
+        
+        def draw(fig):
+            ax = fig.subplots()
+            days = range(len(total))
+            ax.bar(days, total, width=1.0, color='#3498db', label='All decks')
+            if deck_counts:
+                ax.plot(days, deck_counts, color='#e67e22', label=deck_name)
+            
+            ax.set_title(f'Review Forecast from {self.forecast["start"].isoformat()}', pad=20, fontsize=14)
+            ax.set_xlabel('Days from today')
+            ax.set_ylabel('Cards due')
+            ax.grid(True, alpha=0.3)
+            ax.legend()
+        
+        key = (self.forecast["start"], tuple(total), deck_name, tuple(deck_counts or ()))
+        self.show_chart("Review Forecast", key, draw)
+
+    def show_deck_activity(self):
+        """Show the deck's reviews per day with daily accuracy and mean retention"""
+        series = self.rollup.series()
+        deck_name = self.deck.name if self.deck else None
+        
+        def draw(fig):
+            ax = fig.subplots()
+            days = [row[0] for row in series]
+            ax.bar(days, [row[1] for row in series], color='#3498db', label='Reviews')
+            ax.set_xlabel('Day')
+            ax.set_ylabel('Reviews')
+            
+            # Akurasi dan retention rata-rata per hari pada sumbu kanan
+            score_ax = ax.twinx()
+            score_ax.plot(days, [row[2] / row[1] * 100 for row in series], 'o-', label='Accuracy', color='#27ae60')
+            score_ax.plot(days, [row[4] * 100 for row in series], 's-', label='Mean Retention', color='#e67e22')
+            score_ax.set_ylabel('Score (%)')
+            score_ax.set_ylim(0, 100)
+            
+            ax.set_title(f'Daily Activity: {deck_name}' if deck_name else 'Daily Activity', pad=20, fontsize=14)
+            ax.grid(True, alpha=0.3)
+            handles, labels = ax.get_legend_handles_labels()
+            score_handles, score_labels = score_ax.get_legend_handles_labels()
+            ax.legend(handles + score_handles, labels + score_labels, loc='upper left')
+            fig.autofmt_xdate()
+        
+        self.show_chart("Deck Activity", (deck_name, tuple(series)), draw)
 
-    def show_plot(self, fig, title):
-        """Display the plot in a new non-blocking dialog"""
-        plot_dialog = PlotDialog(fig, title, self)
+    def show_chart(self, title, key, draw, figsize=(10, 6)):
+        """
+        Display a chart in a dialog. The chart is only drawn when its data
+        (key) changed since it was last shown; otherwise the cached pixmap is reused.
+        """
+        pixmap = chart_renderer.render(title, key, draw, figsize)
+        plot_dialog = PlotDialog(pixmap, title, self)
         plot_dialog.exec()
\ No newline at end of file
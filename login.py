@@ -1,8 +1,10 @@
 import hashlib
 import re
 from PyQt6.QtWidgets import QWidget, QLabel, QLineEdit, QPushButton, QGridLayout, QMessageBox, QHBoxLayout
+from PyQt6.QtCore import QTimer
 from Virli_241524062 import FlashcardApp
-from Ido_241524047 import UserManager, DataManager
+from Ido_241524047 import UserManager, create_data_manager
+from StartupTrace import trace
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
@@ -208,17 +210,22 @@ class LoginWindow(QWidget):
     def open_flashcard_app(self, username):
         """Open the flashcard application for the logged-in user"""
         try:
-            # Create user-specific data manager
-            user_data_manager = DataManager(username)
-            
-            # Create and show flashcard app
-            window = FlashcardApp(self)
-            window.data_manager = user_data_manager
-            window.set_user(username, self.user_manager)
-            window.show()
-            
-            # Only close login window if flashcard app opened successfully
-            self.hide()
+            with trace.phase("LoginWindow.open_flashcard_app"):
+                # Create user-specific data manager
+                user_data_manager = create_data_manager(username)
+                
+                # Create and show flashcard app
+                with trace.phase("FlashcardApp.__init__"):
+                    window = FlashcardApp(self)
+                window.data_manager = user_data_manager
+                with trace.phase("FlashcardApp.set_user"):
+                    window.set_user(username, self.user_manager)
+                window.show()
+                
+                # Only close login window if flashcard app opened successfully
+                self.hide()
+            # Trace selesai setelah event loop sempat menggambar jendela utama
+            QTimer.singleShot(0, trace.finish)
             
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to open flashcard application: {str(e)}")
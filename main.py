@@ -1,11 +1,17 @@
 import sys
-from PyQt6.QtWidgets import QApplication
-from login import LoginWindow
+from StartupTrace import trace
+
+trace.start_from_environment()  # FLASHCARD_STARTUP_TRACE=trace.json python main.py
+with trace.phase("import login"):
+    from PyQt6.QtWidgets import QApplication
+    from login import LoginWindow
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
+    with trace.phase("QApplication"):
+        app = QApplication(sys.argv)
 
-    loginpage = LoginWindow()
+    with trace.phase("LoginWindow.__init__"):
+        loginpage = LoginWindow()
     loginpage.show()
     
     app.setStyle("Fusion")
@@ -0,0 +1,13 @@
+import os, sys
+import pytest
+
+# The app's modules live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run the test in an empty directory (the app keeps its files under ./data)"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
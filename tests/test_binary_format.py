@@ -0,0 +1,93 @@
+import io
+import pytest
+from BinaryDeckFormat import BinaryDeckFormat, BinaryFormatError, HEADER
+
+DECK = {
+    "name": "Biologi é",
+    "study_time": 125,
+    "flashcards": [
+        {"id": "a", "front": "<p>Cell</p>", "back": "Unit of life", "notes": "", "right_count": 3,
+         "wrong_count": 1, "difficulty": 2, "retention_score": 0.75,
+         "last_reviewed": "2024-05-01T10:00:00.123456", "next_review": "2024-05-03T10:00:00"},
+        {"id": "b", "front": "DNA", "back": "Unit of life", "notes": "double helix", "right_count": 0,
+         "wrong_count": 0, "difficulty": 1, "retention_score": 0,
+         "last_reviewed": "2024-05-01T10:00:00+07:00", "next_review": "2024-05-02"},
+    ],
+}
+
+
+def encode(deck_data, compression):
+    return BinaryDeckFormat.encode(deck_data, compression)
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib", "lzma"])
+def test_round_trip(compression):
+    assert BinaryDeckFormat.decode(encode(DECK, compression)) == DECK
+
+
+def test_round_trip_keeps_odd_study_time():
+    deck_data = dict(DECK, study_time="")
+    assert BinaryDeckFormat.decode(encode(deck_data, "zlib")) == deck_data
+
+
+def test_read_header_skips_the_payload():
+    header = BinaryDeckFormat.read_header(io.BytesIO(encode(DECK, "lzma")))
+    assert header["name"] == DECK["name"]
+    assert header["card_count"] == 2
+
+
+def corrupt_payload(data, offset):
+    body = bytearray(data)
+    position = HEADER.size + len(DECK["name"].encode("utf-8")) + offset
+    for i in range(position, min(position + 16, len(body))):
+        body[i] ^= 0x5A
+    return bytes(body)
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib", "lzma"])
+@pytest.mark.parametrize("offset", [0, 4, 20])
+def test_corrupt_payload_raises_binary_format_error(compression, offset):
+    data = corrupt_payload(encode(DECK, compression), offset)
+    try:
+        BinaryDeckFormat.decode(data)
+    except BinaryFormatError:
+        pass  # Anything else (zlib.error, struct.error, ...) fails the test
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib", "lzma"])
+def test_truncated_file_raises_binary_format_error(compression):
+    data = encode(DECK, compression)
+    for length in (2, HEADER.size + 3, len(data) - 5):
+        with pytest.raises(BinaryFormatError):
+            BinaryDeckFormat.decode(data[:length])
+
+
+def test_bad_name_raises_binary_format_error():
+    data = bytearray(encode(DECK, "zlib"))
+    data[HEADER.size] = 0xFF  # Not valid UTF-8
+    with pytest.raises(BinaryFormatError):
+        BinaryDeckFormat.decode(bytes(data))
+
+
+def test_corrupt_deck_is_skipped_on_load(workdir, monkeypatch):
+    pytest.importorskip("PyQt6")
+    from Ido_241524047 import DataManager, Deck
+    
+    data_manager = DataManager("alice")
+    data_manager.deck_format = "binary"
+    for name in ("Good", "Bad"):
+        deck = Deck(name)
+        deck.add_flashcard(f"{name} front " * 50, "back")
+        data_manager.save_deck(deck)
+    data_manager.flush()
+    bad_path = data_manager.get_user_file_path("Bad")
+    with open(bad_path, 'rb') as f:
+        data = f.read()
+    with open(bad_path, 'wb') as f:
+        f.write(data[:HEADER.size + 3] + bytes(b ^ 0x5A for b in data[HEADER.size + 3:]))
+    
+    data_manager = DataManager("alice")
+    data_manager.deck_format = "binary"
+    decks = data_manager.load_decks()
+    assert [deck.name for deck in decks] == ["Good"]
+    assert len(decks[0].flashcards) == 1
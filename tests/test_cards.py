@@ -0,0 +1,37 @@
+import os, subprocess, sys
+from Cards import Flashcard
+from Scheduler import Scheduler
+from Timestamps import SECONDS_PER_DAY, parse_timestamp, timestamp_to_iso
+
+
+def test_flashcard_dict_round_trip():
+    data = {"id": "a", "front": "Q", "back": "A", "notes": "n", "right_count": 2, "wrong_count": 1,
+            "difficulty": 3, "retention_score": 0.5,
+            "last_reviewed": "2024-05-01T10:00:00.250000", "next_review": "2024-05-04T10:00:00"}
+    card = Flashcard.from_dict(data)
+    assert card.to_dict() == data
+    assert card.next_review_ts - card.last_reviewed_ts == 3 * SECONDS_PER_DAY - 0.25
+
+
+def test_inexact_timestamps_are_written_back_as_read():
+    for value in ("2024-05-01", "2024-05-01T10:00:00+07:00"):
+        card = Flashcard.from_dict({"last_reviewed": value, "next_review": value})
+        assert card.to_dict()["next_review"] == value
+        card.next_review_ts += SECONDS_PER_DAY
+        assert card.next_review == timestamp_to_iso(parse_timestamp(value)[0] + SECONDS_PER_DAY)
+
+
+def test_scheduler_uses_the_injected_clock():
+    now = 1_700_000_000.0
+    card = Flashcard("Q", "A")
+    Scheduler(clock=lambda: now).schedule_card(card, True)
+    assert card.last_reviewed_ts == now
+    assert card.next_review_ts > now
+
+
+def test_core_modules_do_not_import_qt():
+    code = ("import sys, Scheduler, DeckColumns, Cards, Timestamps; "
+            "sys.exit(any(name.startswith('PyQt6') for name in sys.modules))")
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=repo_dir, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
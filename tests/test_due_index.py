@@ -0,0 +1,111 @@
+import pytest
+
+pytest.importorskip("PyQt6")
+import Ido_241524047
+from DueIndex import DueIndex
+from Ido_241524047 import DataManager, Deck
+from SQLiteDataManager import SQLiteDataManager
+from Timestamps import SECONDS_PER_DAY, now_timestamp
+
+
+def make_decks(data_manager):
+    decks = []
+    for d, name in enumerate(("Biology", "History", "Math")):
+        deck = Deck(name)
+        for i in range(10):
+            card = deck.add_flashcard(f"{name} {i}", "answer")
+            card.next_review_ts = now_timestamp() + (i - 5 + d * 0.1) * SECONDS_PER_DAY
+        data_manager.save_deck(deck)
+        decks.append(deck)
+    data_manager.flush()
+    return decks
+
+
+def expected_due(decks, until):
+    cards = sorted((card.next_review_ts, deck.name, card.id) for deck in decks for card in deck.flashcards
+                   if card.next_review_ts < until)
+    return [(name, card_id) for _, name, card_id in cards]
+
+
+def review(data_manager, deck, card, days):
+    card.next_review_ts = now_timestamp() + days * SECONDS_PER_DAY
+    data_manager.save_card(deck, card)
+
+
+def forbid_deck_reads(monkeypatch):
+    def read(deck_path):
+        raise AssertionError(f"{deck_path} was read")
+    monkeypatch.setattr(Ido_241524047, "try_read_deck_file", read)
+
+
+def test_due_cards_across_decks(workdir):
+    data_manager = DataManager("alice")
+    decks = make_decks(data_manager)
+    until = now_timestamp()
+    
+    assert data_manager.get_due_cards(until) == expected_due(decks, until)
+
+
+@pytest.mark.parametrize("manager", [DataManager, SQLiteDataManager])
+def test_peek_is_the_start_of_the_due_cards(workdir, manager):
+    data_manager = manager("alice")
+    decks = make_decks(data_manager)
+    due = data_manager.get_due_cards()
+    shown = {due[0], due[2], due[5]}
+    
+    assert data_manager.peek_due_cards(4) == due[:4]
+    assert data_manager.peek_due_cards(3, shown) == [due[1], due[3], due[4]]
+    assert data_manager.peek_due_cards(100, shown) == [card for card in due if card not in shown]
+    assert data_manager.peek_due_cards(5, set(due)) == []
+    until = now_timestamp()
+    assert data_manager.peek_due_cards(100, until=until) == expected_due(decks, until)
+
+
+def test_reviews_do_not_rewrite_the_index(workdir):
+    data_manager = DataManager("alice")
+    decks = make_decks(data_manager)
+    data_manager.get_due_cards()
+    data_manager.flush()
+    with open(data_manager.get_due_index_path(), 'rb') as f:
+        saved = f.read()
+    
+    review(data_manager, decks[0], decks[0].flashcards[0], 3)
+    review(data_manager, decks[1], decks[1].flashcards[9], -9)
+    data_manager.flush()
+    
+    with open(data_manager.get_due_index_path(), 'rb') as f:
+        assert f.read() == saved
+    until = now_timestamp()
+    assert data_manager.get_due_cards(until) == expected_due(decks, until)
+
+
+@pytest.mark.parametrize("index_loaded", [True, False])
+def test_journaled_reviews_are_replayed_without_reading_decks(workdir, monkeypatch, index_loaded):
+    data_manager = DataManager("alice")
+    decks = make_decks(data_manager)
+    writer = DataManager("alice")
+    writer.get_due_cards()  # Writes due_index.json
+    writer.flush()
+    if index_loaded:
+        data_manager.get_due_cards()
+    review(data_manager, decks[0], decks[0].flashcards[0], 3)
+    review(data_manager, decks[2], decks[2].flashcards[8], -20)
+    review(data_manager, decks[2], decks[2].flashcards[8], -19)
+    data_manager.flush()
+    
+    forbid_deck_reads(monkeypatch)
+    until = now_timestamp()
+    assert DataManager("alice").get_due_cards(until) == expected_due(decks, until)
+
+
+def test_deck_saves_only_copy_the_changed_deck(workdir):
+    index = DueIndex({"a.txt": {"name": "A", "cards": {"1": 5.0}}, "b.txt": {"name": "B", "cards": {"2": 3.0}}})
+    first = index.to_dict()
+    
+    index.update("a.txt", "1", 1.0)
+    second = index.to_dict()
+    
+    assert second["b.txt"] is first["b.txt"]
+    assert second["a.txt"]["cards"] == {"1": 1.0}
+    assert first["a.txt"]["cards"] == {"1": 5.0}
+    assert index.due(4.0) == [("A", "1"), ("B", "2")]
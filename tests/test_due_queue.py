@@ -0,0 +1,89 @@
+import pytest
+
+pytest.importorskip("PyQt6")
+from DueQueue import DueQueue
+from Ido_241524047 import DataManager, Deck
+from Scheduler import Scheduler
+from Timestamps import SECONDS_PER_DAY, now_timestamp
+
+
+def make_deck(data_manager, count=50):
+    deck = Deck("Biology")
+    for i in range(count):
+        card = deck.add_flashcard(f"Question {i}", "answer")
+        card.next_review_ts = now_timestamp() + (i % 7 - 3) * SECONDS_PER_DAY
+    data_manager.get_due_queue(deck)
+    data_manager.save_deck(deck)
+    data_manager.flush()
+    return deck
+
+
+def review_next(data_manager, deck, scheduler, is_right):
+    card_id = data_manager.get_due_queue(deck).next()
+    card = deck.flashcards[deck.index_of(card_id)]
+    scheduler.schedule_card(card, is_right)
+    data_manager.save_card(deck, card)
+    return card
+
+
+def test_next_follows_the_schedule(workdir):
+    data_manager = DataManager("alice")
+    deck = make_deck(data_manager)
+    queue = data_manager.get_due_queue(deck)
+    
+    times = [deck.flashcards[deck.index_of(queue.next())].next_review_ts for _ in range(len(deck.flashcards))]
+    
+    assert times == sorted(times)
+
+
+def test_reviews_do_not_rewrite_the_saved_queue(workdir):
+    data_manager = DataManager("alice")
+    deck = make_deck(data_manager)
+    queue_path = data_manager.get_queue_path(data_manager.get_user_file_path(deck.name))
+    with open(queue_path, 'rb') as f:
+        saved = f.read()
+    
+    scheduler = Scheduler()
+    for i in range(20):
+        review_next(data_manager, deck, scheduler, i % 3 != 0)
+    data_manager.flush()
+    
+    with open(queue_path, 'rb') as f:
+        assert f.read() == saved
+
+
+def test_saved_queue_catches_up_with_the_journal(workdir, monkeypatch):
+    data_manager = DataManager("alice")
+    deck = make_deck(data_manager)
+    scheduler = Scheduler()
+    for i in range(20):
+        review_next(data_manager, deck, scheduler, i % 3 != 0)
+    data_manager.flush()
+    expected = dict(data_manager.get_due_queue(deck).keys)
+    
+    data_manager = DataManager("alice")
+    deck = data_manager.load_decks()[0]
+    deck.ensure_loaded()
+    with monkeypatch.context() as patch:
+        patch.setattr(DueQueue, "from_cards", None)  # Must come from the saved queue
+        queue = data_manager.get_due_queue(deck)
+    
+    assert queue.keys == expected
+    assert queue.keys == {card.id: card.next_review_ts for card in deck.flashcards}
+    order = [queue.pop() for _ in range(len(deck.flashcards))]
+    assert [expected[card_id] for card_id in order] == sorted(expected.values())
+
+
+def test_changed_deck_rebuilds_the_queue(workdir):
+    data_manager = DataManager("alice")
+    deck = make_deck(data_manager)
+    other = DataManager("alice")
+    copy = other.load_decks()[0]
+    copy.flashcards[0].next_review_ts = now_timestamp() - 100 * SECONDS_PER_DAY
+    other.save_deck(copy)  # Another copy of the deck saved without its queue
+    other.flush()
+    
+    data_manager = DataManager("alice")
+    deck = data_manager.load_decks()[0]
+    
+    assert data_manager.get_due_queue(deck).next() == copy.flashcards[0].id
@@ -0,0 +1,128 @@
+import json, os
+import pytest
+
+pytest.importorskip("PyQt6")
+from Ido_241524047 import DataManager, Deck, get_journal_path, read_deck_file
+
+
+def make_deck(data_manager, count=3):
+    deck = Deck("Biology")
+    for i in range(count):
+        deck.add_flashcard(f"Question {i}", f"Answer {i}")
+    data_manager.save_deck(deck)
+    data_manager.flush()
+    return deck
+
+
+def review(data_manager, deck, card, right_count):
+    card.right_count = right_count
+    data_manager.save_card(deck, card)
+    data_manager.flush()
+
+
+def stored_cards(deck_path):
+    return {card["id"]: card for card in read_deck_file(deck_path)["flashcards"]}
+
+
+def test_reviews_are_journaled_not_rewritten(workdir):
+    data_manager = DataManager("alice")
+    deck = make_deck(data_manager)
+    deck_path = data_manager.get_user_file_path(deck.name)
+    with open(deck_path, 'rb') as f:
+        snapshot = f.read()
+    
+    review(data_manager, deck, deck.flashcards[0], 1)
+    
+    with open(deck_path, 'rb') as f:
+        assert f.read() == snapshot
+    assert stored_cards(deck_path)[deck.flashcards[0].id]["right_count"] == 1
+
+
+def test_replay_keeps_the_last_entry_of_each_card(workdir):
+    data_manager = DataManager("alice")
+    deck = make_deck(data_manager)
+    first, second = deck.flashcards[:2]
+    for right_count in (1, 2, 3):
+        review(data_manager, deck, first, right_count)
+    review(data_manager, deck, second, 7)
+    review(data_manager, deck, first, 4)
+    
+    cards = stored_cards(data_manager.get_user_file_path(deck.name))
+    assert cards[first.id]["right_count"] == 4
+    assert cards[second.id]["right_count"] == 7
+    assert cards[deck.flashcards[2].id]["right_count"] == 0
+
+
+def test_replay_after_a_crash_mid_append(workdir):
+    data_manager = DataManager("alice")
+    deck = make_deck(data_manager)
+    first, second = deck.flashcards[:2]
+    review(data_manager, deck, first, 1)
+    deck_path = data_manager.get_user_file_path(deck.name)
+    # The app died halfway through writing the next entry
+    with open(get_journal_path(deck_path), 'a', encoding='utf-8') as f:
+        f.write('{"id":"%s","right_count":9,"wro' % first.id)
+    
+    cards = stored_cards(deck_path)
+    assert cards[first.id]["right_count"] == 1
+    
+    # Reviews after the restart are appended after the torn entry and still count
+    data_manager = DataManager("alice")
+    deck = data_manager.load_decks()[0]
+    second = deck.flashcards[deck.index_of(second.id)]
+    review(data_manager, deck, second, 5)
+    cards = stored_cards(deck_path)
+    assert cards[first.id]["right_count"] == 1
+    assert cards[second.id]["right_count"] == 5
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(workdir):
+    data_manager = DataManager("alice")
+    deck = make_deck(data_manager)
+    review(data_manager, deck, deck.flashcards[0], 2)
+    deck_path = data_manager.get_user_file_path(deck.name)
+    expected = stored_cards(deck_path)
+    
+    data_manager.compact_journal(deck_path)
+    
+    assert not os.path.exists(get_journal_path(deck_path))
+    assert stored_cards(deck_path) == expected
+
+
+def test_compaction_is_idempotent(workdir):
+    data_manager = DataManager("alice")
+    deck = make_deck(data_manager)
+    review(data_manager, deck, deck.flashcards[0], 2)
+    review(data_manager, deck, deck.flashcards[1], 3)
+    deck_path = data_manager.get_user_file_path(deck.name)
+    journal_path = get_journal_path(deck_path)
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        journal = f.read()
+    
+    data_manager.compact_journal(deck_path)
+    expected = stored_cards(deck_path)
+    data_manager.compact_journal(deck_path)
+    assert stored_cards(deck_path) == expected
+    
+    # A crash between writing the snapshot and removing the journal replays it again
+    with open(journal_path, 'w', encoding='utf-8') as f:
+        f.write(journal)
+    assert stored_cards(deck_path) == expected
+
+
+def test_large_journal_is_compacted(workdir, monkeypatch):
+    monkeypatch.setattr("Ido_241524047.JOURNAL_COMPACT_BYTES", 1024)
+    data_manager = DataManager("alice")
+    deck = make_deck(data_manager)
+    card = deck.flashcards[0]
+    for right_count in range(1, 30):
+        card.right_count = right_count
+        data_manager.save_card(deck, card)
+    data_manager.flush()
+    
+    deck_path = data_manager.get_user_file_path(deck.name)
+    journal_path = get_journal_path(deck_path)
+    assert not os.path.exists(journal_path) or os.path.getsize(journal_path) <= 1024
+    assert stored_cards(deck_path)[card.id]["right_count"] == 29
+    with open(deck_path, 'r', encoding='utf-8') as f:
+        assert max(c["right_count"] for c in json.load(f)["flashcards"]) > 0
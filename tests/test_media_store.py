@@ -0,0 +1,58 @@
+import base64, os
+import pytest
+
+from MediaStore import MediaStore
+
+PIXEL = b"\x89PNG\r\n\x1a\nnot really a picture"
+OTHER = b"\x89PNG\r\n\x1a\nanother picture"
+
+
+def image_html(data):
+    return f'<img src="data:image/png;base64,{base64.b64encode(data).decode("ascii")}">'
+
+
+def test_renamed_deck_keeps_its_media(tmp_path):
+    store = MediaStore(str(tmp_path / "media"))
+    blobs = {}
+    html = store.extract_html(image_html(PIXEL), blobs)
+    (name,) = blobs
+    store.update_refs("old", {"c1": [name]}, blobs)
+    other_blobs = {}
+    store.extract_html(image_html(OTHER), other_blobs)
+    (other,) = other_blobs
+    store.update_refs("new", {"c9": [other]}, other_blobs)  # Left behind by an earlier deck named "new"
+
+    store.rename_deck("old", "new")
+    assert store.get_refs() == {"new": {"c1": [name]}}
+    assert os.path.exists(store.get_media_path(name))
+    assert not os.path.exists(store.get_media_path(other))
+    assert store.resolve_html(html) == image_html(PIXEL)
+
+    reopened = MediaStore(str(tmp_path / "media"))
+    assert reopened.get_refs() == {"new": {"c1": [name]}}
+    reopened.drop_deck("new")
+    assert not os.path.exists(store.get_media_path(name))
+
+
+pytest.importorskip("PyQt6")
+from Ido_241524047 import DataManager, Deck
+from SQLiteDataManager import SQLiteDataManager
+
+
+@pytest.mark.parametrize("manager", [DataManager, SQLiteDataManager])
+def test_rename_deck_keeps_card_images(workdir, manager):
+    data_manager = manager("alice")
+    deck = Deck("Biology")
+    card = deck.add_flashcard(image_html(PIXEL), "answer")
+    deck.add_flashcard("Plain", "card")
+    data_manager.save_deck(deck)
+    data_manager.flush()
+
+    data_manager.rename_deck(deck, "Botany")
+    data_manager.flush()
+
+    store = manager("alice").media_store
+    (name,) = [name for name in os.listdir(store.media_dir) if name != "refs.json"]
+    assert store.get_refs() == {"Botany": {card.id: [name]}}
+    (reloaded,) = [d for d in manager("alice").load_decks() if d.name == "Botany"]
+    assert store.resolve_html(reloaded.flashcards[0].front) == image_html(PIXEL)
@@ -0,0 +1,79 @@
+import pytest
+
+pytest.importorskip("PyQt6")
+import DailyRollup
+from Ido_241524047 import DataManager, Deck
+from SQLiteDataManager import SQLiteDataManager
+from Timestamps import now_timestamp
+
+
+def make_deck(data_manager, name="Biology"):
+    deck = Deck(name)
+    for i in range(3):
+        deck.add_flashcard(f"{name} {i}", "answer")
+    data_manager.save_deck(deck)
+    data_manager.flush()
+    return deck
+
+
+def review(data_manager, deck, card, is_right, timestamp):
+    card.last_reviewed_ts = timestamp
+    data_manager.log_review(deck, card, is_right, response_ms=1000)
+
+
+def test_reviews_do_not_copy_the_rollup(workdir, monkeypatch):
+    data_manager = DataManager("alice")
+    deck = make_deck(data_manager)
+    data_manager.get_rollup(deck)
+    copies = []
+    to_dict = DailyRollup.DailyRollup.to_dict
+    monkeypatch.setattr(DailyRollup.DailyRollup, "to_dict", lambda self: copies.append(1) or to_dict(self))
+
+    start = now_timestamp()
+    for i in range(50):
+        review(data_manager, deck, deck.flashcards[i % 3], i % 2 == 0, start + i)
+    assert copies == []
+
+    data_manager.flush()
+    assert len(copies) == 1
+    assert DataManager("alice").get_rollup(deck).totals()[:3] == [50, 25, 50000]
+
+
+def test_rollup_catches_up_on_unsaved_reviews(workdir):
+    data_manager = DataManager("alice")
+    deck = make_deck(data_manager)
+    start = now_timestamp()
+    review(data_manager, deck, deck.flashcards[0], True, start)
+    data_manager.flush()
+    review(data_manager, deck, deck.flashcards[1], True, start + 1)
+    review(data_manager, deck, deck.flashcards[2], False, start + 2)
+    data_manager.save_queue.flush()  # The review log is written, the rollup isn't (a crash)
+
+    rollup = DataManager("alice").get_rollup(deck)
+    assert rollup.totals()[:2] == [3, 2]
+    assert rollup.last == start + 2
+    assert set(rollup.cards) == {card.id for card in deck.flashcards}
+
+
+@pytest.mark.parametrize("manager", [DataManager, SQLiteDataManager])
+def test_rename_keeps_the_rollup_and_history(workdir, manager):
+    data_manager = manager("alice")
+    deck = make_deck(data_manager)
+    other = make_deck(data_manager, "History")
+    start = now_timestamp()
+    review(data_manager, deck, deck.flashcards[0], True, start)
+    review(data_manager, deck, deck.flashcards[1], False, start + 1)
+    review(data_manager, other, other.flashcards[0], True, start + 2)
+
+    data_manager.rename_deck(deck, "Botany")
+    review(data_manager, deck, deck.flashcards[2], True, start + 3)
+    assert data_manager.get_rollup(deck).totals()[:2] == [3, 2]
+    data_manager.flush()
+
+    reopened = manager("alice")
+    assert [event.card_id for event in reopened.get_review_history(deck_name="Botany")] == \
+        [card.id for card in deck.flashcards]
+    assert reopened.get_review_history(deck_name="Biology") == []
+    assert len(reopened.get_review_history(deck_name="History")) == 1
+    assert reopened.get_rollup(deck).totals()[:2] == [3, 2]
+    assert sorted(d.name for d in reopened.load_decks()) == ["Botany", "History"]
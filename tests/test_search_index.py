@@ -0,0 +1,140 @@
+import os
+import pytest
+
+from SearchIndex import SearchIndex, html_to_text
+
+pytest.importorskip("PyQt6")
+import Ido_241524047
+from Ido_241524047 import DataManager, Deck
+
+
+def card_ids(results):
+    return [card_id for _, card_id, _ in results]
+
+
+def make_index():
+    index = SearchIndex()
+    index.set_deck("biology.json", "Biology", [
+        ("c1", "<html><head><style>p { color: red }</style></head><body><p>Mitochondria</p></body></html>",
+         "Powerhouse of the <b>cell</b>", ""),
+        ("c2", "Ribosome", "Makes proteins", "Found in the cell too"),
+        ("c3", "Photosynthesis &amp; light", "Chloroplast", ""),
+    ])
+    index.set_deck("history.json", "History", [
+        ("h1", "Cell phones", "Invented in 1973", ""),
+    ])
+    return index
+
+
+def test_html_to_text_drops_markup():
+    assert html_to_text("<head><title>x</title></head><p>A&amp;B</p>\n<p>  c </p>") == "A&B c"
+
+
+def test_tokenizing_covers_front_back_and_notes():
+    index = make_index()
+    assert card_ids(index.search("CELL")) == ["c1", "c2", "h1"]
+    assert card_ids(index.search("proteins")) == ["c2"]
+    assert card_ids(index.search("light")) == ["c3"]
+    assert index.search("red") == []  # Inside <style>
+    assert index.search("amp") == []
+    assert index.search("...") == []
+    assert index.search("mitochondria")[0] == ("Biology", "c1", "Mitochondria")
+
+
+def test_all_words_must_match_and_the_last_is_a_prefix():
+    index = make_index()
+    assert card_ids(index.search("cell pow")) == ["c1"]
+    assert card_ids(index.search("ce")) == ["c1", "c2", "h1"]
+    assert card_ids(index.search("cell ph")) == ["h1"]
+    assert index.search("ce powerhouse") == []
+    assert card_ids(index.search("c", limit=2)) == ["c1", "c2"]
+
+
+def test_incremental_updates():
+    index = make_index()
+    assert not index.update_card("biology.json", "c2", "Ribosome", "Makes proteins", "Found in the cell too")
+    assert index.update_card("biology.json", "c2", "Ribosome", "Makes proteins", "Also in mitochondria")
+    assert card_ids(index.search("mitochondria")) == ["c1", "c2"]
+    assert card_ids(index.search("cell")) == ["c1", "h1"]
+    assert not index.update_card("math.json", "m1", "x", "y", "z")
+
+    index.set_deck("biology.json", "Biology", [("c1", "Nucleus", "", ""), ("c4", "Cell wall", "", "")])
+    assert card_ids(index.search("cell")) == ["h1", "c4"]
+    assert index.search("ribosome") == []
+    assert len(index) == 3
+
+
+def test_removal_and_compaction():
+    index = make_index()
+    index.remove_deck("history.json")
+    assert card_ids(index.search("cell")) == ["c1", "c2"]
+    assert "history.json" not in index
+
+    for i in range(5):
+        index.update_card("biology.json", "c3", f"Photosynthesis {i}", "", "")
+    before = index.search("p")
+    index.compact()
+    assert index.search("p") == before
+    assert len(index.docs) == len(index) == 3
+
+
+def test_saved_index_round_trip():
+    index = make_index()
+    loaded = SearchIndex()
+    for key, entry in index.to_dict().items():
+        loaded.load_deck(key, entry)
+    assert loaded.search("cell") == index.search("cell")
+    assert loaded.decks.keys() == index.decks.keys()
+
+
+def make_decks(data_manager):
+    decks = []
+    for name in ("Biology", "History"):
+        deck = Deck(name)
+        for i in range(3):
+            deck.add_flashcard(f"{name} card {i}", "answer")
+        data_manager.save_deck(deck)
+        decks.append(deck)
+    data_manager.flush()
+    return decks
+
+
+def count_deck_reads(monkeypatch):
+    reads = []
+    read = Ido_241524047.try_read_deck_file
+    monkeypatch.setattr(Ido_241524047, "try_read_deck_file", lambda path: reads.append(path) or read(path))
+    return reads
+
+
+def test_reviews_do_not_reindex_decks(workdir, monkeypatch):
+    decks = make_decks(DataManager("alice"))
+    writer = DataManager("alice")
+    writer.search_cards("card")  # Writes search_index.json
+    writer.flush()
+
+    data_manager = DataManager("alice")
+    for card in decks[0].flashcards:
+        decks[0].record_answer(card, True)
+        data_manager.save_card(decks[0], card)
+    data_manager.flush()
+
+    reads = count_deck_reads(monkeypatch)
+    assert len(DataManager("alice").search_cards("card")) == 6
+    assert reads == []
+
+
+def test_notes_edits_are_picked_up(workdir, monkeypatch):
+    decks = make_decks(DataManager("alice"))
+    writer = DataManager("alice")
+    writer.search_cards("card")
+    writer.flush()
+
+    data_manager = DataManager("alice")
+    card = decks[1].flashcards[2]
+    card.notes = "Remember the treaty"
+    data_manager.save_card(decks[1], card)
+    data_manager.flush()
+
+    reads = count_deck_reads(monkeypatch)
+    assert DataManager("alice").search_cards("treaty") == [("History", card.id, "History card 2")]
+    assert [os.path.basename(path).startswith("History.") for path in reads] == [True]
@@ -0,0 +1,34 @@
+import os, subprocess, sys
+import pytest
+
+np = pytest.importorskip("numpy")
+from Simulator import ConstantRecall, ExponentialRecall, Simulator
+
+
+def test_deck_totals_match_the_cards_every_day():
+    simulator = Simulator(2000, new_per_day=500, recall=ConstantRecall(0.8), seed=1, start=0.0)
+    columns = simulator.deck.columns
+    for _ in range(15):
+        simulator.step()
+        assert simulator.deck.right_total == columns.column("right_count").sum()
+        assert simulator.deck.wrong_total == columns.column("wrong_count").sum()
+    
+    reviews = sum(day["reviews"] for day in simulator.days)
+    assert simulator.deck.right_total + simulator.deck.wrong_total == reviews
+
+
+def test_runs_are_reproducible():
+    runs = [Simulator(1000, recall=ExponentialRecall(), seed=7, start=0.0).run(30, out=open(os.devnull, 'w'))
+            for _ in range(2)]
+    for first, second in zip(*runs):
+        first.pop("schedule_ms"), second.pop("schedule_ms")
+        assert first == second
+
+
+def test_simulator_runs_without_qt():
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = ("import sys, Simulator; "
+            "Simulator.Simulator(100, recall=Simulator.ConstantRecall()).run(3, out=open(__import__('os').devnull, 'w')); "
+            "sys.exit(any(name.startswith('PyQt6') for name in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=repo_dir, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
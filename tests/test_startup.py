@@ -0,0 +1,25 @@
+import os, subprocess, sys
+import pytest
+
+pytest.importorskip("PyQt6")
+from Benchmark import STARTUP_BUDGET_MS, STARTUP_EXCLUDED, measure_startup
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_login_import_path_skips_charting_libraries():
+    # The modules main.py imports before the login window is shown, without a QApplication
+    script = ("import sys; import main, login, Virli_241524062, Zein_241524056; "
+              "print(' '.join(name for name in sys.modules if '.' not in name))")
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    result = subprocess.run([sys.executable, "-c", script], cwd=APP_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    modules = set(result.stdout.split())
+    assert "login" in modules
+    assert modules.isdisjoint(STARTUP_EXCLUDED)
+
+
+def test_login_window_paints_within_budget():
+    import_ms, paint_ms, heavy = measure_startup(runs=3)
+    assert heavy == []
+    assert import_ms <= paint_ms < STARTUP_BUDGET_MS
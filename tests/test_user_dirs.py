@@ -0,0 +1,76 @@
+import json, os
+import pytest
+
+pytest.importorskip("PyQt6")
+from Ido_241524047 import DataManager, Deck, USERDATA_DIR, get_user_dir_name
+
+
+def write_flat_deck(filename, deck_name):
+    os.makedirs(USERDATA_DIR, exist_ok=True)
+    deck = Deck(deck_name)
+    deck.add_flashcard(f"{deck_name} question", "answer")
+    with open(os.path.join(USERDATA_DIR, filename), 'w', encoding='utf-8') as f:
+        json.dump(deck.to_dict(), f)
+
+
+def deck_names(data_manager):
+    return [deck.name for deck in data_manager.load_decks()]
+
+
+def save_deck(data_manager, name):
+    data_manager.save_deck(Deck(name))
+    data_manager.flush()
+
+
+def test_flat_layout_migration(workdir):
+    write_flat_deck("alice_Biology.txt", "Biology")
+    write_flat_deck("alice_b_Chemistry.txt", "Chemistry")  # alice_b's deck "Chemistry"
+    write_flat_deck("alice_b_Physics.txt", "b_Physics")  # alice's deck "b_Physics"
+    
+    data_manager = DataManager("alice")
+    
+    assert data_manager.data_dir == os.path.join(USERDATA_DIR, "alice")
+    assert deck_names(data_manager) == ["Biology", "b_Physics"]
+    assert deck_names(DataManager("alice_b")) == ["Chemistry"]
+    assert not os.path.exists(os.path.join(USERDATA_DIR, "alice_Biology.txt"))
+
+
+def test_unsafe_names_get_hashed_directories(workdir):
+    assert get_user_dir_name("alice_01") == "alice_01"
+    for username in ("Bob", "ann-marie", "../alice", "user-0123456789abcdef"):
+        dir_name = get_user_dir_name(username)
+        assert dir_name.startswith("user-") and dir_name != username
+
+
+def test_hashed_directory_name_is_not_another_users_username(workdir):
+    bob = DataManager("Bob")
+    save_deck(bob, "Bob's deck")
+    impostor_name = get_user_dir_name("Bob")
+    
+    impostor = DataManager(impostor_name)
+    
+    assert impostor.data_dir != bob.data_dir
+    assert deck_names(impostor) == []
+    assert deck_names(DataManager("Bob")) == ["Bob's deck"]
+
+
+def test_legacy_directory_of_a_dashed_name_is_moved(workdir):
+    # Before "-" was hashed, ann-marie's data lived under the username itself
+    legacy = DataManager("ann_marie")
+    save_deck(legacy, "History")
+    os.replace(legacy.data_dir, os.path.join(USERDATA_DIR, "ann-marie"))
+    
+    data_manager = DataManager("ann-marie")
+    
+    assert data_manager.data_dir == os.path.join(USERDATA_DIR, get_user_dir_name("ann-marie"))
+    assert deck_names(data_manager) == ["History"]
+    assert not os.path.exists(os.path.join(USERDATA_DIR, "ann-marie"))
+
+
+def test_hash_shaped_username_never_takes_a_legacy_directory(workdir):
+    bob = DataManager("Bob")
+    save_deck(bob, "Bob's deck")
+    
+    DataManager(get_user_dir_name("Bob"))
+    
+    assert deck_names(DataManager("Bob")) == ["Bob's deck"]
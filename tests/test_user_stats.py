@@ -0,0 +1,86 @@
+import os
+import pytest
+
+pytest.importorskip("PyQt6")
+import Ido_241524047
+from Ido_241524047 import DataManager, Deck
+from Timestamps import SECONDS_PER_DAY, now_timestamp
+
+
+def make_decks(data_manager):
+    decks = []
+    for name, count in (("Biology", 5), ("History", 3)):
+        deck = Deck(name)
+        for i in range(count):
+            card = deck.add_flashcard(f"{name} {i}", "answer")
+            card.next_review_ts = now_timestamp() + (i - 2) * SECONDS_PER_DAY
+        data_manager.save_deck(deck)
+        decks.append(deck)
+    data_manager.flush()
+    return decks
+
+
+def review(data_manager, deck, card, is_right, days):
+    data_manager.get_due_queue(deck)
+    deck.record_answer(card, is_right)
+    card.next_review_ts = now_timestamp() + days * SECONDS_PER_DAY
+    data_manager.save_card(deck, card)
+
+
+def fresh_stats():
+    """Statistics worked out from the deck files alone"""
+    os.remove(DataManager("alice").get_manifest_path())
+    data_manager = DataManager("alice")
+    stats = data_manager.get_user_stats()
+    data_manager.flush()  # The rebuilt manifest
+    return stats
+
+
+def forbid_deck_reads(monkeypatch):
+    def read(deck_path):
+        raise AssertionError(f"{deck_path} was read")
+    monkeypatch.setattr(Ido_241524047, "try_read_deck_file", read)
+
+
+def test_stats_come_from_the_manifest(workdir, monkeypatch):
+    make_decks(DataManager("alice"))
+    expected = fresh_stats()
+    forbid_deck_reads(monkeypatch)
+    
+    assert DataManager("alice").get_user_stats() == expected
+    assert expected["total_cards"] == 8
+    assert expected["total_due"] == 6
+
+
+def test_reviews_keep_the_manifest_stats_current(workdir, monkeypatch):
+    data_manager = DataManager("alice")
+    biology, history = make_decks(data_manager)
+    review(data_manager, biology, biology.flashcards[0], True, 3)
+    review(data_manager, biology, biology.flashcards[0], False, -1)
+    review(data_manager, biology, biology.flashcards[4], True, -5)
+    review(data_manager, history, history.flashcards[1], False, 10)
+    data_manager.flush()
+    
+    with monkeypatch.context() as patch:
+        forbid_deck_reads(patch)
+        stats = data_manager.get_user_stats()
+        assert DataManager("alice").get_user_stats() == stats
+    
+    assert stats == fresh_stats()
+    assert (stats["total_right"], stats["total_wrong"]) == (2, 2)
+    assert stats["total_due"] == 6
+
+
+def test_review_without_a_due_queue_reads_the_deck_again(workdir):
+    data_manager = DataManager("alice")
+    biology, _ = make_decks(data_manager)
+    card = biology.flashcards[0]
+    biology.record_answer(card, True)
+    card.next_review_ts = now_timestamp() + 30 * SECONDS_PER_DAY
+    data_manager.save_card(biology, card)  # The old due day isn't known
+    data_manager.flush()
+    
+    stats = data_manager.get_user_stats()
+    
+    assert stats == fresh_stats()
+    assert stats["total_right"] == 1